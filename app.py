@@ -1,6 +1,6 @@
 import base64
 import logging
-from flask import Flask, redirect, url_for, request, jsonify
+from flask import Flask, redirect, url_for, request, jsonify, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 import json
@@ -8,12 +8,25 @@ import boto3
 from botocore.exceptions import ClientError
 import time
 from flask_cors import CORS
-from transcribe import Transcribe
+from transcribe import get_transcriber, SAMPLE_RATE
+from audio_processing import probe_audio
+from transcription_pipeline import (AsrProgress, normalize_stage, asr_stage, diarize_stage_async, diarization_result,
+                                    merge_stage, save_result, cleanup_files, PARALLEL_STAGES)
+from cpu_governor import core_governor
+from model_registry import model_registry, SUPPORTED_WHISPER_MODELS
+from batch_asr import whisper_batcher
+from decoding_profiles import TRANSCRIPTION_PROFILES, DEFAULT_PROFILE, normalize_language
 from models import db, User, Audio, Transcription
-import threading 
 import uuid as uuid_lib
-from celery import Celery
+from celery_app import celery
+from tasks import enqueue_transcription
+from status_store import status_store
 from llmworker import LLMWorker
+from dedup_cache import dedup_cache, save_with_hash
+from remote_audio import remote_audio_cache
+from resumable_upload import UploadManager, UploadError, UPLOAD_PART_SIZE
+from job_queue import (job_executor, QueueFullError, JobCancelled, JobPreempted, current_job,
+                       interruption_point)
 
 #Encryption libs
 from Crypto.Hash import MD5
@@ -25,13 +38,12 @@ import uuid
 import whisper
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
-from pydub import AudioSegment
 
 #request
 from urllib import request as urlrequest
 
 #auth
-from auth_routes import auth_bp, token_required
+from auth_routes import auth_bp, token_required, generate_stream_token, decode_stream_token, STREAM_TOKEN_TTL_SECONDS
 from transcription_routes import transcription_bp
 
 
@@ -67,50 +79,60 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
 db.init_app(app)
 migrate = Migrate(app, db)
 
-# Configure Celery
-app.config.update(
-    broker_url='redis://localhost:6379/0',
-    result_backend='redis://localhost:6379/0'
-)
+# 'local' — пул потоків у цьому процесі, 'celery' — окремі воркери (tasks.py)
+TRANSCRIPTION_BACKEND = os.getenv('TRANSCRIPTION_BACKEND', 'local')
 
-celery = Celery(
-        app.import_name,
-        broker=app.config['broker_url'],
-        backend=app.config['result_backend']    
-    )
-
-celery.conf.update(app.config)
+# SSE: інтервал keepalive і максимальна тривалість одного з'єднання (далі браузер перепідключиться)
+SSE_KEEPALIVE_SECONDS = int(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+SSE_MAX_SECONDS = int(os.getenv('SSE_MAX_SECONDS', '600'))
 
 
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-transcription_tasks = {}
+upload_manager = UploadManager(UPLOAD_FOLDER)
+
+if os.getenv('PRELOAD_MODELS', 'false').lower() == 'true':
+    model_registry.preload()
 
 
-def get_audio_duration(file_path):
-    """Отримує тривалість аудіофайлу"""
+def _mark_transcription(tr_uuid, status):
+    """Ставить статус рядку транскрипції, якщо його ще не видалено"""
     try:
-        audio = AudioSegment.from_file(file_path)
-        return len(audio) / 1000.0
-    except Exception as e:
-        app.logger.error(f"Error getting audio duration: {str(e)}")
-        return None
+        with app.app_context():
+            transcription = Transcription.query.filter_by(uuid=tr_uuid).first()
+            if transcription:
+                transcription.status = status
+                db.session.commit()
+    except Exception as db_error:
+        print(f"Database error: {str(db_error)}")
+
 
+def transcribe_process_thread(file_path, tr_uuid, model_type='base', diarize=True, profile=None, language=None):
+    """Функція для асинхронної транскрипції в окремому потоці
 
-def transcribe_process_thread(file_path, tr_uuid, model_type='base'):
-    """Функція для асинхронної транскрипції в окремому потоці"""
+    Між етапами і вікнами розпізнавання — контрольні точки: скасована задача
+    зупиняється, а витіснена повертається в чергу і продовжує з ``checkpoint``.
+    """
+    job = current_job()
+    state = job.checkpoint if job else {}
     try:
-        print(f"Starting transcription for {tr_uuid}")
+        interruption_point(tr_uuid)
         
-        transcription_tasks[str(tr_uuid)] = {
-            'status': 'processing',
-            'progress': 0,
-            'message': 'Starting transcription...'
-        }
+        if not state:
+            print(f"Starting transcription for {tr_uuid}")
+            status_store.set(tr_uuid, 'processing', 0, 'Starting transcription...')
+        else:
+            print(f"Resuming transcription for {tr_uuid}")
+            status_store.update(tr_uuid, status='processing', message='Resuming transcription...')
         
-        with app.app_context():
+        # ядра ділимо з іншими задачами; з паралельною діаризацією — ще й між етапами
+        pending = state.get('diarization')
+        parallel = (bool(diarize) and PARALLEL_STAGES
+                    and ('audio' not in state or (pending is not None and not pending.done())))
+        
+        with app.app_context(), core_governor.job(tr_uuid, parallel_diarization=parallel):
             transcription = Transcription.query.filter_by(uuid=tr_uuid).first()
             if not transcription:
                 raise Exception(f"Transcription with UUID {tr_uuid} not found")
@@ -118,83 +140,71 @@ def transcribe_process_thread(file_path, tr_uuid, model_type='base'):
             transcription.status = "processing"
             db.session.commit()
 
-            transcribe = Transcribe()
-            
-            transcription_tasks[str(tr_uuid)]['progress'] = 20
-            transcription_tasks[str(tr_uuid)]['message'] = 'Normalizing audio...'
-            
-            pre_loaded_file = transcribe.get_audio_data(file_path)
-            normalized_file = transcribe.audio_normalize(pre_loaded_file)
+            # діаризація йде в окремому пулі процесів: вебпроцесу pyannote не потрібен
+            transcribe = get_transcriber()
             
-            transcription_tasks[str(tr_uuid)]['progress'] = 40
-            transcription_tasks[str(tr_uuid)]['message'] = 'Transcribing audio...'
+            if 'audio' not in state:
+                status_store.update(tr_uuid, progress=20, message='Normalizing audio...')
+                
+                state['audio'], state['pre_loaded_file'], quality = normalize_stage(transcribe, file_path)
+
+                transcription.quality_report = quality
+                if transcription.audio and not transcription.audio.duration:
+                    transcription.audio.duration = len(state['audio']) / SAMPLE_RATE
+                db.session.commit()
+                
+                interruption_point(tr_uuid)
+                
+                # діаризація йде паралельно з розпізнаванням
+                state['diarization'] = None
+                if diarize:
+                    state['diarization'] = diarize_stage_async(transcribe, state['audio'],
+                                                               budget=core_governor.budget(tr_uuid, 'diarization'))
+                    state['diarization'].add_done_callback(lambda f: core_governor.finish_stage(tr_uuid))
+                
+                status_store.update(tr_uuid, progress=25, message='Transcribing audio...')
             
-            try:
-                result = transcribe.audio_to_text(model=model_type, mediafile=normalized_file)
-            except Exception as e:
-                print(f"Model {model_type} failed, trying base model: {str(e)}")
-                result = transcribe.audio_to_text(model='base', mediafile=normalized_file)
+            core_governor.apply(tr_uuid, 'asr')
+            result, model_type = asr_stage(transcribe, state['audio'], model_type, AsrProgress(tr_uuid),
+                                           state.setdefault('asr', {}), profile=profile, language=language)
             
-            transcription_tasks[str(tr_uuid)]['progress'] = 70
-            transcription_tasks[str(tr_uuid)]['message'] = 'Analyzing speakers...'
+            status_store.update(tr_uuid, progress=70, message='Analyzing speakers...')
             
-            try:
-                diarization_result = transcribe.diarization(audio_location=normalized_file)
-                speakers_json, speakers_text = transcribe.match_transcription_diarization(
-                    diarization_result, result, normalized_file)
-            except Exception as e:
-                print(f"Diarization failed: {str(e)}")
-                speakers_json = {}
-                speakers_text = result['text']
+            turns = diarization_result(state['diarization']) if state['diarization'] else None
+            interruption_point(tr_uuid)
+            speakers_json, speakers_text = merge_stage(transcribe, result, turns)
             
-            transcription_tasks[str(tr_uuid)]['progress'] = 90
-            transcription_tasks[str(tr_uuid)]['message'] = 'Saving results...'
+            status_store.update(tr_uuid, progress=90, message='Saving results...')
             
-            transcription.text = result['text']
-            transcription.speakers_text = speakers_text
-            transcription.speakers_json = speakers_json
-            transcription.language = result.get('language', 'unknown')
-            transcription.status = "completed"
+            # рядок могли видалити, поки йшло розпізнавання
+            interruption_point(tr_uuid)
+            save_result(transcription, result, model_type, speakers_json, speakers_text)
             db.session.commit()
             
-            for f in [file_path, pre_loaded_file, normalized_file]:
-                try:
-                    if os.path.exists(f):
-                        os.remove(f)
-                except Exception as e:
-                    print(f"Error removing file {f}: {str(e)}")
+            cleanup_files(file_path, state['pre_loaded_file'])
             
-            transcription_tasks[str(tr_uuid)] = {
-                'status': 'completed',
-                'progress': 100,
-                'message': 'Transcription completed successfully',
-                'result': {
-                    'text': result['text'],
-                    'speakers_text': speakers_text,
-                    'speakers_json': speakers_json,
-                    'language': result.get('language', 'unknown')
-                }
-            }
+            status_store.set(tr_uuid, 'completed', 100, 'Transcription completed successfully')
             
             print(f"Transcription completed for {tr_uuid}")
+    
+    except JobPreempted:
+        print(f"Transcription {tr_uuid} paused for a shorter job")
+        status_store.update(tr_uuid, status='pending', message='Paused for shorter jobs, will resume shortly')
+        _mark_transcription(tr_uuid, "pending")
+        raise
+    
+    except JobCancelled:
+        print(f"Transcription {tr_uuid} cancelled")
+        if state.get('diarization'):
+            state['diarization'].cancel()
+        cleanup_files(file_path, state.get('pre_loaded_file'))
+        _mark_transcription(tr_uuid, "cancelled")
+        status_store.set(tr_uuid, 'cancelled', 0, 'Transcription cancelled')
         
     except Exception as e:
         print(f"Transcription error for {tr_uuid}: {str(e)}")
-        
-        try:
-            with app.app_context():
-                transcription = Transcription.query.filter_by(uuid=tr_uuid).first()
-                if transcription:
-                    transcription.status = "failed"
-                    db.session.commit()
-        except Exception as db_error:
-            print(f"Database error: {str(db_error)}")
-        
-        transcription_tasks[str(tr_uuid)] = {
-            'status': 'failed',
-            'progress': 0,
-            'message': f'Transcription failed: {str(e)}'
-        }
+        _mark_transcription(tr_uuid, "failed")
+        status_store.set(tr_uuid, 'failed', 0, f'Transcription failed: {str(e)}')
 
 
 def get_current_user_from_token():
@@ -212,6 +222,9 @@ def get_current_user_from_token():
         import jwt
         
         data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+        if data.get('scope'):
+            # токен потоку статусу не замінює основний JWT
+            return None
         current_user = User.query.filter_by(id=data['user_id']).first()
         
         return current_user
@@ -230,6 +243,130 @@ def index():
     )
 
 
+def _queue_full_response(retry_after):
+    response = jsonify({
+        'error': 'Transcription queue is full. Please retry later.',
+        'retry_after': retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 503
+
+
+def _register_upload(current_user, tr_uuid, filename, file_path, file_size, sha256, options,
+                     remove_on_reject=True):
+    """Створює Audio і Transcription для збереженого файлу і ставить транскрипцію в чергу"""
+    model_type = options['model']
+    diarize = options['diarization']
+    # сесії відновлюваних завантажень, створені до появи профілів, їх не мають
+    profile = options.get('profile') or DEFAULT_PROFILE
+    language = options.get('language')
+    
+    # лише заголовки контейнера; повне декодування — у воркері
+    metadata = probe_audio(file_path)
+    cached = dedup_cache.lookup(sha256, current_user.id, model_type, diarize, profile, language)
+    duration = metadata['duration'] or (cached.audio.duration if cached and cached.audio else None)
+    file_format = filename.split('.')[-1] if '.' in filename else None
+
+    audio = Audio(
+        uuid=tr_uuid,
+        user_id=current_user.id,
+        filename=filename,
+        file_path=file_path,
+        file_size=file_size,
+        duration=duration,
+        format=file_format,
+        codec=metadata['codec'],
+        sample_rate=metadata['sample_rate'],
+        channels=metadata['channels'],
+        sha256=sha256
+    )
+    db.session.add(audio)
+    db.session.flush() 
+
+    transcription = Transcription(
+        uuid=tr_uuid,
+        user_id=current_user.id,
+        audio_id=audio.id,
+        status="pending",
+        model=model_type,
+        profile=profile,
+        diarization=diarize
+    )
+    
+    if cached:
+        dedup_cache.clone_into(cached, transcription)
+        db.session.add(transcription)
+        db.session.commit()
+        
+        try:
+            os.remove(file_path)
+        except Exception as e:
+            print(f"Error removing file {file_path}: {str(e)}")
+        
+        print(f"Reused transcription {cached.uuid} for identical upload {tr_uuid}")
+        return jsonify({
+            'status': 'success',
+            'message': 'Identical file was already transcribed. Results reused.',
+            'uuid': str(tr_uuid),
+            'transcription_status': 'completed',
+            'deduplicated': True
+        })
+    
+    db.session.add(transcription)
+    db.session.commit()
+
+    if TRANSCRIPTION_BACKEND == 'celery':
+        queue = enqueue_transcription(file_path, tr_uuid, model_type, diarize, duration, profile, language)
+        return jsonify({
+            'status': 'success',
+            'message': 'File uploaded successfully. Transcription queued.',
+            'uuid': str(tr_uuid),
+            'transcription_status': 'pending',
+            'queue': queue
+        })
+
+    status_store.set(tr_uuid, 'pending', 0, 'Task queued for processing')
+
+    try:
+        queue_position = job_executor.submit(
+            tr_uuid, transcribe_process_thread, file_path, tr_uuid, model_type, diarize, profile, language,
+            user_id=current_user.id, duration=duration)
+    except QueueFullError as e:
+        status_store.delete(tr_uuid)
+        db.session.delete(transcription)
+        db.session.delete(audio)
+        db.session.commit()
+        if remove_on_reject:
+            os.remove(file_path)
+        return _queue_full_response(e.retry_after)
+    
+    return jsonify({
+        'status': 'success',
+        'message': 'File uploaded successfully. Transcription queued.',
+        'uuid': str(tr_uuid),
+        'transcription_status': 'pending',
+        'queue_position': queue_position
+    })
+
+
+def _upload_options():
+    """Модель, діаризація, профіль і мова з форми або JSON; ValueError, якщо щось не підтримується"""
+    data = request.get_json(silent=True) or request.form
+    model_type = data.get('model', 'base')
+    if model_type not in SUPPORTED_WHISPER_MODELS:
+        raise ValueError(f"Unsupported model: {model_type}")
+    profile = data.get('profile') or DEFAULT_PROFILE
+    if profile not in TRANSCRIPTION_PROFILES:
+        raise ValueError(f"Unsupported profile: {profile}")
+    diarize = str(data.get('diarization', 'true')).lower() != 'false'
+    return {
+        'model': model_type,
+        'diarization': diarize,
+        'profile': profile,
+        'language': normalize_language(data.get('language'))
+    }
+
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Завантаження файлу та запуск асинхронної транскрипції"""
@@ -247,6 +384,14 @@ def upload_file():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
+    try:
+        options = _upload_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if TRANSCRIPTION_BACKEND != 'celery' and job_executor.is_full():
+        return _queue_full_response(job_executor.retry_after())
+
     try:
         tr_uuid = uuid_lib.uuid4()
         
@@ -254,58 +399,15 @@ def upload_file():
         unique_filename = f"{tr_uuid}_{filename}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
 
-        file.save(file_path)
+        file_size, sha256 = save_with_hash(file.stream, file_path)
         
         if not os.path.exists(file_path):
             return jsonify({'error': 'Failed to save file'}), 500
         
         print(f"File saved to: {file_path}")
-        print(f"File size: {os.path.getsize(file_path)} bytes")
-
-        file_size = os.path.getsize(file_path)
-        duration = get_audio_duration(file_path)
-        file_format = filename.split('.')[-1] if '.' in filename else None
-
-        audio = Audio(
-            uuid=tr_uuid,
-            user_id=current_user.id,
-            filename=filename,
-            file_path=file_path,
-            file_size=file_size,
-            duration=duration,
-            format=file_format
-        )
-        db.session.add(audio)
-        db.session.flush() 
-
-        transcription = Transcription(
-            uuid=tr_uuid,
-            user_id=current_user.id,
-            audio_id=audio.id,
-            status="pending"
-        )
-        db.session.add(transcription)
-        db.session.commit()
-
-        transcription_tasks[str(tr_uuid)] = {
-            'status': 'pending',
-            'progress': 0,
-            'message': 'Task queued for processing'
-        }
+        print(f"File size: {file_size} bytes, sha256: {sha256}")
 
-        thread = threading.Thread(
-            target=transcribe_process_thread,
-            args=(file_path, tr_uuid),
-            daemon=True
-        )
-        thread.start()
-        
-        return jsonify({
-            'status': 'success',
-            'message': 'File uploaded successfully. Transcription started.',
-            'uuid': str(tr_uuid),
-            'transcription_status': 'pending'
-        })
+        return _register_upload(current_user, tr_uuid, filename, file_path, file_size, sha256, options)
         
     except Exception as e:
         app.logger.error(f"Upload error: {str(e)}")
@@ -317,6 +419,129 @@ def upload_file():
         return jsonify({'error': str(e)}), 500
 
 
+def _upload_error(e):
+    body = {'error': str(e)}
+    if e.offset is not None:
+        body['offset'] = e.offset
+    return jsonify(body), e.status_code
+
+
+def _upload_session_dict(session):
+    return {
+        'upload_id': session.upload_id,
+        'offset': session.offset,
+        'size': session.size,
+        'part_size': UPLOAD_PART_SIZE,
+        'finalized': session.finalized
+    }
+
+
+@app.route('/uploads', methods=['POST'])
+def init_upload():
+    """Початок відновлюваного завантаження: {filename, size, model, diarization, profile, language}"""
+    current_user = get_current_user_from_token()
+    
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    if not filename:
+        return jsonify({'error': 'No filename'}), 400
+    
+    try:
+        options = _upload_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        session = upload_manager.create(current_user.id, filename, int(data.get('size') or 0), options)
+    except UploadError as e:
+        return _upload_error(e)
+    except ValueError:
+        return jsonify({'error': 'Invalid size'}), 400
+    
+    return jsonify(_upload_session_dict(session)), 201
+
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Скільки байтів уже отримано — з цього зсуву клієнт продовжує"""
+    current_user = get_current_user_from_token()
+    
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    try:
+        return jsonify(_upload_session_dict(upload_manager.get(upload_id, current_user.id)))
+    except UploadError as e:
+        return _upload_error(e)
+
+
+@app.route('/uploads/<upload_id>', methods=['PUT'])
+def upload_part(upload_id):
+    """Частина файлу в тілі запиту; зсув — у ?offset= або заголовку Upload-Offset"""
+    current_user = get_current_user_from_token()
+    
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None or offset < 0:
+        return jsonify({'error': 'Missing or invalid offset'}), 400
+    
+    try:
+        session = upload_manager.write_part(upload_id, current_user.id, offset, request.stream)
+    except UploadError as e:
+        return _upload_error(e)
+    
+    return jsonify(_upload_session_dict(session))
+
+
+@app.route('/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload(upload_id):
+    """Завершує завантаження і ставить транскрипцію в чергу; повторний виклик безпечний"""
+    current_user = get_current_user_from_token()
+    
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    # транскрипція має uuid сесії, тож повтор finalize просто повертає її
+    try:
+        existing = Transcription.query.filter_by(uuid=uuid_lib.UUID(upload_id), user_id=current_user.id).first()
+    except ValueError:
+        return jsonify({'error': 'Upload not found'}), 404
+    if existing:
+        return jsonify({
+            'status': 'success',
+            'message': 'Upload already finalized.',
+            'uuid': str(existing.uuid),
+            'transcription_status': existing.status
+        })
+    
+    if TRANSCRIPTION_BACKEND != 'celery' and job_executor.is_full():
+        return _queue_full_response(job_executor.retry_after())
+    
+    try:
+        session = upload_manager.finalize(upload_id, current_user.id)
+    except UploadError as e:
+        return _upload_error(e)
+    
+    try:
+        print(f"Upload {upload_id} finalized: {session.size} bytes, sha256: {session.sha256}")
+        response = _register_upload(current_user, uuid_lib.UUID(upload_id), session.filename, session.file_path,
+                                    session.size, session.sha256, session.options, remove_on_reject=False)
+        if Transcription.query.filter_by(uuid=uuid_lib.UUID(upload_id)).first():
+            upload_manager.discard(upload_id)
+        return response
+    except Exception as e:
+        app.logger.error(f"Finalize error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/status/<transcription_uuid>', methods=['GET'])
 def get_transcription_status(transcription_uuid):
     """Отримання статусу транскрипції"""
@@ -334,11 +559,13 @@ def get_transcription_status(transcription_uuid):
         if not transcription:
             return jsonify({'error': 'Transcription not found'}), 404
         
-        task_status = transcription_tasks.get(transcription_uuid, {
-            'status': transcription.status,
-            'progress': 100 if transcription.status == 'completed' else 0,
-            'message': f'Status: {transcription.status}'
-        })
+        task_status = status_store.get(transcription_uuid)
+        if task_status is None:
+            task_status = {
+                'status': transcription.status,
+                'progress': 100 if transcription.status == 'completed' else 0,
+                'message': f'Status: {transcription.status}'
+            }
         
         response_data = {
             'status': task_status['status'],
@@ -348,16 +575,37 @@ def get_transcription_status(transcription_uuid):
             'created_at': transcription.created_at.isoformat() if transcription.created_at else None
         }
         
+        if TRANSCRIPTION_BACKEND != 'celery':
+            if task_status['status'] == 'pending':
+                response_data['queue_position'] = job_executor.position(transcription_uuid)
+            queue_wait = job_executor.wait_seconds(transcription_uuid)
+            if queue_wait is not None:
+                response_data['queue_wait_seconds'] = queue_wait
+        
+        # ?partial=true&since=N&epoch=E — сегменти, розпізнані після N-го, поки задача триває;
+        # якщо буфер скинули (відкат на іншу модель), епоха інша і читання йде з нуля
+        if request.args.get('partial', 'false').lower() == 'true' and task_status['status'] == 'processing':
+            since = request.args.get('since', 0, type=int)
+            epoch = status_store.partial_epoch(transcription_uuid)
+            reset = request.args.get('epoch', 0, type=int) != epoch
+            if reset:
+                since = 0
+            segments = status_store.get_partial(transcription_uuid, since)
+            response_data['partial'] = {
+                'segments': segments,
+                'text': ''.join(seg['text'] for seg in segments),
+                'next': since + len(segments),
+                'epoch': epoch,
+                'reset': reset
+            }
+        
         if task_status['status'] == 'completed':
-            if 'result' in task_status:
-                response_data.update(task_status['result'])
-            else:
-                response_data.update({
-                    'text': transcription.text,
-                    'speakers_text': transcription.speakers_text,
-                    'speakers': transcription.speakers_json,
-                    'language': transcription.language
-                })
+            response_data.update({
+                'text': transcription.text,
+                'speakers_text': transcription.speakers_text,
+                'speakers': transcription.speakers_json,
+                'language': transcription.language
+            })
         
         return jsonify(response_data)
         
@@ -366,6 +614,191 @@ def get_transcription_status(transcription_uuid):
         return jsonify({'error': str(e)}), 500
 
 
+def _sse_event(event, data, event_id=None):
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _final_status(transcription):
+    """Фінальна подія з результатом із БД (None, якщо задача ще не завершена)"""
+    if transcription.status == 'completed':
+        return {
+            'status': 'completed',
+            'progress': 100,
+            'message': 'Transcription completed successfully',
+            'uuid': str(transcription.uuid),
+            'text': transcription.text,
+            'speakers_text': transcription.speakers_text,
+            'speakers': transcription.speakers_json,
+            'language': transcription.language
+        }
+    if transcription.status in ('failed', 'cancelled'):
+        return {
+            'status': transcription.status,
+            'progress': 0,
+            'message': f'Transcription {transcription.status}',
+            'uuid': str(transcription.uuid)
+        }
+    return None
+
+
+@app.route('/status/<transcription_uuid>/stream-token', methods=['POST'])
+def issue_stream_token(transcription_uuid):
+    """Короткоживучий токен для ?token= потоку /status/<uuid>/events"""
+    current_user = get_current_user_from_token()
+    
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    transcription = Transcription.query.filter_by(
+        uuid=transcription_uuid,
+        user_id=current_user.id
+    ).first()
+    
+    if not transcription:
+        return jsonify({'error': 'Transcription not found'}), 404
+    
+    return jsonify({
+        'token': generate_stream_token(current_user.id, transcription.uuid),
+        'expires_in': STREAM_TOKEN_TTL_SECONDS
+    })
+
+
+def _stream_user(transcription_uuid):
+    """Користувач потоку SSE: з заголовка Authorization або з токена потоку в ?token=.
+
+    EventSource не вміє передавати заголовки, а в URL основному JWT не місце —
+    там приймається лише токен з /status/<uuid>/stream-token для цієї транскрипції.
+    """
+    current_user = get_current_user_from_token()
+    token = request.args.get('token')
+    if current_user or not token:
+        return current_user
+    user_id = decode_stream_token(token, transcription_uuid)
+    return User.query.filter_by(id=user_id).first() if user_id is not None else None
+
+
+@app.route('/status/<transcription_uuid>/events', methods=['GET'])
+def stream_transcription_status(transcription_uuid):
+    """Потік Server-Sent Events з прогресом транскрипції.
+
+    Події ``progress`` надходять при кожній зміні статусу, ``partial`` —
+    з новими розпізнаними сегментами, ``reset`` — коли проміжний результат
+    скинуто (клієнт очищує накопичений текст); завершальна
+    ``completed``, ``failed`` або ``cancelled`` містить результат і закриває потік.
+    БД читається лише на старті та коли запис статусу відсутній.
+    """
+    current_user = _stream_user(transcription_uuid)
+    
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    transcription = Transcription.query.filter_by(
+        uuid=transcription_uuid,
+        user_id=current_user.id
+    ).first()
+    
+    if not transcription:
+        return jsonify({'error': 'Transcription not found'}), 404
+    
+    final = _final_status(transcription)
+    db.session.remove()
+    
+    def load_final():
+        tr = Transcription.query.filter_by(uuid=transcription_uuid).first()
+        result = _final_status(tr) if tr else None
+        db.session.remove()
+        return result
+    
+    def generate():
+        yield "retry: 2000\n\n"
+        
+        if final:
+            yield _sse_event(final['status'], final)
+            return
+        
+        started = time.time()
+        previous = None
+        # після перепідключення браузер повертає id останньої події — «епоха:кількість надісланих сегментів»
+        epoch, _, count = request.headers.get('Last-Event-ID', '').rpartition(':')
+        epoch = int(epoch) if epoch.isdigit() else 0
+        partial_count = int(count) if count.isdigit() else 0
+        while time.time() - started < SSE_MAX_SECONDS:
+            current = status_store.wait(transcription_uuid, previous, SSE_KEEPALIVE_SECONDS)
+            
+            if current is None or current['status'] in status_store.TERMINAL_STATUSES:
+                # запис зник або задача завершилась — результат беремо з БД
+                result = load_final()
+                if result:
+                    if current and result['status'] == current['status']:
+                        result['message'] = current['message']
+                    yield _sse_event(result['status'], result)
+                    return
+            
+            if current == previous:
+                yield ": keepalive\n\n"
+            elif current is not None:
+                current_epoch = status_store.partial_epoch(transcription_uuid)
+                if current_epoch != epoch:
+                    # буфер скинуто: надіслане раніше вже не дійсне
+                    epoch, partial_count = current_epoch, 0
+                    yield _sse_event('reset', {'epoch': epoch}, event_id=f"{epoch}:0")
+                segments = status_store.get_partial(transcription_uuid, partial_count)
+                if segments:
+                    partial_count += len(segments)
+                    yield _sse_event('partial', {
+                        'segments': segments,
+                        'text': ''.join(seg['text'] for seg in segments),
+                        'next': partial_count,
+                        'epoch': epoch
+                    }, event_id=f"{epoch}:{partial_count}")
+                yield _sse_event('progress', dict(current, uuid=transcription_uuid))
+            previous = current
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/models', methods=['GET'])
+def get_loaded_models():
+    """Статистика завантажених моделей у цьому процесі"""
+    current_user = get_current_user_from_token()
+    
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify({
+        'status': 'success',
+        'device': model_registry.device,
+        'models': model_registry.stats(),
+        'whisper_cache': model_registry.whisper_cache_stats(),
+        'asr_batching': whisper_batcher.stats(),
+        'cpu': core_governor.stats(),
+        'queue': job_executor.stats(),
+        'status_store': status_store.stats(),
+        'supported_models': list(SUPPORTED_WHISPER_MODELS),
+        'profiles': TRANSCRIPTION_PROFILES,
+        'default_profile': DEFAULT_PROFILE
+    })
+
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Лічильники кешу дедуплікації завантажень"""
+    current_user = get_current_user_from_token()
+    
+    if not current_user:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    return jsonify({
+        'status': 'success',
+        'dedup': dedup_cache.stats(),
+        'remote_audio': remote_audio_cache.stats()
+    })
+
+
 @app.route('/audio/<audio_uuid>', methods=['GET'])
 def get_audio(audio_uuid):
     """Отримання інформації про аудіофайл"""
@@ -0,0 +1,172 @@
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import numpy as np
+import torch
+
+from cpu_governor import core_governor
+
+
+logger = logging.getLogger(__name__)
+
+
+# 'openai-whisper' (PyTorch) або 'faster-whisper' (CTranslate2)
+ASR_ENGINE = os.getenv('ASR_ENGINE', 'openai-whisper').lower()
+# CTranslate2: тип обчислень (int8 на CPU, float16 на GPU за замовчуванням) і потоки
+CT2_COMPUTE_TYPE = os.getenv('CT2_COMPUTE_TYPE', '')
+CT2_CPU_THREADS = int(os.getenv('CT2_CPU_THREADS', '0'))
+CT2_NUM_WORKERS = int(os.getenv('CT2_NUM_WORKERS', '1'))
+CT2_MODEL_DIR = os.getenv('CT2_MODEL_DIR') or None
+
+ASR_ENGINES = ('openai-whisper', 'faster-whisper')
+
+# Байтів на параметр для оцінки пам'яті моделей CTranslate2
+_CT2_BYTES_PER_PARAM = {'int8': 1, 'int8_float32': 1, 'int8_float16': 1, 'int8_bfloat16': 1,
+                        'float16': 2, 'bfloat16': 2, 'float32': 4}
+
+# Параметри transcribe() openai-whisper, які розуміє faster-whisper (з перейменуваннями)
+_FASTER_WHISPER_OPTIONS = {
+    'language': 'language',
+    'task': 'task',
+    'beam_size': 'beam_size',
+    'best_of': 'best_of',
+    'patience': 'patience',
+    'length_penalty': 'length_penalty',
+    'temperature': 'temperature',
+    'compression_ratio_threshold': 'compression_ratio_threshold',
+    'logprob_threshold': 'log_prob_threshold',
+    'no_speech_threshold': 'no_speech_threshold',
+    'condition_on_previous_text': 'condition_on_previous_text',
+    'initial_prompt': 'initial_prompt',
+    'suppress_tokens': 'suppress_tokens',
+    'without_timestamps': 'without_timestamps',
+    'word_timestamps': 'word_timestamps',
+    'prepend_punctuations': 'prepend_punctuations',
+    'append_punctuations': 'append_punctuations',
+}
+
+
+def torch_weights_bytes(model: Any) -> int:
+    """Розмір ваг і буферів torch-модуля у байтах (разом з упакованими int8-вагами)"""
+    if not isinstance(model, torch.nn.Module):
+        return 0
+    tensors = list(model.parameters()) + list(model.buffers())
+    for module in model.modules():
+        # ваги квантованих шарів не є parameters(): вони запаковані для fbgemm/qnnpack
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            tensors.extend(t for t in module._weight_bias() if t is not None)
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class AsrEngine(ABC):
+    """Рушій розпізнавання мовлення.
+
+    ``transcribe(audio, **options)`` приймає 16 кГц моно float32 і параметри
+    ``model.transcribe`` openai-whisper, а повертає ту саму схему:
+    ``{'text', 'language', 'segments': [{'id', 'seek', 'start', 'end', 'text',
+    'tokens', 'temperature', 'avg_logprob', 'compression_ratio',
+    'no_speech_prob', 'words'?}]}``. Тому вікна, шматки, діаризація і
+    збереження результату від рушія не залежать.
+    """
+
+    name = ''
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        ...
+
+    def weights_bytes(self) -> int:
+        return 0
+
+
+class OpenAIWhisperEngine(AsrEngine):
+    """PyTorch-модель openai-whisper (fp32/fp16 або з int8-лінійними шарами)"""
+
+    name = 'openai-whisper'
+
+    def __init__(self, model: torch.nn.Module):
+        self.model = model
+
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        return self.model.transcribe(audio, **options)
+
+    def weights_bytes(self) -> int:
+        return torch_weights_bytes(self.model)
+
+
+class FasterWhisperEngine(AsrEngine):
+    """faster-whisper на CTranslate2: int8 на CPU і власні потоки обчислень.
+
+    ``cpu_threads`` — потоки всередині одного виклику (0 — ядра процесу з
+    ``core_governor``, поділені між ``num_workers``), ``num_workers`` — скільки
+    викликів модель обслуговує паралельно. CTranslate2 фіксує потоки при
+    створенні моделі, бюджети torch (``limit_threads``) на них не впливають.
+    """
+
+    name = 'faster-whisper'
+
+    def __init__(self, name: str, device: str = 'cpu', compute_type: str = CT2_COMPUTE_TYPE,
+                 cpu_threads: int = CT2_CPU_THREADS, num_workers: int = CT2_NUM_WORKERS,
+                 download_root: Optional[str] = CT2_MODEL_DIR, params: int = 0):
+        from faster_whisper import WhisperModel
+
+        self.compute_type = compute_type or ('float16' if device == 'cuda' else 'int8')
+        if not cpu_threads:
+            # 0 у CTranslate2 — усі ядра машини, поза розподілом між процесами і задачами
+            cpu_threads = max(len(core_governor.cores) // max(num_workers, 1), 1)
+        self.cpu_threads = cpu_threads
+        self.model = WhisperModel(name, device=device, compute_type=self.compute_type,
+                                  cpu_threads=cpu_threads, num_workers=num_workers,
+                                  download_root=download_root)
+        self.params = params
+
+    @staticmethod
+    def _options(options: Dict[str, Any]) -> Dict[str, Any]:
+        converted = {}
+        for key, value in options.items():
+            if key in _FASTER_WHISPER_OPTIONS:
+                converted[_FASTER_WHISPER_OPTIONS[key]] = value
+            elif key not in ('fp16', 'verbose'):
+                logger.debug(f"Option {key} is not supported by faster-whisper, ignored")
+        # у openai-whisper None означає жадібний пошук і один семпл
+        converted['beam_size'] = converted.get('beam_size') or 1
+        converted['best_of'] = converted.get('best_of') or 1
+        if isinstance(converted.get('temperature'), tuple):
+            converted['temperature'] = list(converted['temperature'])
+        return converted
+
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        options = self._options(options)
+        segments, info = self.model.transcribe(np.asarray(audio, dtype=np.float32), **options)
+
+        result_segments = []
+        for segment in segments:
+            item = {
+                'id': segment.id,
+                'seek': segment.seek,
+                'start': segment.start,
+                'end': segment.end,
+                'text': segment.text,
+                'tokens': list(segment.tokens),
+                'temperature': segment.temperature,
+                'avg_logprob': segment.avg_logprob,
+                'compression_ratio': segment.compression_ratio,
+                'no_speech_prob': segment.no_speech_prob
+            }
+            if options.get('word_timestamps'):
+                item['words'] = [
+                    {'word': word.word, 'start': word.start, 'end': word.end, 'probability': word.probability}
+                    for word in segment.words or []
+                ]
+            result_segments.append(item)
+
+        return {
+            'text': ''.join(segment['text'] for segment in result_segments),
+            'segments': result_segments,
+            'language': info.language
+        }
+
+    def weights_bytes(self) -> int:
+        return self.params * _CT2_BYTES_PER_PARAM.get(self.compute_type, 4)
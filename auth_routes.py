@@ -15,6 +15,10 @@ JWT_SECRET = str(JWT_SECRET_RAM)
 
 print(f"JWT_SECRET type: {type(JWT_SECRET)}, value: {JWT_SECRET[:10]}...")
 
+# Токени потоку статусу (?token= у /status/<uuid>/events): лише для однієї транскрипції і недовго
+STREAM_TOKEN_SCOPE = 'status-stream'
+STREAM_TOKEN_TTL_SECONDS = int(os.getenv('STREAM_TOKEN_TTL_SECONDS', '60'))
+
 def token_required(f):
     """Декоратор для захищених маршрутів"""
     @wraps(f)
@@ -29,6 +33,9 @@ def token_required(f):
                 token = token[7:]
             
             data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+            if data.get('scope'):
+                # токен потоку статусу не замінює основний JWT
+                raise jwt.InvalidTokenError('Scoped token')
             user_id = data['user_id']
             
             current_user = User.query.filter_by(id=user_id).first()
@@ -94,6 +101,32 @@ def generate_token(user):
         traceback.print_exc()
         raise
 
+
+def generate_stream_token(user_id, transcription_uuid, ttl=STREAM_TOKEN_TTL_SECONDS):
+    """Генерує короткоживучий токен потоку статусу однієї транскрипції.
+
+    EventSource не передає заголовків, тож токен іде в URL і осідає в логах
+    проксі та історії браузера — основний JWT туди не потрапляє.
+    """
+    payload = {
+        'user_id': user_id,
+        'transcription_uuid': str(transcription_uuid),
+        'scope': STREAM_TOKEN_SCOPE,
+        'exp': datetime.utcnow() + timedelta(seconds=ttl)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
+
+
+def decode_stream_token(token, transcription_uuid):
+    """id користувача з токена потоку або None, якщо токен недійсний чи виданий для іншої транскрипції"""
+    try:
+        data = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    if data.get('scope') != STREAM_TOKEN_SCOPE or data.get('transcription_uuid') != str(transcription_uuid):
+        return None
+    return data.get('user_id')
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
@@ -0,0 +1,292 @@
+import os
+import time
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import N_FRAMES, N_SAMPLES, SAMPLE_RATE
+from whisper.tokenizer import get_tokenizer
+
+from cpu_governor import core_governor, limit_threads
+from model_registry import ModelRegistry, model_registry
+
+
+logger = logging.getLogger(__name__)
+
+
+# Пакетне розпізнавання коротких записів (до 30 с) з різних задач одного процесу
+ASR_BATCHING = os.getenv('ASR_BATCHING', 'true').lower() == 'true'
+ASR_BATCH_SIZE = int(os.getenv('ASR_BATCH_SIZE', '8'))
+# Скільки найстаріший запит чекає на сусідів по пакету, мс
+ASR_BATCH_MAX_WAIT_MS = float(os.getenv('ASR_BATCH_MAX_WAIT_MS', '50'))
+
+# Крок часових токенів Whisper, с
+TIME_PRECISION = 0.02
+
+# Параметри transcribe(), які пакетний шлях відтворює; з іншими запис іде звичайним шляхом
+_BATCH_OPTIONS = ('language', 'task', 'beam_size', 'best_of', 'patience', 'temperature', 'fp16',
+                  'compression_ratio_threshold', 'logprob_threshold', 'no_speech_threshold')
+# Не впливають на одне 30-секундне вікно
+_IGNORED_OPTIONS = ('condition_on_previous_text', 'verbose', 'word_timestamps')
+
+
+def _batch_key(model_name: str, options: Dict[str, Any]) -> Optional[Tuple]:
+    """Ключ сумісності запитів у пакеті; None — запит не можна пакетувати"""
+    if options.get('word_timestamps'):
+        return None
+    if any(key not in _BATCH_OPTIONS and key not in _IGNORED_OPTIONS for key in options):
+        return None
+    return (model_name, tuple(sorted((k, v) for k, v in options.items() if k in _BATCH_OPTIONS)))
+
+
+def split_segments(tokens: List[int], tokenizer, duration: float) -> List[Dict[str, Any]]:
+    """Сегменти з часовими межами за часовими токенами одного вікна.
+
+    Зазвичай токени йдуть парами ``<|s|> текст <|e|>``; текст без закривної
+    мітки закінчується разом із записом.
+    """
+    segments = []
+    text_tokens: List[int] = []
+    start: Optional[float] = None
+    last_end = 0.0
+
+    def close(end: float) -> None:
+        text = tokenizer.decode(text_tokens)
+        if text.strip():
+            begin = last_end if start is None else start
+            segments.append({'start': min(begin, duration), 'end': min(max(end, begin), duration),
+                             'text': text, 'tokens': list(text_tokens)})
+
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            t = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+            if text_tokens:
+                close(t)
+                text_tokens = []
+                start = None
+                last_end = t
+            elif start is None:
+                start = t
+        else:
+            text_tokens.append(token)
+    if text_tokens:
+        close(duration)
+    return segments
+
+
+def log_mel(audio: torch.Tensor, n_mels: int) -> torch.Tensor:
+    """Мел одного вікна так само, як у ``whisper.transcribe``.
+
+    Спектрограма рахується з доповненням нулями і лише потім обрізається до
+    вмісту та доводиться до 30 с нульовими кадрами; доповнення запису перед
+    спектрограмою дає інші кадри на межі і (після нормалізації за максимумом)
+    інший рівень тиші, тож результат розходився б із ``transcribe``.
+    """
+    mel = whisper.log_mel_spectrogram(audio, n_mels=n_mels, padding=N_SAMPLES)
+    content_frames = mel.shape[-1] - N_FRAMES
+    return whisper.pad_or_trim(mel[:, :content_frames], N_FRAMES)
+
+
+class _Request:
+    def __init__(self, key: Tuple, mel: torch.Tensor, duration: float, budget: Optional[Dict[str, Any]] = None):
+        self.key = key
+        self.mel = mel
+        self.duration = duration
+        self.budget = budget
+        self.future: Future = Future()
+        self.submitted = time.monotonic()
+
+
+class WhisperBatcher:
+    """Пакетний сервер Whisper усередині процесу воркера.
+
+    Потоки задач (JobExecutor, Celery з ``-P threads``) здають сюди короткі
+    записи — одне 30-секундне вікно — і чекають на результат. Диспетчер
+    збирає сумісні запити (та сама модель і параметри декодування) у пакет
+    до ``batch_size``, але найстаріший чекає не довше ``max_wait_ms``.
+    Пакет проходить енкодер і декодер за один виклик ``whisper.decode``
+    (з тим самим відкатом по температурах, що й ``transcribe``), а сегменти
+    повертаються кожній задачі у схемі ``transcribe``.
+    """
+
+    def __init__(self, registry: ModelRegistry = None, batch_size: int = ASR_BATCH_SIZE,
+                 max_wait_ms: float = ASR_BATCH_MAX_WAIT_MS, enabled: bool = ASR_BATCHING):
+        self.registry = registry or model_registry
+        self.batch_size = max(batch_size, 1)
+        self.max_wait = max_wait_ms / 1000.0
+        self.enabled = enabled
+        self._pending: List[_Request] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.batched = 0
+        self.batches = 0
+        self.max_batch = 0
+
+    def accepts(self, audio: np.ndarray, model_name: str, options: Dict[str, Any]) -> bool:
+        """Чи піде запис пакетним шляхом: короткий, рушій openai-whisper, сумісні параметри"""
+        return (self.enabled and self.registry.engine == 'openai-whisper'
+                and len(audio) <= N_SAMPLES and _batch_key(model_name, options) is not None)
+
+    def client(self, model_name: str) -> "BatchedWhisper":
+        return BatchedWhisper(self, model_name)
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="whisper-batcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, model_name: str, audio: np.ndarray, options: Dict[str, Any]) -> Future:
+        key = _batch_key(model_name, options)
+        if key is None or len(audio) > N_SAMPLES:
+            raise ValueError("Request cannot be batched")
+
+        # мел рахується в потоці задачі, паралельно з іншими
+        n_mels = self.registry.whisper(model_name).model.dims.n_mels
+        audio = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32))
+        mel = log_mel(audio, n_mels)
+        # бюджет ядер задачі, від імені якої диспетчер рахуватиме пакет
+        request = _Request(key, mel, len(audio) / SAMPLE_RATE, core_governor.current())
+
+        with self._cond:
+            self._ensure_started()
+            self._pending.append(request)
+            self.requests += 1
+            self._cond.notify_all()
+        return request.future
+
+    def _next_batch(self) -> List[_Request]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            first = self._pending[0]
+            deadline = first.submitted + self.max_wait
+            while True:
+                batch = [r for r in self._pending if r.key == first.key][:self.batch_size]
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            for request in batch:
+                self._pending.remove(request)
+            self.batches += 1
+            self.batched += len(batch)
+            self.max_batch = max(self.max_batch, len(batch))
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            try:
+                model_name, options = batch[0].key[0], dict(batch[0].key[1])
+                # пакет рахується в потоці диспетчера: йому — ядра всіх задач пакета
+                limit_threads(core_governor.shared_threads([r.budget for r in batch]))
+                with self.registry.acquire_whisper(model_name) as engine:
+                    results = self._decode(engine.model, [r.mel for r in batch], options)
+                for request, (decoded, temperature) in zip(batch, results):
+                    request.future.set_result(self._result(engine.model, decoded, temperature,
+                                                            request.duration, options))
+            except Exception as e:
+                logger.error(f"Batched transcription of {len(batch)} requests failed: {str(e)}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    @staticmethod
+    def _decode(model, mels: List[torch.Tensor], options: Dict[str, Any]) -> List[Tuple[Any, float]]:
+        """Пакетне декодування з відкатом по температурах, як у ``whisper.transcribe``"""
+        temperatures = options.get('temperature', (0.0, 0.2, 0.4, 0.6, 0.8, 1.0))
+        if not isinstance(temperatures, (list, tuple)):
+            temperatures = (temperatures,)
+        compression_threshold = options.get('compression_ratio_threshold', 2.4)
+        logprob_threshold = options.get('logprob_threshold', -1.0)
+        no_speech_threshold = options.get('no_speech_threshold', 0.6)
+
+        mel = torch.stack(mels).to(model.device)
+        final: List[Optional[Tuple[Any, float]]] = [None] * len(mels)
+        remaining = list(range(len(mels)))
+        for temperature in temperatures:
+            kwargs = {
+                'task': options.get('task', 'transcribe'),
+                'language': options.get('language'),
+                'fp16': options.get('fp16', False),
+                'temperature': temperature
+            }
+            if temperature > 0:
+                kwargs['best_of'] = options.get('best_of')
+            else:
+                kwargs['beam_size'] = options.get('beam_size')
+                kwargs['patience'] = options.get('patience')
+            decoded = whisper.decode(model, mel[remaining], whisper.DecodingOptions(**kwargs))
+
+            retry = []
+            for index, result in zip(remaining, decoded):
+                final[index] = (result, temperature)
+                failed = ((compression_threshold is not None and result.compression_ratio > compression_threshold)
+                          or (logprob_threshold is not None and result.avg_logprob < logprob_threshold))
+                # тиша: повтор з іншою температурою не допоможе
+                if no_speech_threshold is not None and result.no_speech_prob > no_speech_threshold:
+                    failed = False
+                if failed:
+                    retry.append(index)
+            remaining = retry
+            if not remaining:
+                break
+        return final
+
+    @staticmethod
+    def _result(model, decoded, temperature: float, duration: float, options: Dict[str, Any]) -> Dict[str, Any]:
+        no_speech_threshold = options.get('no_speech_threshold', 0.6)
+        logprob_threshold = options.get('logprob_threshold', -1.0)
+        silent = (no_speech_threshold is not None and decoded.no_speech_prob > no_speech_threshold
+                  and (logprob_threshold is None or decoded.avg_logprob < logprob_threshold))
+
+        segments = []
+        if not silent:
+            tokenizer = get_tokenizer(model.is_multilingual, num_languages=getattr(model, 'num_languages', 99),
+                                      language=decoded.language, task=options.get('task', 'transcribe'))
+            for i, segment in enumerate(split_segments(decoded.tokens, tokenizer, duration)):
+                segment.update(id=i, seek=0, temperature=temperature, avg_logprob=decoded.avg_logprob,
+                               compression_ratio=decoded.compression_ratio, no_speech_prob=decoded.no_speech_prob)
+                segments.append(segment)
+
+        return {
+            'text': ''.join(segment['text'] for segment in segments),
+            'segments': segments,
+            'language': decoded.language
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'enabled': self.enabled,
+                'batch_size': self.batch_size,
+                'max_wait_ms': round(self.max_wait * 1000),
+                'requests': self.requests,
+                'batches': self.batches,
+                'avg_batch': round(self.batched / self.batches, 2) if self.batches else 0.0,
+                'max_batch': self.max_batch,
+                'queued': len(self._pending)
+            }
+
+
+class BatchedWhisper:
+    """Модель для ``transcribe_windowed``: кожен виклик іде через пакетний сервер"""
+
+    def __init__(self, batcher: WhisperBatcher, model_name: str):
+        self.batcher = batcher
+        self.model_name = model_name
+
+    def transcribe(self, audio: np.ndarray, **options) -> Dict[str, Any]:
+        if not self.batcher.accepts(audio, self.model_name, options):
+            # напр. вікно з initial_prompt — звичайним шляхом
+            with self.batcher.registry.acquire_whisper(self.model_name) as engine:
+                return engine.transcribe(audio, **options)
+        return self.batcher.submit(self.model_name, audio, options).result()
+
+
+whisper_batcher = WhisperBatcher()
@@ -0,0 +1,100 @@
+"""Вирівнювання сегментів Whisper з репліками мовців: індекс проти повного перебору.
+
+    python benchmarks/bench_alignment.py --hours 10
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speaker_diarization import assign_speakers, format_speakers_text
+
+
+def synthetic_data(hours: float, speakers: int = 4, seed: int = 0):
+    """Сегменти Whisper (~5 с) і репліки (~3 с) з паузами та перекриттями"""
+    rng = random.Random(seed)
+    total = hours * 3600
+
+    turns = []
+    t = 0.0
+    while t < total:
+        length = rng.uniform(0.5, 6.0)
+        turns.append({'start': t, 'end': t + length, 'speaker': f"S{rng.randrange(speakers)}"})
+        t += length + rng.uniform(-0.3, 1.5)
+
+    segments = []
+    t = 0.0
+    while t < total:
+        length = rng.uniform(1.0, 9.0)
+        segments.append({'start': round(t, 2), 'end': round(t + length, 2), 'text': f" word {len(segments)}"})
+        t += length + rng.uniform(0.0, 2.0)
+
+    turns.sort(key=lambda x: x['start'])
+    return segments, turns
+
+
+def naive_assign(segments, speaker_turns, speaker_map):
+    """Попередня реалізація: кожен сегмент проти кожної репліки"""
+    all_segments = []
+    for segment in sorted(segments, key=lambda x: x['start']):
+        seg_start = segment['start']
+        seg_end = segment['end']
+        overlaps = []
+        for turn in speaker_turns:
+            overlap_start = max(seg_start, turn['start'])
+            overlap_end = min(seg_end, turn['end'])
+            if overlap_start < overlap_end:
+                overlaps.append({'speaker': turn['speaker'], 'duration': overlap_end - overlap_start})
+        if overlaps:
+            speaker_durations = defaultdict(float)
+            for ov in overlaps:
+                speaker_durations[ov['speaker']] += ov['duration']
+            speaker = max(speaker_durations.items(), key=lambda x: x[1])[0]
+        else:
+            speaker = min(speaker_turns, key=lambda x: min(abs(x['start'] - seg_start),
+                                                           abs(x['end'] - seg_end)))['speaker']
+        all_segments.append({'start': seg_start, 'end': seg_end,
+                             'speaker': speaker_map[speaker], 'text': segment['text']})
+
+    text_output = ""
+    current_speaker = None
+    for seg in sorted(all_segments, key=lambda x: x['start']):
+        if seg['speaker'] != current_speaker:
+            text_output += f"\n=== {seg['speaker']} ===\n"
+            current_speaker = seg['speaker']
+        text_output += f"[{seg['start']:.2f}-{seg['end']:.2f}] {seg['text']}\n"
+    return all_segments, text_output.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hours', type=float, default=10.0)
+    parser.add_argument('--skip-naive', action='store_true')
+    args = parser.parse_args()
+
+    segments, turns = synthetic_data(args.hours)
+    speaker_map = {s: s.replace('S', 'SPEAKER_0') for s in {t['speaker'] for t in turns}}
+    print(f"{len(segments)} segments, {len(turns)} speaker turns ({args.hours:g} h)")
+
+    started = time.perf_counter()
+    indexed = assign_speakers(segments, turns, speaker_map)
+    indexed_text = format_speakers_text(indexed)
+    indexed_time = time.perf_counter() - started
+    print(f"indexed: {indexed_time:.3f} s")
+
+    if args.skip_naive:
+        return
+
+    started = time.perf_counter()
+    naive, naive_text = naive_assign(segments, turns, speaker_map)
+    naive_time = time.perf_counter() - started
+    print(f"naive:   {naive_time:.3f} s  (speedup x{naive_time / indexed_time:.0f})")
+    print(f"identical output: {indexed == naive and indexed_text == naive_text}")
+
+
+if __name__ == '__main__':
+    main()
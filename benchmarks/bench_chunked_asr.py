@@ -0,0 +1,63 @@
+"""Порівняння довгого режиму (шматки + пул процесів) з одним проходом Whisper.
+
+    python benchmarks/bench_chunked_asr.py meeting.mp3 --model base --chunk 300 --workers 4
+"""
+import os
+import sys
+import time
+import difflib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_processing import SAMPLE_RATE
+from chunked_transcription import transcribe_chunked
+from model_registry import model_registry
+from transcribe import load_audio
+
+
+def word_agreement(reference: str, hypothesis: str) -> float:
+    """Частка слів, що збігаються після вирівнювання"""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    matcher = difflib.SequenceMatcher(a=ref, b=hyp, autojunk=False)
+    matched = sum(block.size for block in matcher.get_matching_blocks())
+    return matched / max(len(ref), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--chunk', type=float, default=300.0, help='chunk length in seconds')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    audio = load_audio(args.file)
+    options = {'word_timestamps': True, 'fp16': model_registry.device == 'cuda', 'temperature': 1}
+    print(f"Duration: {len(audio) / SAMPLE_RATE:.1f} s")
+
+    started = time.perf_counter()
+    with model_registry.acquire_whisper(args.model) as model:
+        single = model.transcribe(audio, **options)
+    single_time = time.perf_counter() - started
+    print(f"single pass: {single_time:.1f} s, {len(single['segments'])} segments")
+
+    # перший виклик створює пул і вантажить моделі у воркерах
+    transcribe_chunked(audio[:SAMPLE_RATE], args.model, options, args.chunk, args.workers)
+
+    started = time.perf_counter()
+    chunked = transcribe_chunked(audio, args.model, options, args.chunk, args.workers)
+    chunked_time = time.perf_counter() - started
+    print(f"chunked:     {chunked_time:.1f} s, {len(chunked['segments'])} segments "
+          f"(speedup x{single_time / chunked_time:.2f})")
+
+    print(f"language:    {single['language']} / {chunked['language']}")
+    print(f"word agreement: {word_agreement(single['text'], chunked['text']) * 100:.1f}%")
+
+    last_single = single['segments'][-1]['end'] if single['segments'] else 0.0
+    last_chunked = chunked['segments'][-1]['end'] if chunked['segments'] else 0.0
+    print(f"last segment end: {last_single:.2f} s / {last_chunked:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Пропускна здатність CPU при кількох одночасних задачах: без розподілу ядер і з ``core_governor``.
+
+    python benchmarks/bench_concurrency.py meeting.mp3 --model base --jobs 1,2,4
+
+Кожен рівень паралельності запускає N потоків, кожен зі своєю копією моделі
+(як N задач у JobExecutor). ``default`` — кожна задача бере всі ядра,
+``governed`` — ядра діляться між задачами. Друкує таблицю в markdown:
+секунд аудіо за секунду часу, середній RTF задачі і прискорення.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whisper
+
+from audio_processing import SAMPLE_RATE
+from cpu_governor import CoreGovernor, limit_threads
+from decoding_profiles import decode_options
+from transcribe import load_audio
+
+
+# ядра процесу з урахуванням CPU_CORES і affinity
+CORES = CoreGovernor().cores
+
+
+def _run(models, audio, options, governor=None):
+    """Час кожної задачі і загальний час рівня"""
+    times = [0.0] * len(models)
+    barrier = threading.Barrier(len(models))
+
+    def job(i):
+        job_id = f"bench-{i}"
+        if governor is None:
+            limit_threads(len(CORES))
+            barrier.wait()
+            started = time.perf_counter()
+            models[i].transcribe(audio, **options)
+        else:
+            with governor.job(job_id):
+                barrier.wait()
+                governor.apply(job_id, 'asr')
+                started = time.perf_counter()
+                models[i].transcribe(audio, **options)
+        times[i] = time.perf_counter() - started
+
+    threads = [threading.Thread(target=job, args=(i,)) for i in range(len(models))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return times, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--jobs', default='1,2,4', help='concurrency levels')
+    parser.add_argument('--seconds', type=float, default=30.0, help='audio length per job')
+    parser.add_argument('--profile', default='fast')
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.jobs.split(',') if n.strip()]
+    audio = load_audio(args.file)[:int(args.seconds * SAMPLE_RATE)]
+    duration = len(audio) / SAMPLE_RATE
+    options = decode_options(args.profile, 'cpu')
+    print(f"Cores: {len(CORES)}, audio per job: {duration:.1f} s, model: {args.model}")
+
+    models = [whisper.load_model(args.model, device='cpu') for _ in range(max(levels))]
+    # прогрів
+    limit_threads(len(CORES))
+    models[0].transcribe(audio[:SAMPLE_RATE * 5], **options)
+
+    rows = []
+    for jobs in levels:
+        for mode in ('default', 'governed'):
+            governor = CoreGovernor(cores=CORES) if mode == 'governed' else None
+            times, wall = _run(models[:jobs], audio, options, governor)
+            rows.append((jobs, mode, jobs * duration / wall, sum(times) / len(times) / duration, wall))
+            print(f"{jobs} jobs, {mode}: {wall:.1f} s")
+
+    print()
+    print("| jobs | mode | audio s / wall s | mean job RTF | wall, s | speedup vs default |")
+    print("|---|---|---|---|---|---|")
+    baseline = {}
+    for jobs, mode, throughput, rtf, wall in rows:
+        if mode == 'default':
+            baseline[jobs] = throughput
+        print(f"| {jobs} | {mode} | {throughput:.2f} | {rtf:.3f} | {wall:.1f} "
+              f"| {throughput / baseline[jobs]:.2f}x |")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Порівняння векторної нормалізації з попереднім ланцюжком pydub.
+
+    python benchmarks/bench_normalize.py                 # синтетичний сигнал 60 с
+    python benchmarks/bench_normalize.py --seconds 600
+    python benchmarks/bench_normalize.py --file meeting.mp3
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_processing import SAMPLE_RATE, normalize_waveform, normalize_waveform_pydub
+
+
+def synthetic_speech(seconds: float, seed: int = 0) -> np.ndarray:
+    """Мовоподібний сигнал: тон з шумом, що вмикається і вимикається"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    envelope = (np.sin(2 * np.pi * 0.3 * t) > 0) * 0.8 + 0.05
+    voice = 0.5 * np.sin(2 * np.pi * 220 * t) + 0.3 * rng.standard_normal(len(t))
+    return (envelope * voice * 0.3).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=60.0)
+    parser.add_argument('--file', help='audio file to decode instead of a synthetic signal')
+    parser.add_argument('--skip-pydub', action='store_true', help='time only the vectorized path')
+    args = parser.parse_args()
+
+    if args.file:
+        from transcribe import load_audio
+        audio = load_audio(args.file)
+    else:
+        audio = synthetic_speech(args.seconds)
+
+    print(f"Samples: {len(audio)} ({len(audio) / SAMPLE_RATE:.1f} s)")
+
+    started = time.perf_counter()
+    fast = normalize_waveform(audio)
+    fast_time = time.perf_counter() - started
+    print(f"numpy/scipy: {fast_time:.3f} s")
+
+    if args.skip_pydub:
+        return
+
+    started = time.perf_counter()
+    reference = normalize_waveform_pydub(audio)
+    reference_time = time.perf_counter() - started
+    print(f"pydub:       {reference_time:.3f} s  (speedup x{reference_time / fast_time:.1f})")
+
+    diff = fast - reference
+    snr = 10 * np.log10(np.sum(reference.astype(np.float64) ** 2) / max(np.sum(diff.astype(np.float64) ** 2), 1e-20))
+    print(f"max |diff|:  {np.max(np.abs(diff)):.5f}")
+    print(f"SNR vs pydub: {snr:.1f} dB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Швидкість і WER профілів декодування (fast / balanced / accurate).
+
+    python benchmarks/bench_profiles.py meeting.mp3 --reference meeting.txt --model base --language uk
+
+Друкує таблицю в markdown: час, RTF (час / тривалість аудіо) і WER
+відносно еталонного тексту. Без --reference еталоном слугує accurate.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_processing import SAMPLE_RATE
+from decoding_profiles import TRANSCRIPTION_PROFILES, decode_options, normalize_language
+from model_registry import model_registry
+from transcribe import load_audio
+
+
+def _words(text: str) -> list:
+    return re.findall(r"\w+(?:['’]\w+)*", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """(заміни + вставки + видалення) / кількість слів еталону"""
+    ref, hyp = _words(reference), _words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file')
+    parser.add_argument('--reference', help='text file with the reference transcript')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--language', help='language hint, e.g. uk')
+    parser.add_argument('--profiles', default=','.join(TRANSCRIPTION_PROFILES))
+    args = parser.parse_args()
+
+    audio = load_audio(args.file)
+    duration = len(audio) / SAMPLE_RATE
+    language = normalize_language(args.language)
+    profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+    print(f"Duration: {duration:.1f} s, model: {args.model}, language hint: {language or 'auto'}")
+
+    results = {}
+    with model_registry.acquire_whisper(args.model) as model:
+        # прогрів: перший виклик ініціалізує ядра і кеші
+        model.transcribe(audio[:SAMPLE_RATE * 5], **decode_options('fast', model_registry.device, language))
+        for profile in profiles:
+            options = decode_options(profile, model_registry.device, language)
+            started = time.perf_counter()
+            result = model.transcribe(audio, **options)
+            results[profile] = (time.perf_counter() - started, result)
+            print(f"{profile}: {results[profile][0]:.1f} s")
+
+    if args.reference:
+        with open(args.reference, encoding='utf-8') as f:
+            reference = f.read()
+    else:
+        reference = results.get('accurate', next(iter(results.values())))[1]['text']
+
+    print()
+    print("| profile | beam | temperatures | prev. text | word timestamps | time, s | RTF | WER, % |")
+    print("|---|---|---|---|---|---|---|---|")
+    for profile, (elapsed, result) in results.items():
+        settings = TRANSCRIPTION_PROFILES[profile]
+        print(f"| {profile} | {settings['beam_size'] or 'greedy'} | {len(settings['temperature'])} "
+              f"| {'yes' if settings['condition_on_previous_text'] else 'no'} "
+              f"| {'yes' if settings['word_timestamps'] else 'no'} "
+              f"| {elapsed:.1f} | {elapsed / duration:.3f} "
+              f"| {word_error_rate(reference, result['text']) * 100:.1f} |")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Whisper fp32 проти динамічної int8-квантизації на CPU: RTF, пам'ять, збіг тексту.
+
+    python benchmarks/bench_quantization.py meeting.mp3 --model small --threads 8 --ct2
+
+Кожен варіант виконується в окремому процесі, щоб RSS не змішувався.
+int8 міряється двічі: з квантизацією при завантаженні і з дискового кешу.
+З --ct2 додається faster-whisper (CTranslate2, int8).
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_profiles import word_error_rate
+
+
+def _run(variant: str, model_name: str, file: str, threads: int, cache_dir: str, queue) -> None:
+    import torch
+    import whisper
+    from audio_processing import SAMPLE_RATE
+    from decoding_profiles import decode_options
+    from asr_engines import FasterWhisperEngine
+    from model_registry import (_module_bytes, _resident_memory_bytes, load_quantized_whisper,
+                                WHISPER_MODEL_PARAMS)
+    from transcribe import load_audio
+
+    torch.set_num_threads(threads)
+    audio = load_audio(file)
+
+    rss_before = _resident_memory_bytes()
+    started = time.perf_counter()
+    if variant == 'fp32':
+        model = whisper.load_model(model_name, device='cpu')
+    elif variant == 'ct2-int8':
+        model = FasterWhisperEngine(model_name, compute_type='int8', cpu_threads=threads,
+                                    params=WHISPER_MODEL_PARAMS[model_name] * 1_000_000)
+    else:
+        # 'int8' квантує і зберігає в порожній кеш, 'int8-cached' читає звідти
+        model = load_quantized_whisper(model_name, cache_dir)
+    load_time = time.perf_counter() - started
+    model_rss = _resident_memory_bytes() - rss_before
+
+    options = decode_options('balanced', 'cpu')
+    started = time.perf_counter()
+    result = model.transcribe(audio, **options)
+    elapsed = time.perf_counter() - started
+
+    queue.put({
+        'variant': variant,
+        'load_time': load_time,
+        'weights_mb': _module_bytes(model) / (1024 * 1024),
+        'model_rss_mb': model_rss / (1024 * 1024),
+        'peak_rss_mb': _resident_memory_bytes() / (1024 * 1024),
+        'rtf': elapsed / (len(audio) / SAMPLE_RATE),
+        'text': result['text']
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('file')
+    parser.add_argument('--model', default='base')
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--ct2', action='store_true', help='also benchmark faster-whisper int8')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    cache_dir = tempfile.mkdtemp(prefix='whisper_int8_')
+    results = []
+    variants = ('fp32', 'int8', 'int8-cached') + (('ct2-int8',) if args.ct2 else ())
+    for variant in variants:
+        queue = context.Queue()
+        process = context.Process(target=_run,
+                                  args=(variant, args.model, args.file, args.threads, cache_dir, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+        print(f"{variant}: done")
+
+    reference = results[0]['text']
+    print()
+    print("| variant | load, s | weights, MB | model RSS, MB | RTF | WER vs fp32, % |")
+    print("|---|---|---|---|---|---|")
+    for r in results:
+        print(f"| {r['variant']} | {r['load_time']:.1f} | {r['weights_mb']:.0f} | {r['model_rss_mb']:.0f} "
+              f"| {r['rtf']:.3f} | {word_error_rate(reference, r['text']) * 100:.1f} |")
+
+
+if __name__ == '__main__':
+    main()
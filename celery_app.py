@@ -0,0 +1,40 @@
+import os
+
+from celery import Celery
+from kombu import Queue
+
+
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+
+# Окремі черги, щоб короткі записи не чекали за годинними
+SHORT_QUEUE = 'transcription.short'
+LONG_QUEUE = 'transcription.long'
+LONG_AUDIO_QUEUE_THRESHOLD = float(os.getenv('LONG_AUDIO_QUEUE_THRESHOLD', '600'))
+
+
+celery = Celery(
+    'transcription',
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
+    include=['tasks']
+)
+
+celery.conf.update(
+    task_queues=(Queue(SHORT_QUEUE), Queue(LONG_QUEUE)),
+    task_default_queue=SHORT_QUEUE,
+    task_serializer='json',
+    result_serializer='json',
+    accept_content=['json'],
+    # задачі важкі: не резервувати наперед і не губити при падінні воркера
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    result_expires=24 * 3600,
+)
+
+
+def queue_for_duration(duration):
+    """Черга за тривалістю запису (невідома тривалість — як довгий)"""
+    if duration is not None and duration <= LONG_AUDIO_QUEUE_THRESHOLD:
+        return SHORT_QUEUE
+    return LONG_QUEUE
@@ -0,0 +1,231 @@
+import os
+import logging
+import multiprocessing
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_processing import SAMPLE_RATE, split_on_silence
+from cpu_governor import core_governor, split_budget, apply_budget, limit_threads
+
+
+logger = logging.getLogger(__name__)
+
+
+# Режим довгого аудіо: записи довші за поріг діляться на шматки по паузах
+LONG_AUDIO_THRESHOLD = float(os.getenv('LONG_AUDIO_THRESHOLD', '900'))
+CHUNK_SECONDS = float(os.getenv('CHUNK_SECONDS', '300'))
+CHUNK_WORKERS = int(os.getenv('CHUNK_WORKERS', '2'))
+# Розмір вікна, після якого звітуємо прогрес і готові сегменти (0 — одним викликом)
+PROGRESS_WINDOW_SECONDS = float(os.getenv('PROGRESS_WINDOW_SECONDS', '120'))
+
+# Whisper рахує seek у кадрах мел-спектрограми (10 мс)
+_FRAMES_PER_SECOND = 100
+
+# on_segments(нові сегменти, декодовано секунд, всього секунд)
+SegmentsCallback = Callable[[List[Dict[str, Any]], float, float], None]
+
+
+_pools: Dict[Tuple[str, int], ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _init_worker(model_name: str, cores: List[int], workers: int, slots) -> None:
+    """Завантажує модель один раз на процес пулу.
+
+    ``slots`` — спільний лічильник процесів пулу: кожен процес бере наступний
+    номер і свою частку ``cores`` (ядер процесу, що створив пул).
+    """
+    from model_registry import model_registry
+
+    with slots.get_lock():
+        slot = slots.value
+        slots.value += 1
+    # процес пулу має лише свою частку ядер: з неї і потоки CTranslate2 при створенні моделі
+    core_governor.restrict(slot, workers, cores)
+    limit_threads(len(core_governor.cores))
+    model_registry.whisper(model_name)
+
+
+def _transcribe_chunk(model_name: str, audio: np.ndarray, options: Dict[str, Any],
+                      budget: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    from model_registry import model_registry
+
+    apply_budget(budget)
+
+    with model_registry.acquire_whisper(model_name) as model:
+        return model.transcribe(audio, **options)
+
+
+def get_pool(model_name: str, workers: int = CHUNK_WORKERS) -> ProcessPoolExecutor:
+    """Пул процесів з «теплою» моделей, один на (модель, кількість воркерів)"""
+    key = (model_name, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            context = multiprocessing.get_context('spawn')
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(model_name, list(core_governor.cores), workers, context.Value('i', 0))
+            )
+            _pools[key] = pool
+        return pool
+
+
+def shift_segments(segments: List[Dict[str, Any]], offset: float, first_id: int = 0) -> List[Dict[str, Any]]:
+    """Зсуває таймкоди сегментів (і слів) шматка на його початок у записі"""
+    shifted = []
+    for i, segment in enumerate(segments):
+        segment = dict(segment)
+        segment['id'] = first_id + i
+        segment['start'] = segment['start'] + offset
+        segment['end'] = segment['end'] + offset
+        if 'seek' in segment:
+            segment['seek'] = segment['seek'] + int(round(offset * _FRAMES_PER_SECOND))
+        if segment.get('words'):
+            segment['words'] = [
+                dict(word, start=word['start'] + offset, end=word['end'] + offset)
+                for word in segment['words']
+            ]
+        shifted.append(segment)
+    return shifted
+
+
+def merge_chunk_results(results: List[Dict[str, Any]], bounds: List[Tuple[int, int]],
+                        sample_rate: int = SAMPLE_RATE) -> Dict[str, Any]:
+    """Зшиває результати шматків у формат ``{'text', 'segments', 'language'}``"""
+    segments = []
+    languages = Counter()
+    for result, (start, end) in zip(results, bounds):
+        segments.extend(shift_segments(result.get('segments', []), start / sample_rate, len(segments)))
+        if result.get('language'):
+            languages[result['language']] += end - start
+
+    return {
+        'text': ''.join(result.get('text', '') for result in results),
+        'segments': segments,
+        'language': languages.most_common(1)[0][0] if languages else None
+    }
+
+
+def transcribe_chunked(audio: np.ndarray, model_name: str, options: Dict[str, Any],
+                       chunk_seconds: float = CHUNK_SECONDS, workers: int = CHUNK_WORKERS,
+                       sample_rate: int = SAMPLE_RATE, on_segments: Optional[SegmentsCallback] = None,
+                       state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Паралельна транскрипція довгого запису шматками, розрізаними по паузах
+
+    ``on_segments`` отримує сегменти по порядку: шматок віддається, щойно
+    готові всі попередні, а прогрес рахується за всіма завершеними. Якщо
+    колбек перериває роботу (скасування, витіснення), готові шматки
+    лишаються в ``state`` і повторний виклик з ним доробляє лише решту.
+    """
+    state = {} if state is None else state
+    if 'bounds' not in state:
+        state.update(bounds=split_on_silence(audio, chunk_seconds, sample_rate),
+                     results={}, reported=0, segment_count=0)
+    bounds = state['bounds']
+    done: Dict[int, Dict[str, Any]] = state['results']
+    logger.info(f"Long-audio mode: {len(bounds)} chunks ({len(done)} done), {workers} workers")
+
+    pool = get_pool(model_name, workers)
+    # бюджет ядер задачі ділиться між процесами пулу
+    budget = core_governor.current()
+    budgets = split_budget(budget, workers) if budget else [None] * max(workers, 1)
+    futures = {pool.submit(_transcribe_chunk, model_name, audio[start:end], options, budgets[i % len(budgets)]): i
+               for i, (start, end) in enumerate(bounds) if i not in done}
+
+    total = len(audio) / sample_rate
+    decoded = sum(bounds[i][1] - bounds[i][0] for i in done) / sample_rate
+    try:
+        for future in as_completed(futures):
+            i = futures[future]
+            done[i] = future.result()
+            decoded += (bounds[i][1] - bounds[i][0]) / sample_rate
+
+            if on_segments is None:
+                continue
+            ready = []
+            while state['reported'] in done:
+                reported = state['reported']
+                shifted = shift_segments(done[reported].get('segments', []),
+                                         bounds[reported][0] / sample_rate, state['segment_count'])
+                state['segment_count'] += len(shifted)
+                ready.extend(shifted)
+                state['reported'] += 1
+            on_segments(ready, decoded, total)
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return merge_chunk_results([done[i] for i in range(len(bounds))], bounds, sample_rate)
+
+
+def carried_prompt(result: Dict[str, Any]) -> Optional[str]:
+    """Текст вікна, який Whisper лишив би підказкою для наступного сегмента.
+
+    Як у ``whisper.transcribe``: сегмент, декодований з ``temperature > 0.5``,
+    скидає накопичений контекст, тож береться лише текст після нього.
+    """
+    segments = result.get('segments', [])
+    since = 0
+    for i, segment in enumerate(segments):
+        if segment.get('temperature', 0.0) > 0.5:
+            since = i + 1
+    text = ''.join(segment['text'] for segment in segments[since:]).strip()
+    return text or None
+
+
+def transcribe_windowed(model, audio: np.ndarray, options: Dict[str, Any], on_segments: SegmentsCallback,
+                        window_seconds: float = PROGRESS_WINDOW_SECONDS, sample_rate: int = SAMPLE_RATE,
+                        state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Послідовна транскрипція вікнами по паузах зі звітом після кожного вікна.
+
+    Мова визначається на першому вікні і фіксується для решти, як і в
+    одному виклику Whisper. З ``condition_on_previous_text`` текст
+    попереднього вікна стає ``initial_prompt`` наступного (див.
+    ``carried_prompt``), тож вікна декодуються з тим самим контекстом, що
+    й сегменти всередині одного виклику. Готові вікна зберігаються в
+    ``state``, тож перерваний колбеком виклик можна продовжити з останнього
+    завершеного вікна.
+    """
+    total = len(audio) / sample_rate
+    if window_seconds <= 0 or total <= window_seconds:
+        result = model.transcribe(audio, **options)
+        on_segments(result.get('segments', []), total, total)
+        return result
+
+    state = {} if state is None else state
+    if 'bounds' not in state:
+        state.update(bounds=split_on_silence(audio, window_seconds, sample_rate), results=[])
+    bounds = state['bounds']
+    results = state['results']
+
+    options = dict(options)
+    if not options.get('language') and results and results[0].get('language'):
+        options['language'] = results[0]['language']
+    segment_count = sum(len(result.get('segments', [])) for result in results)
+    initial_prompt = options.get('initial_prompt')
+
+    for start, end in bounds[len(results):]:
+        if options.get('condition_on_previous_text', True) and results:
+            options['initial_prompt'] = carried_prompt(results[-1]) or initial_prompt
+        result = model.transcribe(audio[start:end], **options)
+        if not options.get('language') and result.get('language'):
+            options['language'] = result['language']
+        results.append(result)
+
+        shifted = shift_segments(result.get('segments', []), start / sample_rate, segment_count)
+        segment_count += len(shifted)
+        on_segments(shifted, end / sample_rate, total)
+
+    return merge_chunk_results(results, bounds, sample_rate)
+
+
+def should_chunk(audio: np.ndarray, threshold: Optional[float] = None, sample_rate: int = SAMPLE_RATE) -> bool:
+    threshold = LONG_AUDIO_THRESHOLD if threshold is None else threshold
+    return CHUNK_WORKERS > 1 and len(audio) / sample_rate > threshold
@@ -0,0 +1,193 @@
+import os
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+def _available_cores() -> List[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+# Ядра, які ділять між собою задачі цього процесу (0 — усі доступні)
+CPU_CORES = int(os.getenv('CPU_CORES', '0'))
+# Прив'язувати процеси діаризації/шматків до виділених ядер (sched_setaffinity)
+CPU_PINNING = os.getenv('CPU_PINNING', 'false').lower() == 'true'
+# Частка бюджету задачі для ASR, коли паралельно з ним іде діаризація
+ASR_CORE_SHARE = float(os.getenv('ASR_CORE_SHARE', '0.5'))
+TORCH_INTEROP_THREADS = int(os.getenv('TORCH_INTEROP_THREADS', '1'))
+
+STAGES = ('asr', 'diarization')
+
+_interop_lock = threading.Lock()
+_interop_configured = False
+
+
+def limit_threads(threads: int) -> None:
+    """Потоки torch (intra-op) для викликів з поточного потоку; inter-op — один раз на процес.
+
+    З бекендом OpenMP кількість потоків — властивість потоку, що запускає
+    паралельну ділянку, тож кожна задача виставляє свій бюджет сама.
+    """
+    global _interop_configured
+    import torch
+
+    torch.set_num_threads(max(threads, 1))
+    with _interop_lock:
+        if not _interop_configured:
+            _interop_configured = True
+            try:
+                torch.set_num_interop_threads(max(TORCH_INTEROP_THREADS, 1))
+            except RuntimeError:
+                # вже запущено inter-op роботу — лишаємо як є
+                pass
+
+
+def pin(cores: Optional[List[int]]) -> None:
+    """Прив'язує поточний процес (потік) до ядер, якщо ввімкнено CPU_PINNING"""
+    if CPU_PINNING and cores and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            logger.warning(f"Failed to pin to cores {cores}: {str(e)}")
+
+
+def split_budget(budget: Dict[str, Any], parts: int) -> List[Dict[str, Any]]:
+    """Ділить бюджет між ``parts`` процесами пулу (кожному — щонайменше одне ядро)"""
+    parts = max(parts, 1)
+    cores = budget['cores']
+    share = max(len(cores) // parts, 1)
+    return [{'threads': share, 'cores': cores[(i * share) % len(cores):(i * share) % len(cores) + share]}
+            for i in range(parts)]
+
+
+def apply_budget(budget: Optional[Dict[str, Any]]) -> None:
+    """Застосовує бюджет етапу в процесі-виконавці (діаризація, шматки)"""
+    if budget:
+        limit_threads(budget['threads'])
+        pin(budget['cores'])
+
+
+class CoreGovernor:
+    """Розподіл ядер між задачами процесу воркера та етапами всередині задачі.
+
+    Ядра ``cores`` діляться порівну між задачами, що виконуються (суміжними
+    діапазонами в порядку старту); бюджет задачі, де діаризація йде паралельно
+    з ASR, ділиться між етапами у частці ``asr_share``. Задача застосовує бюджет
+    на межах етапів і вікон (``apply``), тож довгі задачі звужуються, коли
+    стартують нові, і розширюються, коли інші завершуються. Сумарна кількість
+    потоків torch не перевищує кількості ядер.
+    """
+
+    def __init__(self, cores: Optional[List[int]] = None, asr_share: float = ASR_CORE_SHARE):
+        available = _available_cores()
+        self.cores = cores or (available[:CPU_CORES] if CPU_CORES else available)
+        self.asr_share = min(max(asr_share, 0.0), 1.0)
+        self._jobs: List[str] = []
+        self._parallel: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def restrict(self, slot: int, slots: int, cores: Optional[List[int]] = None) -> None:
+        """Лишає процесу частку ``slot`` з ``slots`` ядер (для кількох процесів на машині).
+
+        ``cores`` — ядра, які ділять процеси (за замовчуванням — поточні ядра процесу).
+        """
+        cores = cores or self.cores
+        slots = max(slots, 1)
+        share = max(len(cores) // slots, 1)
+        start = (slot % slots) * share
+        self.cores = cores[start:start + share] or cores[-share:]
+        pin(self.cores)
+
+    @contextmanager
+    def job(self, job_id: str, parallel_diarization: bool = False):
+        """Реєструє задачу на час виконання; повертає її поточний бюджет"""
+        job_id = str(job_id)
+        with self._lock:
+            if job_id not in self._jobs:
+                self._jobs.append(job_id)
+            self._parallel[job_id] = parallel_diarization
+        try:
+            yield self.budget(job_id)
+        finally:
+            with self._lock:
+                if job_id in self._jobs:
+                    self._jobs.remove(job_id)
+                self._parallel.pop(job_id, None)
+            self._local.budget = None
+
+    def _job_cores(self, job_id: str) -> List[int]:
+        if job_id not in self._jobs:
+            return list(self.cores)
+        count = len(self._jobs)
+        index = self._jobs.index(job_id)
+        share, extra = divmod(len(self.cores), count)
+        if share == 0:
+            # задач більше, ніж ядер: по одному ядру по колу
+            return [self.cores[index % len(self.cores)]]
+        start = index * share + min(index, extra)
+        return self.cores[start:start + share + (1 if index < extra else 0)]
+
+    def budget(self, job_id: str, stage: str = 'asr') -> Dict[str, Any]:
+        """{'threads', 'cores'} для етапу задачі"""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        job_id = str(job_id)
+        with self._lock:
+            cores = self._job_cores(job_id)
+            parallel = self._parallel.get(job_id, False)
+
+        if parallel and len(cores) > 1:
+            asr_count = min(max(int(round(len(cores) * self.asr_share)), 1), len(cores) - 1)
+            cores = cores[:asr_count] if stage == 'asr' else cores[asr_count:]
+        return {'threads': len(cores), 'cores': cores}
+
+    def apply(self, job_id: str, stage: str = 'asr') -> Dict[str, Any]:
+        """Виставляє потоки torch поточного потоку під бюджет етапу.
+
+        Виставляється щоразу, навіть якщо бюджет не змінився: лінива
+        ініціалізація пулу потоків torch при першій операції в потоці
+        може перезаписати значення, задане до неї.
+        """
+        budget = self.budget(job_id, stage)
+        limit_threads(budget['threads'])
+        self._local.budget = budget
+        return budget
+
+    def shared_threads(self, budgets: List[Optional[Dict[str, Any]]]) -> int:
+        """Потоки для спільної роботи кількох задач (пакет ASR): ядра всіх їхніх бюджетів"""
+        cores = set()
+        for budget in budgets:
+            cores.update(budget['cores'] if budget else self.cores)
+        return max(len(cores), 1)
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """Бюджет, застосований у поточному потоці (None поза задачею)"""
+        return getattr(self._local, 'budget', None)
+
+    def finish_stage(self, job_id: str) -> None:
+        """Паралельна діаризація завершилась — ASR отримує весь бюджет задачі"""
+        with self._lock:
+            if str(job_id) in self._parallel:
+                self._parallel[str(job_id)] = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            jobs = list(self._jobs)
+        return {
+            'cores': len(self.cores),
+            'pinning': CPU_PINNING,
+            'asr_share': self.asr_share,
+            'interop_threads': TORCH_INTEROP_THREADS,
+            'jobs': {job_id: {stage: self.budget(job_id, stage)['threads'] for stage in STAGES} for job_id in jobs}
+        }
+
+
+# Один розподільник на процес воркера
+core_governor = CoreGovernor()
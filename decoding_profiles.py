@@ -0,0 +1,79 @@
+import os
+import logging
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# Профілі декодування Whisper: швидкість проти точності.
+#
+# fast      — жадібний пошук, коротка шкала температур, без контексту попереднього
+#             тексту і без вирівнювання слів
+# balanced  — пучок 3 і повна шкала температур; типовий профіль
+# accurate  — пучок 5, повна шкала і word_timestamps, які уточнюють межі
+#             сегментів (корисно для зіставлення з репліками мовців)
+#
+# Швидкість (RTF) і WER кожного профілю на власних записах вимірює
+# benchmarks/bench_profiles.py — він друкує таблицю в markdown.
+TRANSCRIPTION_PROFILES: Dict[str, Dict[str, Any]] = {
+    'fast': {
+        'beam_size': None,
+        'best_of': None,
+        'temperature': (0.0, 0.4, 0.8),
+        'condition_on_previous_text': False,
+        'word_timestamps': False,
+    },
+    'balanced': {
+        'beam_size': 3,
+        'best_of': 3,
+        'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        'condition_on_previous_text': True,
+        'word_timestamps': False,
+    },
+    'accurate': {
+        'beam_size': 5,
+        'best_of': 5,
+        'temperature': (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        'condition_on_previous_text': True,
+        'word_timestamps': True,
+    },
+}
+
+DEFAULT_PROFILE = os.getenv('TRANSCRIPTION_PROFILE', 'balanced')
+if DEFAULT_PROFILE not in TRANSCRIPTION_PROFILES:
+    # помилка в конфігурації не повинна валити кожне завантаження з ValueError
+    logger.warning(f"Unknown TRANSCRIPTION_PROFILE {DEFAULT_PROFILE!r}, expected one of "
+                   f"{', '.join(TRANSCRIPTION_PROFILES)}; using 'balanced'")
+    DEFAULT_PROFILE = 'balanced'
+
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    """Код мови Whisper з коду або назви ('uk', 'Ukrainian'); None — автовизначення.
+
+    Кидає ValueError для невідомої мови.
+    """
+    if not language or str(language).lower() in ('auto', 'none'):
+        return None
+    from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+
+    language = str(language).lower()
+    if language in LANGUAGES:
+        return language
+    if language in TO_LANGUAGE_CODE:
+        return TO_LANGUAGE_CODE[language]
+    raise ValueError(f"Unsupported language: {language}")
+
+
+def decode_options(profile: Optional[str] = None, device: str = 'cpu',
+                   language: Optional[str] = None) -> Dict[str, Any]:
+    """Аргументи ``model.transcribe`` для профілю; мова-підказка пропускає її визначення"""
+    profile = profile or DEFAULT_PROFILE
+    if profile not in TRANSCRIPTION_PROFILES:
+        raise ValueError(f"Unknown transcription profile: {profile}")
+
+    options = {key: value for key, value in TRANSCRIPTION_PROFILES[profile].items() if value is not None}
+    options['fp16'] = (device == "cuda")
+    if language:
+        options['language'] = language
+    return options
@@ -0,0 +1,112 @@
+import os
+import hashlib
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from models import Audio, Transcription
+
+
+logger = logging.getLogger(__name__)
+
+
+# Скільки днів результати можна перевикористовувати (0 — кеш вимкнено)
+DEDUP_RETENTION_DAYS = int(os.getenv('DEDUP_RETENTION_DAYS', '30'))
+# 'user' — лише власні завантаження користувача, 'global' — будь-чиї
+DEDUP_SCOPE = os.getenv('DEDUP_SCOPE', 'user')
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def save_with_hash(stream, file_path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[int, str]:
+    """Записує потік на диск, рахуючи SHA-256 на льоту; повертає (розмір, хеш)"""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(file_path, 'wb') as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            sha256.update(chunk)
+            f.write(chunk)
+            size += len(chunk)
+    return size, sha256.hexdigest()
+
+
+class DedupCache:
+    """Повторне використання готових транскрипцій для ідентичних файлів"""
+
+    def __init__(self, retention_days: int = DEDUP_RETENTION_DAYS, scope: str = DEDUP_SCOPE):
+        self.retention_days = retention_days
+        self.scope = scope
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    def lookup(self, sha256: str, user_id: int, model: str, diarization: bool,
+               profile: Optional[str] = None, language: Optional[str] = None) -> Optional[Transcription]:
+        """Найсвіжіша завершена транскрипція того самого вмісту з тими ж налаштуваннями.
+
+        Відредаговані користувачем транскрипції не перевикористовуються:
+        їхній текст — уже не результат моделі.
+        """
+        if not self.enabled or not sha256:
+            return None
+
+        query = Transcription.query.join(Audio).filter(
+            Audio.sha256 == sha256,
+            Transcription.status == 'completed',
+            Transcription.is_edited.isnot(True),
+            Transcription.model == model,
+            Transcription.diarization == diarization,
+            Transcription.created_at >= datetime.utcnow() - timedelta(days=self.retention_days)
+        )
+        if profile:
+            query = query.filter(Transcription.profile == profile)
+        if language:
+            query = query.filter(Transcription.language == language)
+        if self.scope != 'global':
+            query = query.filter(Transcription.user_id == user_id)
+
+        source = query.order_by(Transcription.created_at.desc()).first()
+
+        with self._lock:
+            if source:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        return source
+
+    def clone_into(self, source: Transcription, target: Transcription) -> Transcription:
+        """Копіює результати ``source`` у нову транскрипцію"""
+        target.text = source.text
+        target.speakers_text = source.speakers_text
+        target.speakers_json = source.speakers_json
+        target.language = source.language
+        target.model = source.model
+        target.profile = source.profile
+        target.diarization = source.diarization
+        target.quality_report = source.quality_report
+        target.status = "completed"
+        return target
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'scope': self.scope,
+                'retention_days': self.retention_days,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
+
+
+dedup_cache = DedupCache()
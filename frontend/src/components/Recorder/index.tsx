@@ -25,6 +25,59 @@ interface TranscriptionData {
   speakers?: Record<string, Array<{start: number; end: number; text: string}>>;
 }
 
+// Великі файли завантажуємо частинами, щоб після обриву продовжити з місця зупинки
+const CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024;
+const PART_RETRIES = 5;
+
+const uploadInParts = async (file: File, token: string): Promise<Response> => {
+  const headers = { Authorization: `Bearer ${token}` };
+
+  const initResponse = await fetch("http://localhost:5070/uploads", {
+    method: "POST",
+    headers: { ...headers, "Content-Type": "application/json" },
+    body: JSON.stringify({ filename: file.name, size: file.size }),
+  });
+  if (!initResponse.ok) {
+    return initResponse;
+  }
+  const session = await initResponse.json();
+  let offset: number = session.offset;
+  let failures = 0;
+
+  while (offset < file.size) {
+    try {
+      const part = file.slice(offset, offset + session.part_size);
+      const partResponse = await fetch(`http://localhost:5070/uploads/${session.upload_id}?offset=${offset}`, {
+        method: "PUT",
+        headers,
+        body: part,
+      });
+      const partData = await partResponse.json();
+      if (!partResponse.ok && partData.offset === undefined) {
+        throw new Error(partData.error);
+      }
+      // сервер завжди повертає, скільки байтів уже має
+      offset = partData.offset;
+      failures = 0;
+    } catch (error) {
+      failures += 1;
+      if (failures > PART_RETRIES) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+      const statusResponse = await fetch(`http://localhost:5070/uploads/${session.upload_id}`, { headers });
+      if (statusResponse.ok) {
+        offset = (await statusResponse.json()).offset;
+      }
+    }
+  }
+
+  return fetch(`http://localhost:5070/uploads/${session.upload_id}/finalize`, {
+    method: "POST",
+    headers,
+  });
+};
+
 const Recorder: React.FC = () => {
   const { t } = useLanguage()
   const { user, token } = useAuth()
@@ -149,14 +202,16 @@ const Recorder: React.FC = () => {
     formData.append("file", uploadedFile);
     
     try {
-      const response = await fetch("http://localhost:5070/upload", {
-        method: "POST",
-        body: formData,
-        headers: {
-          // 'Accept': 'application/json',
-          Authorization: `Bearer ${token}`,
-        },
-      })
+      const response = uploadedFile.size > CHUNKED_UPLOAD_THRESHOLD
+        ? await uploadInParts(uploadedFile, token)
+        : await fetch("http://localhost:5070/upload", {
+          method: "POST",
+          body: formData,
+          headers: {
+            // 'Accept': 'application/json',
+            Authorization: `Bearer ${token}`,
+          },
+        })
 
       console.log("Response status:", response.status)
 
@@ -199,8 +254,73 @@ const Recorder: React.FC = () => {
         }
       };
 
-      // Починаємо перевіряти статус
-      setTimeout(checkStatus, 2000);
+      // Отримуємо прогрес через SSE; якщо потік недоступний — опитуємо статус кожні 2 секунди
+      if (typeof EventSource === 'undefined') {
+        setTimeout(checkStatus, 2000);
+        return;
+      }
+
+      // У URL іде не основний JWT, а короткоживучий токен лише для цього потоку
+      const streamTokenResponse = await fetch(`http://localhost:5070/status/${transcriptionUuid}/stream-token`, {
+        method: "POST",
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      });
+      if (!streamTokenResponse.ok) {
+        setTimeout(checkStatus, 2000);
+        return;
+      }
+      const { token: streamToken } = await streamTokenResponse.json();
+
+      const events = new EventSource(
+        `http://localhost:5070/status/${transcriptionUuid}/events?token=${encodeURIComponent(streamToken)}`
+      );
+      let finished = false;
+
+      // Проміжний текст з'являється, поки розпізнавання ще триває
+      events.addEventListener('partial', (event) => {
+        const partialData = JSON.parse((event as MessageEvent).data);
+        setTranscription(prev => ({ text: (prev.text || '') + partialData.text }));
+      });
+
+      // Проміжний результат скинуто (напр. відкат на іншу модель) — показуємо його заново
+      events.addEventListener('reset', () => {
+        setTranscription({text: ""});
+      });
+
+      events.addEventListener('completed', (event) => {
+        const statusData = JSON.parse((event as MessageEvent).data);
+        finished = true;
+        events.close();
+        setTranscription({
+          text: statusData.text,
+          speakers_text: statusData.speakers_text,
+          speakers: statusData.speakers
+        });
+        setLoading(false);
+      });
+
+      events.addEventListener('failed', () => {
+        finished = true;
+        events.close();
+        setLoading(false);
+        alert("Transcription failed");
+      });
+
+      events.addEventListener('cancelled', () => {
+        finished = true;
+        events.close();
+        setLoading(false);
+      });
+
+      events.onerror = () => {
+        if (finished || events.readyState !== EventSource.CLOSED) {
+          return;
+        }
+        events.close();
+        setTimeout(checkStatus, 2000);
+      };
 
     } catch (error) {
       console.error("Transcription error:", error);
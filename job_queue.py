@@ -0,0 +1,314 @@
+import os
+import math
+import time
+import threading
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from status_store import status_store
+
+
+logger = logging.getLogger(__name__)
+
+
+TRANSCRIPTION_WORKERS = int(os.getenv('TRANSCRIPTION_WORKERS', '2'))
+TRANSCRIPTION_QUEUE_SIZE = int(os.getenv('TRANSCRIPTION_QUEUE_SIZE', '20'))
+# Початкова оцінка тривалості задачі до появи реальних вимірів
+DEFAULT_JOB_SECONDS = 60.0
+
+# Швидка смуга: записи не довші за поріг мають власні потоки
+FAST_LANE_SECONDS = float(os.getenv('FAST_LANE_SECONDS', '120'))
+FAST_LANE_WORKERS = int(os.getenv('FAST_LANE_WORKERS', '1'))
+# Вартість задачі з невідомою тривалістю аудіо, с
+UNKNOWN_DURATION_SECONDS = float(os.getenv('UNKNOWN_DURATION_SECONDS', '600'))
+# Старіння: скільки секунд «вартості» списується за кожну секунду очікування
+AGING_RATE = float(os.getenv('SCHEDULER_AGING_RATE', '10'))
+# Період напіврозпаду спожитого користувачем часу для справедливого розподілу
+USAGE_HALF_LIFE = float(os.getenv('SCHEDULER_USAGE_HALF_LIFE', '900'))
+FINISHED_WAITS_SIZE = 1000
+# Витіснення: довга задача поступається короткій не частіше ніж раз на PREEMPT_MIN_SECONDS
+PREEMPTION = os.getenv('PREEMPTION', 'true').lower() == 'true'
+PREEMPT_MIN_SECONDS = float(os.getenv('PREEMPT_MIN_SECONDS', '30'))
+MAX_PREEMPTIONS = int(os.getenv('MAX_PREEMPTIONS', '3'))
+
+
+class QueueFullError(Exception):
+    """Черга задач заповнена; клієнту слід повторити пізніше"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Transcription queue is full, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class JobInterrupted(Exception):
+    """Задача перервана в контрольній точці"""
+
+
+class JobCancelled(JobInterrupted):
+    """Користувач скасував задачу"""
+
+
+class JobPreempted(JobInterrupted):
+    """Задача поступилася місцем коротшій і повернеться в чергу"""
+
+
+_local = threading.local()
+
+
+def current_job() -> Optional["Job"]:
+    """Задача, яку виконує поточний потік пулу (None поза пулом)"""
+    return getattr(_local, 'job', None)
+
+
+class Job:
+    def __init__(self, job_id: str, fn: Callable, args: tuple, kwargs: Dict[str, Any],
+                 user_id: Any = None, duration: Optional[float] = None):
+        self.job_id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.user_id = user_id
+        self.duration = duration
+        self.cost = duration if duration else UNKNOWN_DURATION_SECONDS
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.resumed_at: Optional[float] = None
+        self.lane: Optional[str] = None
+        self.preemptions = 0
+        # стан, який задача зберігає між витісненням і відновленням
+        self.checkpoint: Dict[str, Any] = {}
+
+    @property
+    def fast(self) -> bool:
+        return self.duration is not None and self.duration <= FAST_LANE_SECONDS
+
+    @property
+    def wait_seconds(self) -> float:
+        return (self.started_at or time.time()) - self.submitted_at
+
+
+class JobExecutor:
+    """Пул потоків транскрипції з обмеженою чергою і справедливим планувальником.
+
+    Одночасно виконується не більше ``workers`` задач (плюс ``fast_workers``
+    лише для коротких записів), ще ``max_queue`` можуть чекати; понад це
+    ``submit`` кидає ``QueueFullError`` з підказкою, через скільки секунд
+    повторити.
+
+    Наступною береться задача з найменшим балом::
+
+        спожите користувачем + вартість задачі - AGING_RATE * очікування
+
+    де вартість — тривалість аудіо, а спожите — сума вартостей уже
+    запущених задач користувача з напіврозпадом ``USAGE_HALF_LIFE``.
+    Короткі записи і «тихі» користувачі йдуть першими, а старіння не
+    дає довгим задачам голодувати. Якщо короткий запис чекає, а вільних
+    потоків немає, довга задача в найближчій контрольній точці кидає
+    ``JobPreempted`` і повертається в чергу зі своїм ``checkpoint``.
+    """
+
+    def __init__(self, workers: int = TRANSCRIPTION_WORKERS, max_queue: int = TRANSCRIPTION_QUEUE_SIZE,
+                 fast_workers: int = FAST_LANE_WORKERS):
+        self.workers = max(workers, 1)
+        self.fast_workers = max(fast_workers, 0)
+        self.max_queue = max_queue
+        self._pending: List[Job] = []
+        self._running: Dict[str, Job] = {}
+        self._usage: Dict[Any, tuple] = defaultdict(lambda: (0.0, time.time()))
+        self._finished_waits: "OrderedDict[str, float]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._avg_job_seconds = DEFAULT_JOB_SECONDS
+        self._threads = []
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, args=(False,), name=f"transcription-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        for i in range(self.fast_workers):
+            thread = threading.Thread(target=self._worker, args=(True,), name=f"transcription-fast-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _user_usage(self, user_id: Any, now: float) -> float:
+        value, updated = self._usage[user_id]
+        return value * math.pow(0.5, (now - updated) / USAGE_HALF_LIFE) if USAGE_HALF_LIFE > 0 else value
+
+    def _charge(self, user_id: Any, cost: float, now: float) -> None:
+        self._usage[user_id] = (self._user_usage(user_id, now) + cost, now)
+
+    def _score(self, job: Job, now: float) -> float:
+        return self._user_usage(job.user_id, now) + job.cost - AGING_RATE * (now - job.submitted_at)
+
+    def _ordered(self, now: float) -> List[Job]:
+        return sorted(self._pending, key=lambda job: (self._score(job, now), job.submitted_at))
+
+    def _take(self, fast_only: bool) -> Optional[Job]:
+        now = time.time()
+        for job in self._ordered(now):
+            if job.fast or not fast_only:
+                self._pending.remove(job)
+                return job
+        return None
+
+    def _worker(self, fast_only: bool) -> None:
+        while True:
+            with self._cond:
+                job = self._take(fast_only)
+                while job is None:
+                    self._cond.wait()
+                    job = self._take(fast_only)
+                job.resumed_at = time.time()
+                if job.started_at is None:
+                    job.started_at = job.resumed_at
+                    self._charge(job.user_id, job.cost, job.started_at)
+                job.lane = 'fast' if fast_only else 'general'
+                self._running[job.job_id] = job
+
+            _local.job = job
+            preempted = False
+            try:
+                job.fn(*job.args, **job.kwargs)
+            except JobPreempted:
+                preempted = True
+                logger.info(f"Job {job.job_id} preempted, requeued")
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed: {str(e)}")
+            finally:
+                _local.job = None
+                elapsed = time.time() - job.resumed_at
+                with self._cond:
+                    self._running.pop(job.job_id, None)
+                    if preempted:
+                        job.preemptions += 1
+                        self._pending.append(job)
+                        self._cond.notify_all()
+                    else:
+                        self._finished_waits[job.job_id] = job.wait_seconds
+                        while len(self._finished_waits) > FINISHED_WAITS_SIZE:
+                            self._finished_waits.popitem(last=False)
+                        self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+
+    def should_yield(self, job: Job) -> bool:
+        """Чи варто довгій задачі звільнити потік для короткої, що чекає"""
+        if not PREEMPTION or job.fast or job.preemptions >= MAX_PREEMPTIONS:
+            return False
+        with self._cond:
+            if time.time() - job.resumed_at < PREEMPT_MIN_SECONDS:
+                return False
+            now = time.time()
+            waiting_fast = [self._score(pending, now) for pending in self._pending if pending.fast]
+            # поступатися має сенс лише задачі, яку планувальник справді візьме раніше
+            if not waiting_fast or min(waiting_fast) >= self._score(job, now):
+                return False
+            busy_fast, busy_general = self._busy_lanes()
+            return busy_fast >= self.fast_workers and busy_general >= self.workers
+
+    def cancel(self, job_id: str) -> bool:
+        """Прибирає задачу з черги; True, якщо вона ще не почалась"""
+        job_id = str(job_id)
+        with self._cond:
+            for job in self._pending:
+                if job.job_id == job_id and job.started_at is None:
+                    self._pending.remove(job)
+                    return True
+        return False
+
+    def retry_after(self) -> int:
+        """Орієнтовний час (с), за який звільниться місце в черзі"""
+        return max(int(self._avg_job_seconds / self.workers) + 1, 1)
+
+    def is_full(self) -> bool:
+        with self._cond:
+            return len(self._pending) >= self.max_queue
+
+    def _busy_lanes(self) -> Tuple[int, int]:
+        """Зайняті потоки (швидкої смуги, загальні) — за смугою, яка взяла задачу, а не за її тривалістю"""
+        busy_fast = sum(1 for running in self._running.values() if running.lane == 'fast')
+        return busy_fast, len(self._running) - busy_fast
+
+    def _idle_workers(self, job: Job) -> int:
+        busy_fast, busy_general = self._busy_lanes()
+        idle = self.workers - busy_general
+        if job.fast:
+            idle += self.fast_workers - busy_fast
+        return max(idle, 0)
+
+    def submit(self, job_id: str, fn: Callable, *args, user_id: Any = None,
+               duration: Optional[float] = None, **kwargs) -> int:
+        """Ставить задачу в чергу; повертає позицію (0 — вже виконується)
+
+        ``duration`` (тривалість аудіо, с) — оцінка вартості, ``user_id`` —
+        для справедливого розподілу між користувачами.
+        """
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(self.retry_after())
+            self._ensure_started()
+            job = Job(str(job_id), fn, args, kwargs, user_id=user_id, duration=duration)
+            self._pending.append(job)
+            rank = self._ordered(time.time()).index(job) + 1
+            position = max(rank - self._idle_workers(job), 0)
+            self._cond.notify_all()
+
+        return position
+
+    def position(self, job_id: str) -> Optional[int]:
+        """Місце в черзі (1 — наступна); 0 — виконується; None — невідома"""
+        job_id = str(job_id)
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            for index, job in enumerate(self._ordered(time.time())):
+                if job.job_id == job_id:
+                    return index + 1
+        return None
+
+    def wait_seconds(self, job_id: str) -> Optional[float]:
+        """Час у черзі: поточний для очікуючих, фактичний для запущених і завершених"""
+        job_id = str(job_id)
+        with self._cond:
+            if job_id in self._running:
+                return round(self._running[job_id].wait_seconds, 1)
+            if job_id in self._finished_waits:
+                return round(self._finished_waits[job_id], 1)
+            for job in self._pending:
+                if job.job_id == job_id:
+                    return round(job.wait_seconds, 1)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.time()
+            return {
+                'workers': self.workers,
+                'fast_lane_workers': self.fast_workers,
+                'running': len(self._running),
+                'queued': len(self._pending),
+                'queued_fast': sum(1 for job in self._pending if job.fast),
+                'max_queue': self.max_queue,
+                'avg_job_seconds': round(self._avg_job_seconds, 1),
+                'max_wait_seconds': round(max((now - job.submitted_at for job in self._pending), default=0.0), 1)
+            }
+
+
+job_executor = JobExecutor()
+
+
+def request_cancel(job_id: str) -> bool:
+    """Скасовує задачу: прибирає з локальної черги і ставить прапорець для
+    контрольних точок (у т.ч. воркерів Celery); True, якщо задача ще не почалась"""
+    status_store.request_cancel(job_id)
+    return job_executor.cancel(job_id)
+
+
+def interruption_point(job_id: str) -> None:
+    """Контрольна точка між етапами і шматками: скасування або витіснення"""
+    if status_store.is_cancelled(job_id):
+        raise JobCancelled(f"Job {job_id} was cancelled")
+    job = current_job()
+    if job is not None and job.job_id == str(job_id) and job_executor.should_yield(job):
+        raise JobPreempted(f"Job {job_id} yields to a shorter job")
@@ -0,0 +1,35 @@
+"""transcription.quality_report from the audio quality check
+
+Revision ID: 0d5c97312059
+Revises: 63283d2f9d35
+Create Date: 2026-10-17 10:48:12.530417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0d5c97312059'
+down_revision = '63283d2f9d35'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if 'quality_report' in _columns('transcription'):
+        return
+    with op.batch_alter_table('transcription', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('quality_report',
+                                      postgresql.JSONB(astext_type=sa.Text()).with_variant(sa.JSON(), 'sqlite'),
+                                      nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('transcription', schema=None) as batch_op:
+        batch_op.drop_column('quality_report')
@@ -0,0 +1,32 @@
+"""transcription.profile for the decoding profile
+
+Revision ID: 3e5328492135
+Revises: 0d5c97312059
+Create Date: 2026-10-17 11:02:47.914306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e5328492135'
+down_revision = '0d5c97312059'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if 'profile' in _columns('transcription'):
+        return
+    with op.batch_alter_table('transcription', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('profile', sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('transcription', schema=None) as batch_op:
+        batch_op.drop_column('profile')
@@ -0,0 +1,38 @@
+"""audio.codec, sample_rate and channels from container headers
+
+Revision ID: 63283d2f9d35
+Revises: 8b2640aa7f38
+Create Date: 2026-10-17 10:21:36.145902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '63283d2f9d35'
+down_revision = '8b2640aa7f38'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    columns = _columns('audio')
+    with op.batch_alter_table('audio', schema=None) as batch_op:
+        if 'codec' not in columns:
+            batch_op.add_column(sa.Column('codec', sa.String(length=50), nullable=True))
+        if 'sample_rate' not in columns:
+            batch_op.add_column(sa.Column('sample_rate', sa.Integer(), nullable=True))
+        if 'channels' not in columns:
+            batch_op.add_column(sa.Column('channels', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('audio', schema=None) as batch_op:
+        batch_op.drop_column('channels')
+        batch_op.drop_column('sample_rate')
+        batch_op.drop_column('codec')
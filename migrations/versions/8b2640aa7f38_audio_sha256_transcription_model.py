@@ -0,0 +1,45 @@
+"""audio.sha256 for upload dedup, transcription.model and diarization
+
+Revision ID: 8b2640aa7f38
+Revises: e26308f7e157
+Create Date: 2026-10-17 10:09:47.803154
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2640aa7f38'
+down_revision = 'e26308f7e157'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    # колонки могли вже створити через db.create_all()
+    if 'sha256' not in _columns('audio'):
+        with op.batch_alter_table('audio', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+            batch_op.create_index(batch_op.f('ix_audio_sha256'), ['sha256'], unique=False)
+
+    columns = _columns('transcription')
+    with op.batch_alter_table('transcription', schema=None) as batch_op:
+        if 'model' not in columns:
+            batch_op.add_column(sa.Column('model', sa.String(length=50), nullable=True))
+        if 'diarization' not in columns:
+            batch_op.add_column(sa.Column('diarization', sa.Boolean(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('transcription', schema=None) as batch_op:
+        batch_op.drop_column('diarization')
+        batch_op.drop_column('model')
+
+    with op.batch_alter_table('audio', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_audio_sha256'))
+        batch_op.drop_column('sha256')
@@ -0,0 +1,97 @@
+"""baseline schema: users, audio, transcription
+
+Revision ID: e26308f7e157
+Revises:
+Create Date: 2026-10-17 10:02:11.412730
+
+Таблиці, які вже існують (розгортання без Alembic), пропускаються,
+тож ``flask db upgrade`` працює і на новій, і на наявній базі.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e26308f7e157'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    tables = _tables()
+
+    if 'users' not in tables:
+        op.create_table('users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('uuid', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=True),
+            sa.Column('password_hash', sa.String(length=255), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('is_verified', sa.Boolean(), nullable=True),
+            sa.Column('is_admin', sa.Boolean(), nullable=True),
+            sa.Column('email_verification_token', sa.String(length=255), nullable=True),
+            sa.Column('email_verification_sent_at', sa.DateTime(), nullable=True),
+            sa.Column('email_verified_at', sa.DateTime(), nullable=True),
+            sa.Column('password_reset_token', sa.String(length=255), nullable=True),
+            sa.Column('password_reset_sent_at', sa.DateTime(), nullable=True),
+            sa.Column('last_login_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username'),
+            sa.UniqueConstraint('uuid')
+        )
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+
+    if 'audio' not in tables:
+        op.create_table('audio',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('uuid', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('filename', sa.String(length=255), nullable=False),
+            sa.Column('file_path', sa.String(length=500), nullable=False),
+            sa.Column('file_size', sa.Integer(), nullable=True),
+            sa.Column('duration', sa.Float(), nullable=True),
+            sa.Column('format', sa.String(length=50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('uuid')
+        )
+
+    if 'transcription' not in tables:
+        op.create_table('transcription',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('uuid', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('audio_id', sa.Integer(), nullable=False),
+            sa.Column('text', sa.Text(), nullable=True),
+            sa.Column('speakers_text', sa.Text(), nullable=True),
+            sa.Column('speakers_json', postgresql.JSONB(astext_type=sa.Text()).with_variant(sa.JSON(), 'sqlite'),
+                      nullable=True),
+            sa.Column('language', sa.String(length=50), nullable=True),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('is_edited', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['audio_id'], ['audio.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('uuid')
+        )
+
+
+def downgrade():
+    op.drop_table('transcription')
+    op.drop_table('audio')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+    op.drop_table('users')
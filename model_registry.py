@@ -0,0 +1,363 @@
+import os
+import gc
+import time
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+import whisper
+from pyannote.audio import Pipeline
+
+from asr_engines import (AsrEngine, OpenAIWhisperEngine, FasterWhisperEngine, torch_weights_bytes,
+                         ASR_ENGINE, ASR_ENGINES)
+
+
+logger = logging.getLogger(__name__)
+
+
+DIARIZATION_MODEL = "pyannote/speaker-diarization"
+# Скільки секунд не повторювати завантаження пайплайна діаризації після збою
+DIARIZATION_RETRY_SECONDS = float(os.getenv('DIARIZATION_RETRY_SECONDS', '300'))
+
+# Кількість параметрів (млн) для оцінки пам'яті до завантаження
+WHISPER_MODEL_PARAMS = {
+    'tiny': 39, 'tiny.en': 39,
+    'base': 74, 'base.en': 74,
+    'small': 244, 'small.en': 244,
+    'medium': 769, 'medium.en': 769,
+}
+SUPPORTED_WHISPER_MODELS = tuple(WHISPER_MODEL_PARAMS)
+
+WHISPER_CACHE_MAX_MB = int(os.getenv('WHISPER_CACHE_MAX_MB', '4096'))
+WHISPER_PINNED_MODELS = [m.strip() for m in os.getenv('WHISPER_PINNED_MODELS', 'base').split(',') if m.strip()]
+
+# 'int8' — динамічно квантовані лінійні шари Whisper для воркерів без GPU
+WHISPER_QUANTIZE = os.getenv('WHISPER_QUANTIZE', 'none').lower()
+QUANTIZED_MODEL_DIR = os.getenv('QUANTIZED_MODEL_DIR', os.path.join('cache', 'whisper_int8'))
+
+
+def _resident_memory_bytes() -> int:
+    """Повертає поточний резидентний обсяг пам'яті процесу (RSS) у байтах"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _module_bytes(model: Any) -> int:
+    """Розмір ваг моделі у байтах: рушія ASR або torch-модуля"""
+    if isinstance(model, AsrEngine):
+        return model.weights_bytes()
+    return torch_weights_bytes(model)
+
+
+def quantize_whisper(model: torch.nn.Module) -> torch.nn.Module:
+    """Динамічна int8-квантизація лінійних шарів Whisper (лише CPU).
+
+    ``whisper.model.Linear`` лише приводить ваги до dtype входу, тож на CPU
+    у fp32 він тотожний ``nn.Linear``; ``quantize_dynamic`` розпізнає тільки
+    точний тип, тому клас підміняється перед квантизацією. Хуки kv-cache
+    ставляться на ті самі атрибути (``attn.key``/``attn.value``) і працюють
+    з квантованими модулями.
+    """
+    model = model.float().eval()
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_quantized_whisper(name: str, cache_dir: str = QUANTIZED_MODEL_DIR) -> torch.nn.Module:
+    """Квантована модель з дискового кешу; при першому запуску квантує і зберігає"""
+    path = os.path.join(cache_dir, f"{name}-int8-torch{torch.__version__.split('+')[0]}.pt")
+    if os.path.exists(path):
+        try:
+            return torch.load(path, map_location="cpu", weights_only=False).eval()
+        except Exception as e:
+            logger.warning(f"Failed to load quantized model {path}, rebuilding: {str(e)}")
+
+    model = quantize_whisper(whisper.load_model(name, device="cpu"))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(model, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Failed to cache quantized model {path}: {str(e)}")
+    return model
+
+
+class _ModelEntry:
+    """Завантажена модель разом з блокуванням доступу та метриками"""
+
+    def __init__(self, key: str, model: Any, load_time: float, memory_bytes: int, weights_bytes: int = 0):
+        self.key = key
+        self.model = model
+        self.load_time = load_time
+        self.memory_bytes = memory_bytes
+        self.weights_bytes = weights_bytes
+        self.loaded_at = time.time()
+        self.uses = 0
+        self.active = 0
+        self.lock = threading.RLock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'model': self.key,
+            'load_time': round(self.load_time, 3),
+            'memory_mb': round(self.memory_bytes / (1024 * 1024), 1),
+            'weights_mb': round(self.weights_bytes / (1024 * 1024), 1),
+            'loaded_at': self.loaded_at,
+            'uses': self.uses,
+            'in_use': self.active > 0
+        }
+
+
+class ModelRegistry:
+    """Процесний реєстр «теплих» моделей.
+
+    Кожна модель завантажується один раз на процес воркера і далі
+    видається всім задачам. Модулі torch не реентерабельні (Whisper
+    ставить hooks на kv-cache під час transcribe), тому виклики однієї
+    моделі серіалізуються через ``use()``.
+
+    Моделі Whisper різних розмірів тримаються в LRU-кеші з лімітом
+    пам'яті ``WHISPER_CACHE_MAX_MB``; моделі з ``WHISPER_PINNED_MODELS``
+    не витісняються.
+
+    ``whisper()`` повертає рушій ASR (``asr_engines``): openai-whisper або
+    faster-whisper, залежно від ``engine``. З ``quantize='int8'`` на CPU
+    моделі openai-whisper завантажуються з int8-лінійними шарами (див.
+    ``load_quantized_whisper``); на GPU параметр ігнорується.
+    """
+
+    def __init__(self, whisper_cache_max_mb: int = WHISPER_CACHE_MAX_MB,
+                 pinned_models: Optional[List[str]] = None, quantize: str = WHISPER_QUANTIZE,
+                 engine: str = ASR_ENGINE):
+        if engine not in ASR_ENGINES:
+            raise ValueError(f"Unknown ASR engine: {engine}")
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.engine = engine
+        self.quantize = quantize if quantize == 'int8' and self.device == "cpu" and engine == 'openai-whisper' else None
+        self.whisper_cache_max_bytes = whisper_cache_max_mb * 1024 * 1024
+        self.pinned = {f"whisper:{m}" for m in (pinned_models if pinned_models is not None else WHISPER_PINNED_MODELS)}
+        self._entries: "OrderedDict[str, _ModelEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading_locks: Dict[str, threading.Lock] = {}
+        self._untracked_locks: Dict[int, threading.RLock] = {}
+        self._diarization_failed_at: Optional[float] = None
+        self.evictions = 0
+
+    def _get_or_load(self, key: str, loader: Callable[[], Any], estimated_bytes: int = 0) -> Any:
+        entry = self._load_entry(key, loader, estimated_bytes)
+        return entry.model if entry else None
+
+    def _load_entry(self, key: str, loader: Callable[[], Any], estimated_bytes: int = 0,
+                    acquire: bool = False) -> Optional[_ModelEntry]:
+        """Запис моделі з кешу або після завантаження.
+
+        З ``acquire=True`` лічильник ``active`` збільшується під ``_lock``
+        у тій самій критичній секції, де запис знайдено, тож між пошуком
+        і захопленням LRU не може його витіснити.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                entry.active += int(acquire)
+                return entry
+            loading_lock = self._loading_locks.setdefault(key, threading.Lock())
+
+        with loading_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry:
+                    entry.active += int(acquire)
+                    return entry
+
+            if key.startswith("whisper:"):
+                self._make_room(estimated_bytes)
+
+            rss_before = _resident_memory_bytes()
+            started = time.perf_counter()
+            model = loader()
+            load_time = time.perf_counter() - started
+            memory_bytes = max(_resident_memory_bytes() - rss_before, 0)
+
+            if model is None:
+                return None
+
+            entry = _ModelEntry(key, model, load_time, memory_bytes, _module_bytes(model))
+            with self._lock:
+                self._entries[key] = entry
+                entry.active += int(acquire)
+
+            logger.info(f"Loaded {key} in {load_time:.2f}s (+{memory_bytes / (1024 * 1024):.1f} MB RSS)")
+            return entry
+
+    def _whisper_cache_bytes(self) -> int:
+        return sum(e.weights_bytes for k, e in self._entries.items() if k.startswith("whisper:"))
+
+    def _make_room(self, needed_bytes: int) -> None:
+        """Витісняє найдавніше використані моделі Whisper, поки нова не вміститься в ліміт"""
+        evicted = []
+        with self._lock:
+            for key in list(self._entries):
+                if self._whisper_cache_bytes() + needed_bytes <= self.whisper_cache_max_bytes:
+                    break
+                entry = self._entries[key]
+                if not key.startswith("whisper:") or key in self.pinned or entry.active > 0:
+                    continue
+                del self._entries[key]
+                evicted.append(key)
+                self.evictions += 1
+
+        if evicted:
+            gc.collect()
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+            logger.info(f"Evicted whisper models from cache: {', '.join(evicted)}")
+
+        with self._lock:
+            over_limit = self._whisper_cache_bytes() + needed_bytes > self.whisper_cache_max_bytes
+        if over_limit:
+            logger.warning(f"Whisper cache is over its {self.whisper_cache_max_bytes // (1024 * 1024)} MB limit; "
+                           f"all resident models are pinned or busy")
+
+    def _whisper_loader(self, name: str) -> Tuple[str, Callable[[], AsrEngine], int]:
+        """Ключ кешу, завантажувач і оцінка розміру ваг для моделі Whisper"""
+        if name not in SUPPORTED_WHISPER_MODELS:
+            raise ValueError(f"Unsupported Whisper model: {name}")
+        params = WHISPER_MODEL_PARAMS[name] * 1_000_000
+        if self.engine == 'faster-whisper':
+            # тип обчислень CTranslate2 (int8 на CPU) замінює WHISPER_QUANTIZE
+            return (f"whisper:{name}", lambda: FasterWhisperEngine(name, device=self.device, params=params),
+                    params * (2 if self.device == "cuda" else 1))
+        if self.quantize == 'int8':
+            # лінійні шари — int8, вбудовування токенів і згортки лишаються fp32
+            return f"whisper:{name}", lambda: OpenAIWhisperEngine(load_quantized_whisper(name)), params * 2
+        return (f"whisper:{name}", lambda: OpenAIWhisperEngine(whisper.load_model(name, device=self.device)),
+                params * 4)
+
+    def whisper(self, name: str = "base") -> AsrEngine:
+        """Повертає рушій ASR із завантаженою моделлю Whisper"""
+        return self._get_or_load(*self._whisper_loader(name))
+
+    @contextmanager
+    def acquire_whisper(self, name: str = "base"):
+        """Завантажує (за потреби) і ексклюзивно захоплює модель Whisper"""
+        entry = self._load_entry(*self._whisper_loader(name), acquire=True)
+        with self._hold(entry):
+            yield entry.model
+
+    def diarization_pipeline(self) -> Optional[Pipeline]:
+        """Повертає пайплайн діаризації pyannote або None, якщо він недоступний.
+
+        Після невдалого завантаження повтор можливий лише через
+        ``DIARIZATION_RETRY_SECONDS``, щоб кожна задача не смикала ``from_pretrained``.
+        """
+        failed_at = self._diarization_failed_at
+        if failed_at is not None and time.monotonic() - failed_at < DIARIZATION_RETRY_SECONDS:
+            return None
+
+        pipeline = self._get_or_load(f"pyannote:{DIARIZATION_MODEL}", self._load_diarization_pipeline)
+        self._diarization_failed_at = time.monotonic() if pipeline is None else None
+        return pipeline
+
+    def _load_diarization_pipeline(self) -> Optional[Pipeline]:
+        try:
+            pipeline = Pipeline.from_pretrained(
+                DIARIZATION_MODEL,
+                use_auth_token=os.getenv('PYANNOTE_TOKEN')
+            )
+
+            if hasattr(pipeline, 'instantiate_params'):
+                pipeline.instantiate_params({
+                    "segmentation": {
+                        "threshold": 0.25,
+                        "min_duration": 0.1
+                    },
+                    "embedding": {
+                        "window": 0.75,
+                        "step": 0.2
+                    },
+                    "clustering": {
+                        "method": "affinity_propagation",
+                        "min_cluster_size": 2,
+                        "threshold": 0.65
+                    }
+                })
+            return pipeline
+        except Exception as e:
+            print(f"Failed to initialize diarization pipeline: {str(e)}")
+            return None
+
+    @contextmanager
+    def use(self, model: Any):
+        """Ексклюзивний доступ до моделі на час одного виклику"""
+        with self._lock:
+            entry = next((e for e in self._entries.values() if e.model is model), None)
+            if entry is not None:
+                entry.active += 1
+            else:
+                # модель уже витіснено або її немає в реєстрі — виклики все одно серіалізуються
+                lock = self._untracked_locks.setdefault(id(model), threading.RLock())
+
+        if entry is None:
+            with lock:
+                yield model
+            return
+
+        with self._hold(entry):
+            yield model
+
+    @contextmanager
+    def _hold(self, entry: _ModelEntry):
+        """Тримає вже захоплений (``active``) запис під його блокуванням"""
+        try:
+            with entry.lock:
+                entry.uses += 1
+                yield entry
+        finally:
+            with self._lock:
+                entry.active -= 1
+
+    def preload(self, whisper_models: Optional[List[str]] = None, diarization: bool = True) -> None:
+        """Завантажує моделі заздалегідь (при старті воркера)"""
+        for name in whisper_models or WHISPER_PINNED_MODELS or ["base"]:
+            try:
+                self.whisper(name)
+            except Exception as e:
+                logger.error(f"Failed to preload whisper model {name}: {str(e)}")
+        if diarization:
+            self.diarization_pipeline()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Час завантаження та пам'ять для кожної моделі"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return [entry.to_dict() for entry in entries]
+
+    def whisper_cache_stats(self) -> Dict[str, Any]:
+        """Заповненість LRU-кешу моделей Whisper"""
+        with self._lock:
+            used = self._whisper_cache_bytes()
+            resident = [k.split(":", 1)[1] for k in self._entries if k.startswith("whisper:")]
+        return {
+            'resident': resident,
+            'pinned': sorted(k.split(":", 1)[1] for k in self.pinned),
+            'used_mb': round(used / (1024 * 1024), 1),
+            'max_mb': self.whisper_cache_max_bytes // (1024 * 1024),
+            'evictions': self.evictions,
+            'engine': self.engine,
+            'quantization': self.quantize or 'none'
+        }
+
+
+# Один реєстр на процес воркера
+model_registry = ModelRegistry()
@@ -145,6 +145,10 @@ class Audio(db.Model):
     file_size = db.Column(db.Integer, nullable=True) 
     duration = db.Column(db.Float, nullable=True)  
     format = db.Column(db.String(50), nullable=True)
+    codec = db.Column(db.String(50), nullable=True)
+    sample_rate = db.Column(db.Integer, nullable=True)
+    channels = db.Column(db.Integer, nullable=True)
+    sha256 = db.Column(db.String(64), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Зв'язки з іншими таблицями
@@ -158,6 +162,10 @@ class Audio(db.Model):
             'file_size': self.file_size,
             'duration': self.duration,
             'format': self.format,
+            'codec': self.codec,
+            'sample_rate': self.sample_rate,
+            'channels': self.channels,
+            'sha256': self.sha256,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
@@ -181,6 +189,10 @@ class Transcription(db.Model):
     
     # Метадані
     language = db.Column(db.String(50), nullable=True) 
+    model = db.Column(db.String(50), nullable=True)
+    profile = db.Column(db.String(20), nullable=True)
+    diarization = db.Column(db.Boolean, default=True)
+    quality_report = db.Column(JSONB, nullable=True)
     
     # Статус і версійність
     status = db.Column(db.String(50), default="pending")
@@ -205,6 +217,10 @@ class Transcription(db.Model):
             'speakers_text': self.speakers_text,
             'speakers': self.speakers_json,
             'language': self.language,
+            'model': self.model,
+            'profile': self.profile,
+            'diarization': self.diarization,
+            'quality': self.quality_report,
             'status': self.status,
             'is_edited': self.is_edited,
             'created_at': self.created_at.isoformat() if self.created_at else None,
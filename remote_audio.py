@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import hashlib
+import mimetypes
+import threading
+import logging
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+
+REMOTE_AUDIO_CACHE_DIR = os.getenv('REMOTE_AUDIO_CACHE_DIR', os.path.join('cache', 'remote_audio'))
+REMOTE_AUDIO_CACHE_MAX_MB = int(os.getenv('REMOTE_AUDIO_CACHE_MAX_MB', '2048'))
+REMOTE_AUDIO_MAX_BYTES = int(os.getenv('REMOTE_AUDIO_MAX_BYTES', str(2 * 1024 ** 3)))
+DOWNLOAD_POOL_SIZE = int(os.getenv('DOWNLOAD_POOL_SIZE', '8'))
+DOWNLOAD_RETRIES = int(os.getenv('DOWNLOAD_RETRIES', '3'))
+DOWNLOAD_CONNECT_TIMEOUT = float(os.getenv('DOWNLOAD_CONNECT_TIMEOUT', '10'))
+DOWNLOAD_READ_TIMEOUT = float(os.getenv('DOWNLOAD_READ_TIMEOUT', '60'))
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadError(Exception):
+    """Не вдалося завантажити аудіо за URL"""
+
+
+def _create_session(pool_size: int = DOWNLOAD_POOL_SIZE) -> requests.Session:
+    """Сесія з пулом з'єднань і повторами на рівні з'єднання/5xx"""
+    session = requests.Session()
+    retry = Retry(total=DOWNLOAD_RETRIES, backoff_factor=0.5,
+                  status_forcelist=(502, 503, 504), allowed_methods=frozenset(['GET', 'HEAD']))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class RemoteAudioCache:
+    """Потокове завантаження аудіо за URL у локальний кеш.
+
+    Тіло пишеться на диск частинами (без ``response.content`` у пам'яті),
+    обірване завантаження продовжується запитом з ``Range``, а повторний
+    імпорт того ж URL лише перевіряє ETag/Last-Modified умовним запитом.
+    Найдавніше використані файли витісняються, коли кеш перевищує ліміт.
+    """
+
+    def __init__(self, cache_dir: str = REMOTE_AUDIO_CACHE_DIR, max_bytes: int = REMOTE_AUDIO_MAX_BYTES,
+                 cache_max_mb: int = REMOTE_AUDIO_CACHE_MAX_MB, session: Optional[requests.Session] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.cache_max_bytes = cache_max_mb * 1024 * 1024
+        self.session = session or _create_session()
+        self.hits = 0
+        self.downloads = 0
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+            return meta if os.path.exists(meta['path']) else None
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_meta(self, key: str, meta: Dict[str, Any]) -> None:
+        tmp_path = f"{self._meta_path(key)}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(key))
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _extension(url: str, content_type: Optional[str]) -> str:
+        """Розширення з URL, інакше з Content-Type (ffmpeg визначає формат за вмістом)"""
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+        if 1 < len(ext) <= 6:
+            return ext
+        if content_type:
+            guessed = mimetypes.guess_extension(content_type.split(';')[0].strip())
+            if guessed:
+                return guessed
+        return '.audio'
+
+    def is_cached(self, path: Optional[str]) -> bool:
+        return bool(path) and os.path.abspath(path).startswith(os.path.abspath(self.cache_dir) + os.sep)
+
+    def fetch(self, url: str) -> str:
+        """Локальний шлях до вмісту ``url``; завантажує лише змінений або відсутній файл"""
+        key = self._key(url)
+        with self._lock_for(key):
+            # теку створюємо при першому завантаженні, а не під час імпорту
+            os.makedirs(self.cache_dir, exist_ok=True)
+            meta = self._load_meta(key)
+            headers = {}
+            if meta:
+                if meta.get('etag'):
+                    headers['If-None-Match'] = meta['etag']
+                if meta.get('last_modified'):
+                    headers['If-Modified-Since'] = meta['last_modified']
+
+            if meta and headers:
+                with self._get(url, headers) as response:
+                    if response.status_code == 304:
+                        os.utime(meta['path'])
+                        self.hits += 1
+                        return meta['path']
+                    response.raise_for_status()
+                    meta = self._download(url, key, response)
+            else:
+                with self._get(url, {}) as response:
+                    response.raise_for_status()
+                    meta = self._download(url, key, response)
+
+            self.downloads += 1
+            self._evict(keep=meta['path'])
+            return meta['path']
+
+    def _get(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        return self.session.get(url, headers=headers, stream=True,
+                                timeout=(DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT))
+
+    def _download(self, url: str, key: str, response: requests.Response) -> Dict[str, Any]:
+        length = response.headers.get('Content-Length')
+        if length and int(length) > self.max_bytes:
+            raise DownloadError(f"Remote file is larger than {self.max_bytes} bytes")
+
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'size': int(length) if length else None,
+        }
+        path = os.path.join(self.cache_dir, key + self._extension(url, meta['content_type']))
+        part_path = f"{path}.part"
+
+        received = 0
+        attempts = 0
+        open(part_path, 'wb').close()
+        while True:
+            try:
+                with open(part_path, 'ab') as f:
+                    for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        received += len(chunk)
+                        if received > self.max_bytes:
+                            raise DownloadError(f"Remote file is larger than {self.max_bytes} bytes")
+                        f.write(chunk)
+                if meta['size'] is None or received >= meta['size']:
+                    break
+                raise requests.exceptions.ChunkedEncodingError(f"Connection closed at {received} bytes")
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout) as e:
+                attempts += 1
+                response.close()
+                if attempts > DOWNLOAD_RETRIES:
+                    os.remove(part_path)
+                    raise DownloadError(f"Download of {url} failed: {str(e)}")
+                logger.warning(f"Download of {url} interrupted at {received} bytes, resuming: {str(e)}")
+                time.sleep(0.5 * attempts)
+                response = self._resume(url, meta, received)
+                if response.status_code != 206:
+                    # сервер не підтримує Range або файл змінився — починаємо спочатку
+                    received = 0
+                    open(part_path, 'wb').close()
+            except Exception:
+                response.close()
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                raise
+
+        response.close()
+        os.replace(part_path, path)
+        meta.update(path=path, size=received)
+        self._save_meta(key, meta)
+        return meta
+
+    def _resume(self, url: str, meta: Dict[str, Any], received: int) -> requests.Response:
+        headers = {'Range': f"bytes={received}-"}
+        validator = meta.get('etag') or meta.get('last_modified')
+        if validator:
+            headers['If-Range'] = validator
+        response = self._get(url, headers)
+        response.raise_for_status()
+        return response
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Витісняє найдавніше використані файли понад ліміт кешу"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            meta = self._load_meta(name[:-5])
+            if meta and meta['path'] != keep:
+                entries.append((os.path.getatime(meta['path']), name[:-5], meta))
+
+        total = sum(meta['size'] or 0 for _, _, meta in entries)
+        if keep and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        for _, key, meta in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.cache_max_bytes:
+                break
+            for path in (meta['path'], self._meta_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= meta['size'] or 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'downloads': self.downloads,
+            'max_file_bytes': self.max_bytes,
+            'cache_max_mb': self.cache_max_bytes // (1024 * 1024)
+        }
+
+
+remote_audio_cache = RemoteAudioCache()
@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (локальна розробка): блокування лише в межах процесу
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+# Максимальний розмір одного файлу та частини (байт)
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(4 * 1024 ** 3)))
+UPLOAD_PART_SIZE = int(os.getenv('UPLOAD_PART_SIZE', str(8 * 1024 * 1024)))
+# Незавершені сесії старші за цей час видаляються разом із частково записаними файлами
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24'))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadError(Exception):
+    """Помилка протоколу завантаження; ``status_code`` — HTTP-код відповіді"""
+
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+class UploadSession:
+    """Стан одного завантаження; зберігається JSON-файлом поруч із даними,
+    тож переживає перезапуск і видимий іншим веб-процесам"""
+
+    def __init__(self, upload_id: str, user_id: int, filename: str, file_path: str, size: int,
+                 options: Dict[str, Any], offset: int = 0, created_at: Optional[float] = None,
+                 sha256: Optional[str] = None, finalized: bool = False):
+        self.upload_id = upload_id
+        self.user_id = user_id
+        self.filename = filename
+        self.file_path = file_path
+        self.size = size
+        self.options = options
+        self.offset = offset
+        self.created_at = created_at or time.time()
+        self.sha256 = sha256
+        self.finalized = finalized
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'upload_id': self.upload_id,
+            'user_id': self.user_id,
+            'filename': self.filename,
+            'file_path': self.file_path,
+            'size': self.size,
+            'options': self.options,
+            'offset': self.offset,
+            'created_at': self.created_at,
+            'sha256': self.sha256,
+            'finalized': self.finalized
+        }
+
+    @property
+    def complete(self) -> bool:
+        return self.offset >= self.size
+
+
+class UploadManager:
+    """Відновлювані завантаження частинами: init -> PUT частин за зсувом -> finalize.
+
+    Частини пишуться одразу в кінцевий файл, SHA-256 рахується інкрементно.
+    Приймаються лише послідовні частини; повтор уже отриманої частини —
+    no-op, тож кожен PUT ідемпотентний.
+
+    Частини одного завантаження можуть потрапляти на різні веб-процеси:
+    запис і finalize серіалізуються файловим блокуванням сесії, а кешований
+    у процесі стан SHA-256 пам'ятає, скільки байтів він покриває, і
+    дочитує решту з файлу, якщо сесію просунув інший процес.
+    """
+
+    def __init__(self, upload_folder: str, ttl_hours: float = UPLOAD_SESSION_TTL_HOURS):
+        self.upload_folder = upload_folder
+        self.sessions_folder = os.path.join(upload_folder, '.sessions')
+        self.ttl = ttl_hours * 3600
+        # upload_id -> (скільки байтів файлу покриває, стан SHA-256)
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.sessions_folder, exist_ok=True)
+
+    def _session_path(self, upload_id: str) -> str:
+        return os.path.join(self.sessions_folder, f"{upload_id}.json")
+
+    def _lock_path(self, upload_id: str) -> str:
+        return os.path.join(self.sessions_folder, f"{upload_id}.lock")
+
+    @contextmanager
+    def _session_lock(self, upload_id: str):
+        """Ексклюзивний доступ до сесії для всіх процесів, що ділять ``upload_folder``"""
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            raise UploadError('Upload not found', 404)
+
+        if fcntl is None:
+            with self._lock:
+                lock = self._locks.setdefault(upload_id, threading.Lock())
+            with lock:
+                yield
+            return
+
+        # flock конфліктує і між потоками одного процесу: кожен open — окремий опис файлу
+        with open(self._lock_path(upload_id), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _save(self, session: UploadSession) -> None:
+        tmp_path = f"{self._session_path(session.upload_id)}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(session.to_dict(), f)
+        os.replace(tmp_path, self._session_path(session.upload_id))
+
+    def _hasher(self, session: UploadSession):
+        """Стан SHA-256 рівно для ``session.offset`` отриманих байтів.
+
+        Кеш процесу дочитується з файлу, якщо частини після нього прийняв
+        інший процес, і будується наново, якщо не збігається із сесією
+        (перезапуск, інший процес почав раніше).
+        """
+        covered, hasher = self._hashers.get(session.upload_id, (None, None))
+        if hasher is None or covered > session.offset:
+            covered, hasher = 0, hashlib.sha256()
+        if covered < session.offset:
+            remaining = session.offset - covered
+            with open(session.file_path, 'rb') as f:
+                f.seek(covered)
+                while remaining > 0:
+                    chunk = f.read(min(HASH_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise UploadError('Upload data is shorter than the recorded offset', 409, covered)
+                    hasher.update(chunk)
+                    covered += len(chunk)
+                    remaining -= len(chunk)
+        self._hashers[session.upload_id] = (covered, hasher)
+        return hasher
+
+    def create(self, user_id: int, filename: str, size: int, options: Dict[str, Any]) -> UploadSession:
+        if size <= 0:
+            raise UploadError('File size must be positive')
+        if size > MAX_UPLOAD_BYTES:
+            raise UploadError(f'File is larger than {MAX_UPLOAD_BYTES} bytes', 413)
+
+        self.cleanup_expired()
+
+        upload_id = str(uuid.uuid4())
+        file_path = os.path.join(self.upload_folder, f"{upload_id}_{filename}")
+        open(file_path, 'wb').close()
+
+        session = UploadSession(upload_id, user_id, filename, file_path, size, options)
+        self._save(session)
+        self._hashers[upload_id] = (0, hashlib.sha256())
+        return session
+
+    def get(self, upload_id: str, user_id: int) -> UploadSession:
+        try:
+            uuid.UUID(upload_id)
+            with open(self._session_path(upload_id)) as f:
+                session = UploadSession(**json.load(f))
+        except (ValueError, OSError):
+            raise UploadError('Upload not found', 404)
+        if session.user_id != user_id:
+            raise UploadError('Upload not found', 404)
+        return session
+
+    def write_part(self, upload_id: str, user_id: int, offset: int, stream,
+                   chunk_size: int = HASH_CHUNK_SIZE) -> UploadSession:
+        """Записує частину, що починається з ``offset``; повертає оновлену сесію"""
+        with self._session_lock(upload_id):
+            session = self.get(upload_id, user_id)
+            if session.finalized:
+                return session
+            if offset > session.offset:
+                raise UploadError('Part is ahead of the received data', 409, session.offset)
+
+            # вже отриману частину (повтор після обриву) пропускаємо
+            skip = session.offset - offset
+            hasher = self._hasher(session)
+            written = 0
+            try:
+                with open(session.file_path, 'r+b') as f:
+                    f.seek(session.offset)
+                    while True:
+                        chunk = stream.read(chunk_size)
+                        if not chunk:
+                            break
+                        if skip:
+                            dropped = min(skip, len(chunk))
+                            chunk = chunk[dropped:]
+                            skip -= dropped
+                        if not chunk:
+                            continue
+                        if session.offset + written + len(chunk) > session.size:
+                            raise UploadError('Part exceeds the declared file size', 413, session.offset + written)
+                        if written + len(chunk) > UPLOAD_PART_SIZE:
+                            raise UploadError(f'Part is larger than {UPLOAD_PART_SIZE} bytes', 413,
+                                              session.offset + written)
+                        f.write(chunk)
+                        hasher.update(chunk)
+                        written += len(chunk)
+            finally:
+                # навіть при обриві з'єднання зберігаємо те, що встигли отримати
+                session.offset += written
+                self._hashers[upload_id] = (session.offset, hasher)
+                self._save(session)
+            return session
+
+    def finalize(self, upload_id: str, user_id: int) -> UploadSession:
+        """Завершує завантаження і фіксує SHA-256; повторний виклик повертає ту саму сесію"""
+        with self._session_lock(upload_id):
+            session = self.get(upload_id, user_id)
+            if session.finalized:
+                return session
+            if not session.complete:
+                raise UploadError(f'Upload incomplete: {session.offset} of {session.size} bytes', 409,
+                                  session.offset)
+
+            session.sha256 = self._hasher(session).hexdigest()
+            session.finalized = True
+            self._save(session)
+            self._hashers.pop(upload_id, None)
+            return session
+
+    def discard(self, upload_id: str) -> None:
+        """Прибирає сесію (файл даних лишається — ним володіє транскрипція)"""
+        self._hashers.pop(upload_id, None)
+        with self._lock:
+            self._locks.pop(upload_id, None)
+        for path in (self._session_path(upload_id), self._lock_path(upload_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def cleanup_expired(self) -> int:
+        """Видаляє прострочені сесії; часткові файли незавершених — теж"""
+        removed = 0
+        now = time.time()
+        for name in os.listdir(self.sessions_folder):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.sessions_folder, name)
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                if now - data.get('created_at', now) < self.ttl:
+                    continue
+                if not data.get('finalized') and os.path.exists(data['file_path']):
+                    os.remove(data['file_path'])
+                self.discard(data['upload_id'])
+                removed += 1
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Failed to clean up upload session {name}: {str(e)}")
+        return removed
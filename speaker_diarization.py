@@ -0,0 +1,263 @@
+import os
+import hashlib
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from pyannote.core import Annotation, SlidingWindowFeature
+
+
+logger = logging.getLogger(__name__)
+
+
+DIARIZATION_CACHE_SIZE = int(os.getenv('DIARIZATION_CACHE_SIZE', '2'))
+
+
+class DiarizationFeatures:
+    """Результати дорогих кроків pyannote для одного файлу: сегментація,
+    лічильник мовців і ембеддинги. Кластеризацію можна повторювати над
+    ними з різними обмеженнями на кількість мовців."""
+
+    def __init__(self, file, segmentations, binarized_segmentations, count, embeddings):
+        self.file = file
+        self.segmentations = segmentations
+        self.binarized_segmentations = binarized_segmentations
+        self.count = count
+        self.embeddings = embeddings
+
+    @property
+    def has_speech(self) -> bool:
+        return np.nanmax(self.count.data) > 0
+
+
+# Версії pyannote.audio, чий ``SpeakerDiarization.apply`` відтворюють extract_features і recluster
+RECLUSTER_PYANNOTE_VERSIONS = ('3.1.',)
+
+
+def _pyannote_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version('pyannote.audio')
+    except Exception:
+        return ''
+
+
+def supports_reclustering(pipeline) -> bool:
+    """Чи має пайплайн внутрішні кроки SpeakerDiarization з pyannote.audio 3.1.
+
+    Кроки повторюють приватні частини ``apply`` конкретної версії; на
+    іншій версії вони могли розійтися (і тихо змінити мітки мовців), тож
+    тоді діаризацію виконує повний виклик пайплайна.
+    """
+    if not _pyannote_version().startswith(RECLUSTER_PYANNOTE_VERSIONS):
+        return False
+    return all(hasattr(pipeline, name) for name in
+               ('get_segmentations', 'get_embeddings', 'speaker_count', 'reconstruct', 'to_annotation', '_frames'))
+
+
+def extract_features(pipeline, file: Dict[str, Any]) -> DiarizationFeatures:
+    """Сегментація та ембеддинги — один раз на файл"""
+    from pyannote.audio import Audio
+    from pyannote.audio.utils.signal import binarize
+    from pyannote.database import ProtocolFile
+
+    file = Audio.validate_file(file)
+    if hasattr(pipeline, 'preprocessors'):
+        file = ProtocolFile(file, lazy=pipeline.preprocessors)
+
+    segmentations = pipeline.get_segmentations(file)
+
+    if pipeline._segmentation.model.specifications.powerset:
+        binarized_segmentations = segmentations
+    else:
+        binarized_segmentations = binarize(
+            segmentations,
+            onset=pipeline.segmentation.threshold,
+            initial_state=False,
+        )
+
+    count = pipeline.speaker_count(
+        binarized_segmentations,
+        frames=pipeline._frames,
+        warm_up=(0.0, 0.0),
+    )
+
+    embeddings = None
+    if np.nanmax(count.data) > 0:
+        embeddings = pipeline.get_embeddings(
+            file,
+            binarized_segmentations,
+            exclude_overlap=pipeline.embedding_exclude_overlap,
+        )
+
+    return DiarizationFeatures(file, segmentations, binarized_segmentations, count, embeddings)
+
+
+def recluster(pipeline, features: DiarizationFeatures, num_speakers: Optional[int] = None,
+              min_speakers: Optional[int] = None, max_speakers: Optional[int] = None) -> Annotation:
+    """Лише кластеризація та реконструкція — повторює кінець ``SpeakerDiarization.apply``"""
+    if not features.has_speech:
+        return Annotation(uri=features.file["uri"])
+
+    num_speakers, min_speakers, max_speakers = pipeline.set_num_speakers(
+        num_speakers=num_speakers,
+        min_speakers=min_speakers,
+        max_speakers=max_speakers,
+    )
+
+    hard_clusters, _, _ = pipeline.clustering(
+        embeddings=features.embeddings,
+        segmentations=features.binarized_segmentations,
+        num_clusters=num_speakers,
+        min_clusters=min_speakers,
+        max_clusters=max_speakers,
+        file=features.file,
+        frames=pipeline._frames,
+    )
+
+    count = SlidingWindowFeature(
+        np.minimum(features.count.data, max_speakers).astype(np.int8),
+        features.count.sliding_window,
+    )
+
+    inactive_speakers = np.sum(features.binarized_segmentations.data, axis=1) == 0
+    hard_clusters[inactive_speakers] = -2
+    discrete_diarization = pipeline.reconstruct(features.segmentations, hard_clusters, count)
+
+    diarization = pipeline.to_annotation(
+        discrete_diarization,
+        min_duration_on=0.0,
+        min_duration_off=pipeline.segmentation.min_duration_off,
+    )
+    diarization.uri = features.file["uri"]
+
+    mapping = {label: expected for label, expected in zip(diarization.labels(), pipeline.classes())}
+    return diarization.rename_labels(mapping=mapping)
+
+
+class FeatureCache:
+    """Невеликий LRU-кеш ознак діаризації за хешем хвильової форми"""
+
+    def __init__(self, max_size: int = DIARIZATION_CACHE_SIZE):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, DiarizationFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(waveform: np.ndarray) -> str:
+        return hashlib.sha1(np.ascontiguousarray(waveform).view(np.uint8)).hexdigest()
+
+    def get(self, key: str) -> Optional[DiarizationFeatures]:
+        with self._lock:
+            features = self._items.get(key)
+            if features is not None:
+                self._items.move_to_end(key)
+            return features
+
+    def put(self, key: str, features: DiarizationFeatures) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = features
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+feature_cache = FeatureCache()
+
+
+class SpeakerTurnIndex:
+    """Індекс реплік мовців (відсортованих за початком) для вирівнювання з
+    сегментами Whisper за O(log n) на запит замість перебору всіх реплік.
+
+    Порядок перебору і розв'язання рівностей збігаються з лінійним
+    проходом по ``speaker_turns``, тому результат ідентичний.
+    """
+
+    def __init__(self, speaker_turns: List[Dict[str, Any]]):
+        self.turns = speaker_turns
+        self.starts = [turn['start'] for turn in speaker_turns]
+        # максимум кінців серед реплік 0..i — неспадна послідовність
+        self.max_ends = list(accumulate((turn['end'] for turn in speaker_turns), max))
+        self.end_order = sorted(range(len(speaker_turns)), key=lambda i: speaker_turns[i]['end'])
+        self.ends = [speaker_turns[i]['end'] for i in self.end_order]
+
+    def overlaps(self, seg_start: float, seg_end: float) -> List[Dict[str, Any]]:
+        """Перекриття сегмента з репліками у порядку реплік"""
+        overlaps = []
+        first = bisect_right(self.max_ends, seg_start)
+        last = bisect_left(self.starts, seg_end)
+        for turn in self.turns[first:last]:
+            overlap_start = max(seg_start, turn['start'])
+            overlap_end = min(seg_end, turn['end'])
+            if overlap_start < overlap_end:
+                overlaps.append({
+                    'speaker': turn['speaker'],
+                    'duration': overlap_end - overlap_start
+                })
+        return overlaps
+
+    @staticmethod
+    def _nearest_runs(values: List[float], target: float) -> List[int]:
+        """Індекси найближчих до ``target`` значень зліва і справа (з повторами)"""
+        i = bisect_left(values, target)
+        left = range(bisect_left(values, values[i - 1]), i) if i > 0 else range(0)
+        right = range(i, bisect_right(values, values[i])) if i < len(values) else range(0)
+        return list(left) + list(right)
+
+    def closest(self, seg_start: float, seg_end: float) -> Dict[str, Any]:
+        """Репліка з найменшою відстанню між початками або кінцями"""
+        candidates = set(self._nearest_runs(self.starts, seg_start))
+        candidates.update(self.end_order[k] for k in self._nearest_runs(self.ends, seg_end))
+
+        def distance(i):
+            turn = self.turns[i]
+            return min(abs(turn['start'] - seg_start), abs(turn['end'] - seg_end)), i
+
+        return self.turns[min(candidates, key=distance)]
+
+
+def assign_speakers(segments: List[Dict[str, Any]], speaker_turns: List[Dict[str, Any]],
+                    speaker_map: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Призначає кожному сегменту домінантного (або найближчого) мовця"""
+    index = SpeakerTurnIndex(speaker_turns)
+    assigned = []
+
+    for segment in sorted(segments, key=lambda x: x['start']):
+        seg_start = segment['start']
+        seg_end = segment['end']
+
+        overlaps = index.overlaps(seg_start, seg_end)
+        if overlaps:
+            speaker_durations = defaultdict(float)
+            for ov in overlaps:
+                speaker_durations[ov['speaker']] += ov['duration']
+            speaker = max(speaker_durations.items(), key=lambda x: x[1])[0]
+        else:
+            speaker = index.closest(seg_start, seg_end)['speaker']
+
+        assigned.append({
+            'start': seg_start,
+            'end': seg_end,
+            'speaker': speaker_map[speaker],
+            'text': segment['text']
+        })
+
+    return assigned
+
+
+def format_speakers_text(segments: List[Dict[str, Any]]) -> str:
+    """Текст з заголовками мовців; ``segments`` уже впорядковані за часом"""
+    lines = []
+    current_speaker = None
+    for seg in segments:
+        if seg['speaker'] != current_speaker:
+            lines.append(f"\n=== {seg['speaker']} ===\n")
+            current_speaker = seg['speaker']
+        lines.append(f"[{seg['start']:.2f}-{seg['end']:.2f}] {seg['text']}\n")
+    return ''.join(lines).strip()
@@ -0,0 +1,311 @@
+import os
+import json
+import time
+import threading
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+# 'memory' — у процесі (LRU/TTL), 'redis' — спільний для всіх веб-процесів і воркерів
+STATUS_STORE = os.getenv(
+    'STATUS_STORE',
+    'redis' if os.getenv('TRANSCRIPTION_BACKEND', 'local') == 'celery' else 'memory'
+)
+STATUS_TTL_SECONDS = int(os.getenv('STATUS_TTL_SECONDS', '3600'))
+STATUS_STORE_MAX_SIZE = int(os.getenv('STATUS_STORE_MAX_SIZE', '1000'))
+REDIS_URL = os.getenv('REDIS_URL', os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0'))
+# Без спільного сховища не обійтись: бекенд Celery або явно заданий STATUS_STORE=redis
+STATUS_STORE_REQUIRED = (os.getenv('TRANSCRIPTION_BACKEND', 'local') == 'celery'
+                         or os.getenv('STATUS_STORE') == 'redis')
+
+
+class StatusStore(ABC):
+    """Короткоживучий прогрес задач транскрипції.
+
+    Зберігає лише ``status``, ``progress`` і ``message`` та, поки йде
+    розпізнавання, буфер уже готових сегментів. Результати завершених задач
+    читаються з рядка Transcription у БД. Запис може зникнути (TTL,
+    витіснення, перезапуск) — тоді джерелом істини є БД.
+    """
+
+    TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, job_id: str, status: str, progress: int = 0, message: str = '') -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def append_partial(self, job_id: str, segments: List[Dict[str, Any]]) -> None:
+        """Додає готові сегменти до проміжного результату"""
+
+    @abstractmethod
+    def get_partial(self, job_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        """Сегменти проміжного результату, починаючи з ``since``"""
+
+    @abstractmethod
+    def clear_partial(self, job_id: str) -> None:
+        """Скидає проміжний результат (напр. відкат на іншу модель) і збільшує його епоху"""
+
+    @abstractmethod
+    def partial_epoch(self, job_id: str) -> int:
+        """Скільки разів проміжний результат скидали; клієнти з іншою епохою читають його з нуля"""
+
+    @abstractmethod
+    def request_cancel(self, job_id: str) -> None:
+        """Прапорець скасування, який перевіряють контрольні точки задачі"""
+
+    @abstractmethod
+    def is_cancelled(self, job_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def wait(self, job_id: str, previous: Optional[Dict[str, Any]], timeout: float) -> Optional[Dict[str, Any]]:
+        """Чекає, доки запис відрізнятиметься від ``previous``, але не довше ``timeout``;
+        повертає поточний запис (по тайм-ауту — незмінний)"""
+
+    def update(self, job_id: str, **fields) -> None:
+        """Оновлює поля наявного запису (або створює новий зі статусом processing)"""
+        current = self.get(job_id) or {'status': 'processing', 'progress': 0, 'message': ''}
+        current.update(fields)
+        self.set(job_id, current['status'], current['progress'], current['message'])
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': type(self).__name__}
+
+
+class MemoryStatusStore(StatusStore):
+    """LRU-словник з TTL у межах одного процесу"""
+
+    def __init__(self, max_size: int = STATUS_STORE_MAX_SIZE, ttl: int = STATUS_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._partials: Dict[str, List[Dict[str, Any]]] = {}
+        self._epochs: Dict[str, int] = {}
+        self._cancelled: Dict[str, float] = {}
+        self._cond = threading.Condition()
+
+    def _evict_expired(self, now: float) -> None:
+        # найстаріші за оновленням — на початку, тож достатньо дивитися з голови
+        while self._items:
+            job_id, (expires_at, _) = next(iter(self._items.items()))
+            if expires_at > now:
+                break
+            self._items.popitem(last=False)
+            self._partials.pop(job_id, None)
+            self._epochs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._cond:
+            self._evict_expired(now)
+            item = self._items.get(str(job_id))
+            return dict(item[1]) if item else None
+
+    def set(self, job_id: str, status: str, progress: int = 0, message: str = '') -> None:
+        now = time.time()
+        with self._cond:
+            self._items[str(job_id)] = (now + self.ttl, {
+                'status': status,
+                'progress': progress,
+                'message': message
+            })
+            self._items.move_to_end(str(job_id))
+            if status in self.TERMINAL_STATUSES:
+                self._partials.pop(str(job_id), None)
+            self._evict_expired(now)
+            while len(self._items) > self.max_size:
+                evicted, _ = self._items.popitem(last=False)
+                self._partials.pop(evicted, None)
+                self._epochs.pop(evicted, None)
+            self._cond.notify_all()
+
+    def delete(self, job_id: str) -> None:
+        with self._cond:
+            self._items.pop(str(job_id), None)
+            self._partials.pop(str(job_id), None)
+            self._epochs.pop(str(job_id), None)
+            self._cond.notify_all()
+
+    def append_partial(self, job_id: str, segments: List[Dict[str, Any]]) -> None:
+        with self._cond:
+            if str(job_id) in self._items:
+                self._partials.setdefault(str(job_id), []).extend(segments)
+
+    def get_partial(self, job_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        with self._cond:
+            return list(self._partials.get(str(job_id), [])[since:])
+
+    def clear_partial(self, job_id: str) -> None:
+        with self._cond:
+            self._partials.pop(str(job_id), None)
+            self._epochs[str(job_id)] = self._epochs.get(str(job_id), 0) + 1
+            self._cond.notify_all()
+
+    def partial_epoch(self, job_id: str) -> int:
+        with self._cond:
+            return self._epochs.get(str(job_id), 0)
+
+    def request_cancel(self, job_id: str) -> None:
+        now = time.time()
+        with self._cond:
+            for expired in [key for key, expires_at in self._cancelled.items() if expires_at <= now]:
+                del self._cancelled[expired]
+            self._cancelled[str(job_id)] = now + self.ttl
+
+    def is_cancelled(self, job_id: str) -> bool:
+        with self._cond:
+            return self._cancelled.get(str(job_id), 0) > time.time()
+
+    def _current(self, job_id: str) -> Optional[Dict[str, Any]]:
+        item = self._items.get(job_id)
+        if item and item[0] > time.time():
+            return dict(item[1])
+        return None
+
+    def wait(self, job_id: str, previous: Optional[Dict[str, Any]], timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.time() + timeout
+        with self._cond:
+            current = self._current(str(job_id))
+            while current == previous:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+                current = self._current(str(job_id))
+            return current
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'backend': 'memory',
+                'size': len(self._items),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl
+            }
+
+
+class RedisStatusStore(StatusStore):
+    """Статуси в Redis з TTL на ключі; видно всім процесам"""
+
+    KEY_PREFIX = 'transcription:status:'
+    PARTIAL_PREFIX = 'transcription:partial:'
+    CANCEL_PREFIX = 'transcription:cancel:'
+    EPOCH_PREFIX = 'transcription:partial-epoch:'
+    CHANNEL_PREFIX = 'transcription:events:'
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = STATUS_TTL_SECONDS):
+        import redis
+
+        self.url = url
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+
+    def ping(self) -> None:
+        """Перевіряє з'єднання: ``from_url`` не підключається, поки немає команд"""
+        self._client.ping()
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.KEY_PREFIX}{job_id}"
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self._client.get(self._key(job_id))
+        return json.loads(raw) if raw else None
+
+    def set(self, job_id: str, status: str, progress: int = 0, message: str = '') -> None:
+        payload = json.dumps({'status': status, 'progress': progress, 'message': message})
+        pipe = self._client.pipeline()
+        pipe.set(self._key(job_id), payload, ex=self.ttl)
+        if status in self.TERMINAL_STATUSES:
+            pipe.delete(f"{self.PARTIAL_PREFIX}{job_id}")
+        pipe.publish(f"{self.CHANNEL_PREFIX}{job_id}", payload)
+        pipe.execute()
+
+    def delete(self, job_id: str) -> None:
+        self._client.delete(self._key(job_id), f"{self.PARTIAL_PREFIX}{job_id}", f"{self.EPOCH_PREFIX}{job_id}")
+        self._client.publish(f"{self.CHANNEL_PREFIX}{job_id}", '')
+
+    def append_partial(self, job_id: str, segments: List[Dict[str, Any]]) -> None:
+        if not segments:
+            return
+        key = f"{self.PARTIAL_PREFIX}{job_id}"
+        pipe = self._client.pipeline()
+        pipe.rpush(key, *(json.dumps(segment) for segment in segments))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def get_partial(self, job_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        return [json.loads(raw) for raw in self._client.lrange(f"{self.PARTIAL_PREFIX}{job_id}", since, -1)]
+
+    def clear_partial(self, job_id: str) -> None:
+        pipe = self._client.pipeline()
+        pipe.delete(f"{self.PARTIAL_PREFIX}{job_id}")
+        pipe.incr(f"{self.EPOCH_PREFIX}{job_id}")
+        pipe.expire(f"{self.EPOCH_PREFIX}{job_id}", self.ttl)
+        pipe.execute()
+
+    def partial_epoch(self, job_id: str) -> int:
+        return int(self._client.get(f"{self.EPOCH_PREFIX}{job_id}") or 0)
+
+    def request_cancel(self, job_id: str) -> None:
+        self._client.set(f"{self.CANCEL_PREFIX}{job_id}", 1, ex=self.ttl)
+
+    def is_cancelled(self, job_id: str) -> bool:
+        return bool(self._client.exists(f"{self.CANCEL_PREFIX}{job_id}"))
+
+    def wait(self, job_id: str, previous: Optional[Dict[str, Any]], timeout: float) -> Optional[Dict[str, Any]]:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(f"{self.CHANNEL_PREFIX}{job_id}")
+            # зміну могли опублікувати до підписки
+            current = self.get(job_id)
+            deadline = time.time() + timeout
+            while current == previous:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                message = pubsub.get_message(timeout=remaining)
+                if message is not None:
+                    current = json.loads(message['data']) if message['data'] else None
+            return current
+        finally:
+            pubsub.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': 'redis', 'ttl_seconds': self.ttl}
+
+
+def create_status_store(backend: str = STATUS_STORE,
+                        required: bool = STATUS_STORE_REQUIRED) -> StatusStore:
+    """Сховище статусів; недоступний Redis замінюється пам'яттю лише коли він не ``required``.
+
+    З Celery прогрес, проміжні результати і прапорці скасування мають бути
+    спільними для веб-процесів і воркерів: сховище в пам'яті тихо зламало б
+    скасування і показувало застарілий статус, тож тоді краще впасти на старті.
+    """
+    if backend == 'redis':
+        try:
+            store = RedisStatusStore()
+            store.ping()
+            return store
+        except Exception as e:
+            if required:
+                raise RuntimeError(f"Redis status store unavailable at {REDIS_URL}: {str(e)}") from e
+            logger.error(f"Redis status store unavailable, using in-memory store: {str(e)}")
+    return MemoryStatusStore()
+
+
+status_store = create_status_store()
@@ -0,0 +1,222 @@
+"""Задачі Celery конвеєра транскрипції.
+
+Воркери запускаються окремо від Flask, напр.:
+
+    celery -A tasks worker -Q transcription.short -c 2
+    celery -A tasks worker -Q transcription.long -c 2
+
+``UPLOAD_FOLDER`` і ``WORK_FOLDER`` мають бути спільними для вебпроцесу і воркерів.
+asr і diarize однієї задачі виконуються паралельно, тож воркеру потрібно щонайменше 2 слоти.
+Воркер без GPU можна запустити з int8-моделями Whisper: ``WHISPER_QUANTIZE=int8 celery -A tasks worker ...``.
+Ядра діляться між задачами процесу (``cpu_governor``); з ``WORKER_CPU_SLOTS=N`` кожен
+процес prefork-пулу отримує свою 1/N частину ядер замість того, щоб усі змагались за всі.
+"""
+import os
+from functools import wraps
+
+import numpy as np
+from celery import chain, group
+from celery.exceptions import Ignore
+from celery.signals import worker_process_init
+
+from celery_app import celery, queue_for_duration
+from cpu_governor import core_governor
+from job_queue import JobCancelled, interruption_point
+from status_store import status_store
+from transcribe import get_transcriber, SAMPLE_RATE
+from transcription_pipeline import (AsrProgress, normalize_stage, asr_stage, diarize_stage, merge_stage,
+                                    save_result, cleanup_files)
+
+
+WORK_FOLDER = os.getenv('WORK_FOLDER', 'work')
+os.makedirs(WORK_FOLDER, exist_ok=True)
+
+
+def _flask_app():
+    # app.py сам імпортує цей модуль, тому застосунок беремо ліниво
+    from app import app
+    return app
+
+
+@worker_process_init.connect
+def preload_models(**kwargs):
+    """Завантажує моделі при старті процесу воркера, а не на першій задачі"""
+    slots = int(os.getenv('WORKER_CPU_SLOTS', '0'))
+    if slots:
+        from billiard.process import current_process
+        # index — номер процесу в пулі (0..concurrency-1)
+        core_governor.restrict(getattr(current_process(), 'index', 0) or 0, slots)
+
+    if os.getenv('WORKER_PRELOAD_MODELS', 'true').lower() == 'true':
+        from model_registry import model_registry
+        model_registry.preload()
+
+
+def _update_transcription(tr_uuid, **fields):
+    from models import db, Transcription
+
+    with _flask_app().app_context():
+        transcription = Transcription.query.filter_by(uuid=tr_uuid).first()
+        if not transcription:
+            raise Exception(f"Transcription with UUID {tr_uuid} not found")
+        for name, value in fields.items():
+            setattr(transcription, name, value)
+        db.session.commit()
+
+
+def _combine(jobs):
+    """Зливає результати паралельних етапів (asr і diarize) в один словник задачі"""
+    combined = {}
+    for job in jobs:
+        combined.update(job)
+    return combined
+
+
+def _cancel(job):
+    """Позначає транскрипцію скасованою і прибирає її файли"""
+    print(f"Transcription {job['uuid']} cancelled")
+    try:
+        _update_transcription(job['uuid'], status="cancelled")
+    except Exception as db_error:
+        print(f"Database error: {str(db_error)}")
+    status_store.set(job['uuid'], 'cancelled', 0, 'Transcription cancelled')
+    cleanup_files(job['file_path'], job.get('pre_loaded_file'), job.get('audio_path'))
+
+
+def _stage(header=False):
+    """Контрольна точка скасування перед етапом; позначає транскрипцію
+    як невдалу (або скасовану), якщо етап впав.
+
+    Етапи заголовка chord (``header=True``) при скасуванні не кидають
+    ``Ignore``: без результату chord ніколи не викличе merge. Вони
+    повертають задачу з позначкою ``cancelled``, а скасування оформлює
+    один раз наступний етап.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(job):
+            if isinstance(job, list):
+                job = _combine(job)
+            if job.get('cancelled'):
+                _cancel(job)
+                raise Ignore()
+            try:
+                interruption_point(job['uuid'])
+                return fn(job)
+            except JobCancelled:
+                if header:
+                    return dict(job, cancelled=True)
+                _cancel(job)
+                # зупиняє решту ланцюжка, не позначаючи задачу як збій
+                raise Ignore()
+            except Exception as e:
+                print(f"Transcription error for {job['uuid']}: {str(e)}")
+                try:
+                    _update_transcription(job['uuid'], status="failed")
+                except Exception as db_error:
+                    print(f"Database error: {str(db_error)}")
+                status_store.set(job['uuid'], 'failed', 0, f'Transcription failed: {str(e)}')
+                cleanup_files(job.get('audio_path'))
+                raise
+        return wrapper
+    return decorator
+
+
+@celery.task(name='transcription.normalize')
+@_stage()
+def normalize_task(job):
+    tr_uuid = job['uuid']
+    print(f"Starting transcription for {tr_uuid}")
+    _update_transcription(tr_uuid, status="processing")
+    status_store.set(tr_uuid, 'processing', 20, 'Normalizing audio...')
+
+    audio, pre_loaded_file, quality = normalize_stage(get_transcriber(preload_whisper=False), job['file_path'])
+    _update_transcription(tr_uuid, quality_report=quality)
+
+    audio_path = os.path.join(WORK_FOLDER, f"{tr_uuid}.npy")
+    np.save(audio_path, audio)
+    job.update(audio_path=audio_path, pre_loaded_file=pre_loaded_file,
+               duration=len(audio) / SAMPLE_RATE)
+    return job
+
+
+@celery.task(name='transcription.asr')
+@_stage(header=True)
+def asr_task(job):
+    status_store.set(job['uuid'], 'processing', 25, 'Transcribing audio...')
+
+    audio = np.load(job['audio_path'], mmap_mode='r')
+    with core_governor.job(job['uuid']):
+        core_governor.apply(job['uuid'], 'asr')
+        result, model_type = asr_stage(get_transcriber(), np.asarray(audio), job['model_type'],
+                                       AsrProgress(job['uuid']), profile=job.get('profile'),
+                                       language=job.get('language'))
+
+    job.update(result=result, model_type=model_type)
+    return job
+
+
+@celery.task(name='transcription.diarize')
+@_stage(header=True)
+def diarize_task(job):
+    # виконується паралельно з asr_task, тому прогрес не чіпаємо
+    if job['diarize']:
+        audio = np.load(job['audio_path'], mmap_mode='r')
+        # окремий запис у розподільнику: з -P threads asr тієї ж задачі може йти в цьому ж процесі
+        job_id = f"{job['uuid']}:diarization"
+        with core_governor.job(job_id):
+            core_governor.apply(job_id, 'diarization')
+            job['turns'] = diarize_stage(get_transcriber(preload_whisper=False, preload_diarization=True),
+                                         np.asarray(audio))
+    return job
+
+
+@celery.task(name='transcription.merge')
+@_stage()
+def merge_task(job):
+    from models import db, Transcription
+
+    tr_uuid = job['uuid']
+    status_store.set(tr_uuid, 'processing', 90, 'Saving results...')
+
+    result = job['result']
+    speakers_json, speakers_text = merge_stage(get_transcriber(preload_whisper=False), result, job.get('turns'))
+
+    with _flask_app().app_context():
+        transcription = Transcription.query.filter_by(uuid=tr_uuid).first()
+        if not transcription:
+            raise Exception(f"Transcription with UUID {tr_uuid} not found")
+        save_result(transcription, result, job['model_type'], speakers_json, speakers_text)
+        if transcription.audio and not transcription.audio.duration:
+            transcription.audio.duration = job['duration']
+        db.session.commit()
+
+    cleanup_files(job['file_path'], job.get('pre_loaded_file'), job['audio_path'])
+    status_store.set(tr_uuid, 'completed', 100, 'Transcription completed successfully')
+    print(f"Transcription completed for {tr_uuid}")
+    return {'uuid': tr_uuid, 'status': 'completed'}
+
+
+def enqueue_transcription(file_path, tr_uuid, model_type='base', diarize=True, duration=None,
+                          profile=None, language=None):
+    """Ставить конвеєр normalize -> (asr || diarize) -> merge у чергу за тривалістю"""
+    queue = queue_for_duration(duration)
+    job = {
+        'uuid': str(tr_uuid),
+        'file_path': file_path,
+        'model_type': model_type,
+        'diarize': diarize,
+        'profile': profile,
+        'language': language
+    }
+
+    status_store.set(tr_uuid, 'pending', 0, 'Task queued for processing')
+    chain(
+        normalize_task.s(job).set(queue=queue),
+        group(
+            asr_task.s().set(queue=queue),
+            diarize_task.s().set(queue=queue),
+        ),
+        merge_task.s().set(queue=queue),
+    ).apply_async()
+    return queue
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import sys
+import uuid
+
+import pytest
+
+# модулі застосунку лежать у корені репозиторію
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Flask-застосунок з моделями на тимчасовій sqlite-базі"""
+    from flask import Flask
+    from models import db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'test.db'}"
+    db.init_app(app)
+    with app.app_context():
+        # як PostgreSQL: UUID іде драйверу як є, тож фільтр за рядком uuid теж працює
+        db.engine.dialect.supports_native_uuid = True
+        sqlite3.register_adapter(uuid.UUID, str)
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def user(app):
+    from models import db, User
+
+    with app.app_context():
+        user = User(email='user@example.com')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def web(tmp_path_factory, monkeypatch):
+    """Модуль app.py з порожньою sqlite-базою; змінні оточення — лише для імпорту"""
+    base = tmp_path_factory.getbasetemp()
+    for name, value in (('DATABASE_URL', f"sqlite:///{base / 'web.db'}"), ('JWT_SECRET', 'test-secret'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1'), ('EMAIL_ADDRESS', 'test@example.com'),
+                        ('EMAIL_PASSWORD', 'secret')):
+        os.environ.setdefault(name, value)
+    if 'app' not in sys.modules:
+        # app.py створює теки завантажень у поточному каталозі
+        monkeypatch.chdir(base)
+    import app as web
+    from models import db
+    from status_store import MemoryStatusStore
+
+    monkeypatch.setattr(web, 'status_store', MemoryStatusStore())
+    with web.app.app_context():
+        db.engine.dialect.supports_native_uuid = True
+        sqlite3.register_adapter(uuid.UUID, str)
+        db.drop_all()
+        db.create_all()
+    return web
+
+
+@pytest.fixture
+def make_web_user(web):
+    """Фабрика користувачів app.py: email -> (id, заголовки з JWT)"""
+    import time
+    import jwt
+    from auth_routes import JWT_SECRET
+    from models import db, User
+
+    def make(email='user@example.com'):
+        with web.app.app_context():
+            user = User(email=email)
+            user.set_password('secret')
+            db.session.add(user)
+            db.session.commit()
+            token = jwt.encode({'user_id': user.id, 'email': user.email, 'exp': int(time.time()) + 3600},
+                               JWT_SECRET, algorithm='HS256')
+            return user.id, {'Authorization': f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def web_user(make_web_user):
+    """(id, заголовки з JWT) користувача застосунку app.py"""
+    return make_web_user()
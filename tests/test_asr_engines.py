@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import asr_engines
+from asr_engines import AsrEngine, FasterWhisperEngine
+from cpu_governor import CoreGovernor
+
+
+@pytest.fixture
+def created(monkeypatch):
+    faster_whisper = pytest.importorskip('faster_whisper')
+    models = []
+
+    class _WhisperModel:
+        def __init__(self, name, **kwargs):
+            models.append(kwargs)
+            self.calls = []
+
+        def transcribe(self, audio, **options):
+            self.calls.append((audio, options))
+            words = [SimpleNamespace(word=' Привіт', start=0.0, end=0.5, probability=0.9),
+                     SimpleNamespace(word=' світ', start=0.5, end=1.0, probability=0.8)]
+            segments = [SimpleNamespace(id=1, seek=0, start=0.0, end=1.0, text=' Привіт світ', tokens=(50, 51),
+                                        temperature=0.0, avg_logprob=-0.2, compression_ratio=1.1,
+                                        no_speech_prob=0.01, words=words),
+                        SimpleNamespace(id=2, seek=0, start=1.0, end=2.0, text=' ще раз', tokens=[52],
+                                        temperature=0.2, avg_logprob=-0.4, compression_ratio=1.3,
+                                        no_speech_prob=0.02, words=None)]
+            # faster-whisper віддає сегменти генератором
+            return iter(segments), SimpleNamespace(language='uk')
+
+    monkeypatch.setattr(faster_whisper, 'WhisperModel', _WhisperModel)
+    monkeypatch.setattr(asr_engines, 'core_governor', CoreGovernor(cores=list(range(6))))
+    return models
+
+
+def test_ct2_threads_follow_the_process_cores(created):
+    FasterWhisperEngine('tiny', num_workers=2)
+    # 0 означало б усі ядра машини; беремо ядра процесу, поділені між паралельними викликами
+    assert created[-1]['cpu_threads'] == 3
+
+
+def test_explicit_ct2_threads_are_kept(created):
+    FasterWhisperEngine('tiny', cpu_threads=5)
+    assert created[-1]['cpu_threads'] == 5
+
+
+def test_engine_must_implement_transcribe():
+    with pytest.raises(TypeError):
+        AsrEngine()
+
+
+def test_options_are_renamed_and_normalized():
+    options = FasterWhisperEngine._options({
+        'language': 'uk', 'logprob_threshold': -1.0, 'beam_size': None, 'best_of': None,
+        'temperature': (0.0, 0.2, 0.4), 'fp16': False, 'verbose': None, 'clip_timestamps': '0'})
+    assert options == {'language': 'uk', 'log_prob_threshold': -1.0, 'beam_size': 1, 'best_of': 1,
+                       'temperature': [0.0, 0.2, 0.4]}
+    # явні значення лишаються як є
+    assert FasterWhisperEngine._options({'beam_size': 5, 'best_of': 3, 'temperature': 0.0}) == \
+        {'beam_size': 5, 'best_of': 3, 'temperature': 0.0}
+
+
+def test_result_follows_the_openai_whisper_schema(created):
+    engine = FasterWhisperEngine('tiny')
+    audio = np.zeros(16000, dtype=np.float64)
+    result = engine.transcribe(audio, language='uk', word_timestamps=True, temperature=(0.0, 0.2))
+
+    passed_audio, options = engine.model.calls[-1]
+    assert passed_audio.dtype == np.float32
+    assert options['temperature'] == [0.0, 0.2] and options['word_timestamps']
+
+    assert result['text'] == ' Привіт світ ще раз' and result['language'] == 'uk'
+    first, second = result['segments']
+    assert first == {'id': 1, 'seek': 0, 'start': 0.0, 'end': 1.0, 'text': ' Привіт світ', 'tokens': [50, 51],
+                     'temperature': 0.0, 'avg_logprob': -0.2, 'compression_ratio': 1.1, 'no_speech_prob': 0.01,
+                     'words': [{'word': ' Привіт', 'start': 0.0, 'end': 0.5, 'probability': 0.9},
+                               {'word': ' світ', 'start': 0.5, 'end': 1.0, 'probability': 0.8}]}
+    assert second['tokens'] == [52] and second['words'] == []
+
+
+def test_words_only_with_word_timestamps(created):
+    result = FasterWhisperEngine('tiny').transcribe(np.zeros(16000, dtype=np.float32))
+    assert all('words' not in segment for segment in result['segments'])
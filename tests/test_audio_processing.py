@@ -0,0 +1,217 @@
+import io
+import json
+import math
+import subprocess
+import wave
+
+import numpy as np
+import pytest
+
+import audio_processing
+from audio_processing import (SAMPLE_RATE, CLIP_LEVEL, SPEECH_MARGIN_DB, SPEECH_MIN_DB, QualityAnalyzer,
+                              analyze_quality, quality_issues, probe_audio)
+
+
+def _seconds(duration):
+    return np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+
+
+def _tone_with_noise(duration=20.0):
+    """Тон, що вмикається щодругу секунду («мовлення»), поверх тихого шуму"""
+    t = _seconds(duration)
+    gate = t.astype(int) % 2 == 0
+    noise = 0.003 * np.random.default_rng(0).standard_normal(len(t))
+    return (0.1 * np.sin(2 * np.pi * 440 * t) * gate + noise).astype(np.float32)
+
+
+def _clipped(duration=20.0):
+    return np.clip(2 * np.sin(2 * np.pi * 440 * _seconds(duration)), -1.0, 1.0).astype(np.float32)
+
+
+SIGNALS = {
+    'tone_with_noise': _tone_with_noise,
+    'clipped': _clipped,
+    'silent': lambda: np.zeros(3 * SAMPLE_RATE, dtype=np.float32),
+}
+
+
+def _whole_array_report(audio, frame_ms=audio_processing.QUALITY_FRAME_MS):
+    """Ті самі метрики напряму по всьому масиву, без блоків і гістограми"""
+    audio = audio.astype(np.float64)
+    frame = int(SAMPLE_RATE * frame_ms / 1000.0)
+    n_frames = len(audio) // frame
+    mean_square = np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1)
+    # гістограма починається з QUALITY_FLOOR_DB: тихіші кадри потрапляють у перший кошик
+    levels = np.maximum(10 * np.log10(np.maximum(mean_square, 1e-20)), audio_processing.QUALITY_FLOOR_DB)
+    noise_floor = float(np.quantile(levels, 0.1))
+    speech = levels >= max(noise_floor + SPEECH_MARGIN_DB, SPEECH_MIN_DB)
+    snr = 10 * math.log10(np.mean(np.power(10.0, levels[speech] / 10))) - noise_floor if speech.any() else None
+    return {
+        'rms': float(np.sqrt(np.mean(audio ** 2))),
+        'peak': float(np.max(np.abs(audio))),
+        'clipping_ratio': float(np.mean(np.abs(audio) >= CLIP_LEVEL)),
+        'noise_floor_db': noise_floor,
+        'speech_ratio': float(np.mean(speech)),
+        'snr_db': snr,
+    }
+
+
+@pytest.mark.parametrize('name', list(SIGNALS))
+def test_streamed_report_matches_whole_array(name):
+    audio = SIGNALS[name]()
+    report = analyze_quality(audio, block_size=12345)
+    expected = _whole_array_report(audio)
+
+    assert report['duration'] == len(audio) / SAMPLE_RATE
+    assert report['rms'] == pytest.approx(expected['rms'], abs=1e-6)
+    assert report['peak'] == pytest.approx(expected['peak'], abs=1e-6)
+    assert report['clipping_ratio'] == pytest.approx(expected['clipping_ratio'], abs=1e-6)
+    # рівні кадрів у гістограмі округлені до її кроку
+    assert report['noise_floor_db'] == pytest.approx(expected['noise_floor_db'], abs=audio_processing.QUALITY_BIN_DB)
+    assert report['speech_ratio'] == pytest.approx(expected['speech_ratio'], abs=0.01)
+    if expected['snr_db'] is None:
+        assert report['snr_db'] is None
+    else:
+        assert report['snr_db'] == pytest.approx(expected['snr_db'], abs=1.0)
+
+
+def test_block_size_does_not_change_the_accumulated_state():
+    audio = _tone_with_noise()
+    whole, streamed = QualityAnalyzer(), QualityAnalyzer()
+    whole.update(audio)
+    # блоки, не кратні кадру: хвіст переноситься між викликами
+    for start in range(0, len(audio), 1001):
+        streamed.update(audio[start:start + 1001])
+
+    assert np.array_equal(whole.histogram, streamed.histogram)
+    assert (whole.peak, whole.clipped, whole.samples) == (streamed.peak, streamed.clipped, streamed.samples)
+    assert whole.sum_squares == pytest.approx(streamed.sum_squares)
+
+
+def test_quality_issues_for_synthetic_signals():
+    assert quality_issues(analyze_quality(_tone_with_noise())) == []
+    assert 'Audio is clipped' in quality_issues(analyze_quality(_clipped()))
+    assert quality_issues(analyze_quality(SIGNALS['silent']())) == \
+        ['Audio too short for reliable diarization', 'Audio is silent']
+
+    # тон тоне в шумі: шумовий фон піднімається до рівня «мовлення»
+    noisy = _tone_with_noise() + 0.05 * np.random.default_rng(1).standard_normal(20 * SAMPLE_RATE)
+    report = analyze_quality(noisy.astype(np.float32))
+    assert report['snr_db'] is None
+    assert quality_issues(report) == ['Little or no speech detected']
+
+
+def _pcm16(audio):
+    return (np.clip(audio, -1.0, 32767 / 32768) * 32768).astype(np.int16)
+
+
+def _write_wav(path, pcm, channels=1, sample_width=2, rate=SAMPLE_RATE):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return str(path)
+
+
+class _FfmpegProcess:
+    def __init__(self, pcm, returncode=0):
+        self.stdout = io.BytesIO(pcm.tobytes())
+        self.returncode = returncode
+
+    def wait(self):
+        return self.returncode
+
+
+def test_file_is_decoded_by_ffmpeg_in_blocks(monkeypatch):
+    pcm = _pcm16(_tone_with_noise())
+    commands = []
+
+    def popen(command, **kwargs):
+        commands.append(command)
+        return _FfmpegProcess(pcm)
+
+    monkeypatch.setattr(audio_processing.shutil, 'which', lambda binary: f'/usr/bin/{binary}')
+    monkeypatch.setattr(audio_processing.subprocess, 'Popen', popen)
+    report = analyze_quality('/uploads/a.mp3', block_size=4000)
+
+    assert commands[0][0] == audio_processing.FFMPEG_BINARY and '/uploads/a.mp3' in commands[0]
+    assert commands[0][commands[0].index('-ar') + 1] == str(SAMPLE_RATE)
+    assert report == analyze_quality(pcm / 32768.0)
+
+
+def test_ffmpeg_failure_is_raised(monkeypatch):
+    monkeypatch.setattr(audio_processing.shutil, 'which', lambda binary: f'/usr/bin/{binary}')
+    monkeypatch.setattr(audio_processing.subprocess, 'Popen',
+                        lambda command, **kwargs: _FfmpegProcess(np.zeros(0, dtype=np.int16), returncode=1))
+    with pytest.raises(RuntimeError):
+        analyze_quality('/uploads/broken.mp3')
+
+
+def test_wav_fallback_without_ffmpeg(monkeypatch, tmp_path):
+    monkeypatch.setattr(audio_processing.shutil, 'which', lambda binary: None)
+    left, right = _pcm16(_tone_with_noise()), _pcm16(_clipped())
+    stereo = np.stack([left, right], axis=1)
+    report = analyze_quality(_write_wav(tmp_path / 'stereo.wav', stereo, channels=2), block_size=3000)
+    # канали зводяться в моно
+    mono = (left.astype(np.float64) + right) / 2 / 32768.0
+    assert report == analyze_quality(mono)
+
+    with pytest.raises(RuntimeError):
+        analyze_quality(_write_wav(tmp_path / 'pcm8.wav', np.zeros(100, dtype=np.uint8), sample_width=1))
+
+
+def _ffprobe(monkeypatch, payload):
+    calls = []
+
+    def run(command, **kwargs):
+        calls.append(command)
+        return subprocess.CompletedProcess(command, 0, stdout=json.dumps(payload).encode(), stderr=b'')
+
+    monkeypatch.setattr(audio_processing.subprocess, 'run', run)
+    return calls
+
+
+def test_probe_parses_ffprobe_output(monkeypatch, tmp_path):
+    path = _write_wav(tmp_path / 'a.wav', np.zeros(SAMPLE_RATE, dtype=np.int16))
+    calls = _ffprobe(monkeypatch, {
+        'streams': [{'codec_name': 'mp3', 'sample_rate': '44100', 'channels': 2, 'duration': '12.0'}],
+        'format': {'duration': '12.5'}})
+
+    # заголовки ffprobe мають перевагу над wave, навіть для WAV
+    assert probe_audio(path) == {'duration': 12.5, 'codec': 'mp3', 'sample_rate': 44100, 'channels': 2}
+    assert calls[0][0] == audio_processing.FFPROBE_BINARY and calls[0][-1] == path
+
+
+def test_probe_keeps_missing_ffprobe_fields_null(monkeypatch):
+    _ffprobe(monkeypatch, {'streams': [{'codec_name': 'opus', 'duration': 'N/A'}], 'format': {}})
+    assert probe_audio('/uploads/a.webm') == {'duration': None, 'codec': 'opus', 'sample_rate': None,
+                                              'channels': None}
+
+    # тривалість лише в потоці
+    _ffprobe(monkeypatch, {'streams': [{'codec_name': 'aac', 'sample_rate': '48000', 'channels': 1,
+                                        'duration': '3.25'}]})
+    assert probe_audio('/uploads/a.m4a')['duration'] == 3.25
+
+
+def test_probe_falls_back_to_wave_without_ffprobe(monkeypatch, tmp_path):
+    monkeypatch.setattr(audio_processing, 'FFPROBE_BINARY', str(tmp_path / 'missing-ffprobe'))
+    pcm = np.zeros((SAMPLE_RATE // 2, 2), dtype=np.int16)
+    path = _write_wav(tmp_path / 'stereo.wav', pcm, channels=2, rate=8000)
+    assert probe_audio(path) == {'duration': 1.0, 'codec': 'pcm_s16le', 'sample_rate': 8000, 'channels': 2}
+
+
+def test_probe_falls_back_to_wave_when_ffprobe_fails(monkeypatch, tmp_path):
+    def run(command, **kwargs):
+        raise subprocess.CalledProcessError(1, command)
+
+    monkeypatch.setattr(audio_processing.subprocess, 'run', run)
+    path = _write_wav(tmp_path / 'a.wav', np.zeros(SAMPLE_RATE, dtype=np.int16))
+    assert probe_audio(path) == {'duration': 1.0, 'codec': 'pcm_s16le', 'sample_rate': SAMPLE_RATE, 'channels': 1}
+
+
+def test_probe_without_ffprobe_leaves_other_formats_unknown(monkeypatch, tmp_path):
+    monkeypatch.setattr(audio_processing, 'FFPROBE_BINARY', str(tmp_path / 'missing-ffprobe'))
+    path = tmp_path / 'a.mp3'
+    path.write_bytes(b'ID3' + bytes(64))
+    assert probe_audio(str(path)) == {'duration': None, 'codec': None, 'sample_rate': None, 'channels': None}
@@ -0,0 +1,174 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+import torch
+import whisper
+from whisper.audio import N_FRAMES, N_SAMPLES, SAMPLE_RATE
+from whisper.model import ModelDimensions, Whisper
+from whisper.tokenizer import get_tokenizer
+
+import batch_asr
+from asr_engines import OpenAIWhisperEngine
+from batch_asr import WhisperBatcher, log_mel, split_segments
+from cpu_governor import CoreGovernor
+from model_registry import ModelRegistry
+
+
+# Одне вікно, один прохід жадібного декодування: без відкату по температурах
+OPTIONS = {'language': 'uk', 'temperature': 0.0, 'fp16': False, 'compression_ratio_threshold': None,
+           'logprob_threshold': None, 'no_speech_threshold': None, 'condition_on_previous_text': False}
+
+
+def _audio(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    return (0.1 * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
+
+
+def _registry(model):
+    registry = ModelRegistry(engine='openai-whisper', pinned_models=[])
+    registry._get_or_load('whisper:tiny', lambda: OpenAIWhisperEngine(model))
+    return registry
+
+
+@pytest.fixture(scope='module')
+def random_model():
+    """Мала модель з випадковими вагами: архітектура і токенізатор Whisper без завантаження"""
+    torch.manual_seed(0)
+    dims = ModelDimensions(n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+                           n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=1)
+    return Whisper(dims).eval()
+
+
+def test_mel_matches_transcribe_features():
+    audio = torch.from_numpy(_audio(7.3))
+    # так рахує whisper.transcribe для першого вікна
+    full = whisper.log_mel_spectrogram(audio, 80, padding=N_SAMPLES)
+    expected = whisper.pad_or_trim(full[:, :full.shape[-1] - N_FRAMES], N_FRAMES)
+
+    mel = log_mel(audio, 80)
+    assert mel.shape == (80, N_FRAMES)
+    assert torch.equal(mel, expected)
+    # доповнення запису до 30 с перед спектрограмою дає інші ознаки
+    assert not torch.allclose(mel, whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=80))
+
+
+def test_batched_decode_sees_the_same_mel_as_transcribe(random_model, monkeypatch):
+    seen = {}
+    decode = whisper.decode
+
+    def recording_decode(source):
+        def wrapper(model, mel, options):
+            seen.setdefault(source, []).append(mel.detach().clone())
+            return decode(model, mel, options)
+        return wrapper
+
+    monkeypatch.setattr(Whisper, 'decode', recording_decode('transcribe'))
+    monkeypatch.setattr(batch_asr.whisper, 'decode', recording_decode('batch'))
+
+    audio = _audio(5.0)
+    random_model.transcribe(audio, **OPTIONS)
+    batcher = WhisperBatcher(_registry(random_model), batch_size=1, max_wait_ms=0)
+    batcher.submit('tiny', audio, OPTIONS).result(timeout=60)
+
+    assert torch.allclose(seen['batch'][0][0], seen['transcribe'][0].reshape(80, N_FRAMES))
+
+
+def test_batched_result_matches_transcribe(random_model):
+    engine = OpenAIWhisperEngine(random_model)
+    batcher = WhisperBatcher(_registry(random_model), batch_size=3, max_wait_ms=2000)
+    audios = [_audio(seconds, seed) for seed, seconds in enumerate((3.0, 8.5, 20.0))]
+
+    futures = [batcher.submit('tiny', audio, OPTIONS) for audio in audios]
+    results = [future.result(timeout=120) for future in futures]
+    # три сумісні запити пройшли одним пакетом
+    assert batcher.stats()['batches'] == 1 and batcher.stats()['max_batch'] == 3
+
+    for audio, result in zip(audios, results):
+        expected = engine.transcribe(audio, **OPTIONS)
+        assert result['language'] == expected['language']
+        assert result['text'] == ''.join(segment['text'] for segment in expected['segments'])
+
+
+def test_dispatcher_uses_the_cores_of_the_requesting_jobs(random_model, monkeypatch):
+    governor = CoreGovernor(cores=list(range(6)))
+    monkeypatch.setattr(batch_asr, 'core_governor', governor)
+    threads = []
+    decode = whisper.decode
+
+    def recording_decode(model, mel, options):
+        threads.append(torch.get_num_threads())
+        return decode(model, mel, options)
+
+    monkeypatch.setattr(batch_asr.whisper, 'decode', recording_decode)
+    batcher = WhisperBatcher(_registry(random_model), batch_size=2, max_wait_ms=2000)
+    ready = threading.Barrier(3)
+    results = []
+
+    def job(job_id):
+        with governor.job(job_id):
+            ready.wait()
+            governor.apply(job_id)
+            results.append(batcher.submit('tiny', _audio(2.0), OPTIONS).result(timeout=60))
+            ready.wait()
+
+    jobs = [threading.Thread(target=job, args=(job_id,)) for job_id in ('a', 'b')]
+    with governor.job('c'):
+        for thread in jobs:
+            thread.start()
+        ready.wait()
+        ready.wait()
+    for thread in jobs:
+        thread.join()
+
+    # три задачі по два ядра; пакет задач a і b рахується на їхніх чотирьох
+    assert len(results) == 2 and batcher.stats()['batches'] == 1
+    assert threads == [4]
+
+
+def test_incompatible_requests_are_not_batched(random_model):
+    batcher = WhisperBatcher(_registry(random_model))
+    short = _audio(5.0)
+    assert batcher.accepts(short, 'tiny', OPTIONS)
+    assert not batcher.accepts(_audio(31.0), 'tiny', OPTIONS)
+    assert not batcher.accepts(short, 'tiny', dict(OPTIONS, word_timestamps=True))
+    assert not batcher.accepts(short, 'tiny', dict(OPTIONS, initial_prompt='Глосарій'))
+    with pytest.raises(ValueError):
+        batcher.submit('tiny', short, dict(OPTIONS, initial_prompt='Глосарій'))
+
+
+def test_batcher_waits_for_neighbours_only_up_to_max_wait(random_model):
+    batcher = WhisperBatcher(_registry(random_model), batch_size=8, max_wait_ms=10)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        batcher.submit('tiny', _audio(2.0), OPTIONS).result(timeout=60))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 2
+    assert batcher.stats()['requests'] == 2 and batcher.stats()['queued'] == 0
+
+
+def test_split_segments_by_timestamp_tokens():
+    tokenizer = get_tokenizer(True, language='en', task='transcribe')
+    ts = lambda seconds: tokenizer.timestamp_begin + int(round(seconds / 0.02))
+    hello, world = tokenizer.encode(' hello'), tokenizer.encode(' world')
+    tokens = [ts(0.0), *hello, ts(1.5), ts(2.0), *world]
+
+    segments = split_segments(tokens, tokenizer, duration=3.0)
+    assert [(s['start'], s['end'], s['text']) for s in segments] == [(0.0, 1.5, ' hello'), (2.0, 3.0, ' world')]
+
+
+@pytest.mark.skipif(not os.path.exists(os.path.expanduser('~/.cache/whisper/tiny.pt')),
+                    reason='tiny Whisper weights are not cached')
+def test_batched_result_matches_transcribe_with_real_weights():
+    model = whisper.load_model('tiny', device='cpu')
+    audio = _audio(12.0)
+    batcher = WhisperBatcher(_registry(model), batch_size=1, max_wait_ms=0)
+    options = dict(OPTIONS, language='en')
+
+    result = batcher.submit('tiny', audio, options).result(timeout=120)
+    expected = model.transcribe(audio, **options)
+    assert result['text'].strip() == expected['text'].strip()
@@ -0,0 +1,189 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import chunked_transcription
+import model_registry
+from audio_processing import SAMPLE_RATE
+from chunked_transcription import (carried_prompt, transcribe_windowed, transcribe_chunked, merge_chunk_results,
+                                   split_on_silence)
+from cpu_governor import CoreGovernor
+
+
+class _RecordingModel:
+    """Модель, що запам'ятовує параметри викликів; кожне вікно — один сегмент"""
+
+    def __init__(self, temperatures=None):
+        self.calls = []
+        self.temperatures = temperatures or {}
+
+    def transcribe(self, audio, **options):
+        index = len(self.calls)
+        self.calls.append(dict(options))
+        duration = len(audio) / SAMPLE_RATE
+        return {
+            'text': f' window {index}',
+            'language': options.get('language') or 'uk',
+            'segments': [{'id': 0, 'seek': 0, 'start': 0.0, 'end': duration, 'text': f' window {index}',
+                          'temperature': self.temperatures.get(index, 0.0)}]
+        }
+
+
+def _speech_with_pauses(bursts=4, burst_seconds=2.0, pause_seconds=1.0):
+    rng = np.random.default_rng(0)
+    parts = []
+    for _ in range(bursts):
+        parts.append(0.3 * rng.standard_normal(int(burst_seconds * SAMPLE_RATE)).astype(np.float32))
+        parts.append(np.zeros(int(pause_seconds * SAMPLE_RATE), dtype=np.float32))
+    return np.concatenate(parts)
+
+
+@pytest.fixture
+def audio():
+    audio = _speech_with_pauses()
+    assert len(split_on_silence(audio, 3.0, SAMPLE_RATE)) > 2
+    return audio
+
+
+def test_windows_carry_previous_text_as_prompt(audio):
+    model = _RecordingModel()
+    reports = []
+    result = transcribe_windowed(model, audio, {'condition_on_previous_text': True},
+                                 lambda segments, decoded, total: reports.append(decoded), window_seconds=3.0)
+
+    assert 'initial_prompt' not in model.calls[0]
+    for i, call in enumerate(model.calls[1:], 1):
+        assert call['initial_prompt'] == f'window {i - 1}'
+        # мова першого вікна фіксується для решти
+        assert call['language'] == 'uk'
+    assert reports == sorted(reports) and reports[-1] == pytest.approx(len(audio) / SAMPLE_RATE)
+    assert result['text'] == ''.join(f' window {i}' for i in range(len(model.calls)))
+
+
+def test_no_prompt_without_condition_on_previous_text(audio):
+    model = _RecordingModel()
+    transcribe_windowed(model, audio, {'condition_on_previous_text': False}, lambda *args: None, window_seconds=3.0)
+    assert len(model.calls) > 1
+    assert all('initial_prompt' not in call for call in model.calls)
+
+
+def test_high_temperature_window_resets_context(audio):
+    # друге вікно декодоване з temperature 0.8: Whisper скинув би підказку
+    model = _RecordingModel(temperatures={1: 0.8})
+    transcribe_windowed(model, audio, {'condition_on_previous_text': True, 'initial_prompt': 'Глосарій'},
+                        lambda *args: None, window_seconds=3.0)
+    assert model.calls[0]['initial_prompt'] == 'Глосарій'
+    assert model.calls[1]['initial_prompt'] == 'window 0'
+    assert model.calls[2]['initial_prompt'] == 'Глосарій'
+
+
+def test_resumed_windows_keep_the_prompt(audio):
+    state = {}
+    model = _RecordingModel()
+
+    def interrupt(segments, decoded, total):
+        if len(model.calls) == 2:
+            raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        transcribe_windowed(model, audio, {'condition_on_previous_text': True}, interrupt,
+                            window_seconds=3.0, state=state)
+
+    resumed = _RecordingModel()
+    resumed.calls = [None, None]
+    result = transcribe_windowed(resumed, audio, {'condition_on_previous_text': True}, lambda *args: None,
+                                 window_seconds=3.0, state=state)
+    assert resumed.calls[2]['initial_prompt'] == 'window 1'
+    assert len(result['segments']) == len(state['bounds'])
+
+
+def test_carried_prompt_uses_text_after_last_reset():
+    result = {'segments': [{'text': ' a', 'temperature': 0.0}, {'text': ' b', 'temperature': 1.0},
+                           {'text': ' c', 'temperature': 0.2}, {'text': ' d', 'temperature': 0.0}]}
+    assert carried_prompt(result) == 'c d'
+    assert carried_prompt({'segments': [{'text': ' a', 'temperature': 1.0}]}) is None
+
+
+def test_merge_shifts_window_segments():
+    bounds = [(0, SAMPLE_RATE), (SAMPLE_RATE, 3 * SAMPLE_RATE)]
+    results = [{'text': ' a', 'language': 'en', 'segments': [{'id': 0, 'start': 0.0, 'end': 1.0, 'text': ' a'}]},
+               {'text': ' b', 'language': 'en', 'segments': [{'id': 0, 'start': 0.5, 'end': 2.0, 'text': ' b'}]}]
+    merged = merge_chunk_results(results, bounds, SAMPLE_RATE)
+    assert [(s['id'], s['start'], s['end']) for s in merged['segments']] == [(0, 0.0, 1.0), (1, 1.5, 3.0)]
+
+
+def test_split_on_silence_cuts_inside_pauses(audio):
+    bounds = split_on_silence(audio, 3.0, SAMPLE_RATE)
+    # суміжні шматки покривають увесь запис і не довші за ліміт
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(audio)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(bounds, bounds[1:]))
+    assert all(end - start <= 3 * SAMPLE_RATE for start, end in bounds)
+    # межі — у паузах (2–3 с, 5–6 с, ...), а не посеред «мовлення»
+    for _, cut in bounds[:-1]:
+        assert 2.0 < (cut / SAMPLE_RATE) % 3.0 < 3.0
+        assert not np.any(audio[cut:cut + SAMPLE_RATE // 2])
+
+
+def test_split_on_silence_without_pauses_keeps_the_limit():
+    noise = 0.3 * np.random.default_rng(1).standard_normal(10 * SAMPLE_RATE).astype(np.float32)
+    bounds = split_on_silence(noise, 3.0, SAMPLE_RATE)
+    assert len(bounds) >= 4 and all(end - start <= 3 * SAMPLE_RATE for start, end in bounds)
+    assert split_on_silence(noise, 30.0, SAMPLE_RATE) == [(0, len(noise))]
+
+
+def test_merge_renumbers_and_shifts_segments_and_words():
+    bounds = [(0, 2 * SAMPLE_RATE), (2 * SAMPLE_RATE, 5 * SAMPLE_RATE)]
+    words = [{'word': ' c', 'start': 0.2, 'end': 0.6, 'probability': 0.9}]
+    results = [
+        {'text': ' a b', 'language': 'en', 'segments': [
+            {'id': 0, 'seek': 0, 'start': 0.0, 'end': 1.0, 'text': ' a'},
+            {'id': 1, 'seek': 0, 'start': 1.0, 'end': 2.0, 'text': ' b'}]},
+        {'text': ' c', 'language': 'uk', 'segments': [
+            {'id': 0, 'seek': 0, 'start': 0.1, 'end': 0.7, 'text': ' c', 'words': words}]}]
+    merged = merge_chunk_results(results, bounds, SAMPLE_RATE)
+
+    assert merged['text'] == ' a b c'
+    assert [(s['id'], s['seek'], s['start'], s['end']) for s in merged['segments']] == \
+        [(0, 0, 0.0, 1.0), (1, 0, 1.0, 2.0), (2, 200, 2.1, 2.7)]
+    assert merged['segments'][2]['words'] == [{'word': ' c', 'start': 2.2, 'end': 2.6, 'probability': 0.9}]
+    # мова — та, якою сказано більшу частину запису; вхідні сегменти не змінюються
+    assert merged['language'] == 'uk'
+    assert results[1]['segments'][0]['start'] == 0.1 and words[0]['start'] == 0.2
+
+
+def test_chunks_are_transcribed_by_their_bounds(audio, monkeypatch):
+    seen = []
+
+    def transcribe_chunk(model_name, chunk, options, budget=None):
+        seen.append(len(chunk))
+        return {'text': ' x', 'language': 'uk',
+                'segments': [{'id': 0, 'start': 0.0, 'end': len(chunk) / SAMPLE_RATE, 'text': ' x'}]}
+
+    monkeypatch.setattr(chunked_transcription, '_transcribe_chunk', transcribe_chunk)
+    monkeypatch.setattr(chunked_transcription, 'get_pool', lambda model_name, workers: ThreadPoolExecutor(1))
+    state, reported = {}, []
+    result = transcribe_chunked(audio, 'tiny', {}, chunk_seconds=3.0, workers=2, state=state,
+                                on_segments=lambda segments, decoded, total: reported.extend(segments))
+
+    bounds = state['bounds']
+    assert sorted(seen) == sorted(end - start for start, end in bounds)
+    assert [s['start'] for s in result['segments']] == [start / SAMPLE_RATE for start, _ in bounds]
+    assert [s['id'] for s in reported] == list(range(len(bounds)))
+
+
+def test_pool_workers_take_distinct_core_slots(monkeypatch):
+    governor = CoreGovernor(cores=list(range(8)))
+    monkeypatch.setattr(chunked_transcription, 'core_governor', governor)
+    monkeypatch.setattr(chunked_transcription, 'limit_threads', lambda threads: None)
+    monkeypatch.setattr(model_registry.model_registry, 'whisper', lambda name: None)
+    slots = multiprocessing.get_context('spawn').Value('i', 0)
+
+    seen = []
+    for _ in range(2):
+        # кожен процес пулу стартує з ядрами батьківського процесу
+        governor.cores = list(range(8))
+        chunked_transcription._init_worker('tiny', [2, 3, 4, 5], 2, slots)
+        seen.append(governor.cores)
+    assert seen == [[2, 3], [4, 5]]
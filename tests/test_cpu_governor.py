@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+import torch
+
+import cpu_governor
+from cpu_governor import CoreGovernor, split_budget
+
+
+CORES = list(range(8))
+
+
+def test_cores_are_split_between_running_jobs():
+    governor = CoreGovernor(cores=CORES)
+    with governor.job('a') as budget:
+        assert budget == {'threads': 8, 'cores': CORES}
+        with governor.job('b'), governor.job('c'):
+            budgets = [governor.budget(job_id)['cores'] for job_id in 'abc']
+            # суміжні діапазони, без перетинів, усі ядра роздані
+            assert budgets == [[0, 1, 2], [3, 4, 5], [6, 7]]
+        # інші задачі завершились — a знову отримує всі ядра
+        assert governor.budget('a')['threads'] == 8
+
+
+def test_more_jobs_than_cores_get_one_core_each():
+    governor = CoreGovernor(cores=[0, 1])
+    with governor.job('a'), governor.job('b'), governor.job('c'):
+        assert [governor.budget(job_id)['cores'] for job_id in 'abc'] == [[0], [1], [0]]
+
+
+def test_parallel_diarization_splits_the_job_budget_until_it_finishes():
+    governor = CoreGovernor(cores=CORES, asr_share=0.75)
+    with governor.job('a', parallel_diarization=True):
+        assert governor.budget('a', 'asr')['cores'] == [0, 1, 2, 3, 4, 5]
+        assert governor.budget('a', 'diarization')['cores'] == [6, 7]
+
+        governor.finish_stage('a')
+        assert governor.budget('a', 'asr')['threads'] == 8
+
+    with pytest.raises(ValueError):
+        governor.budget('a', 'alignment')
+
+
+def test_split_budget_between_pool_processes():
+    budgets = split_budget({'threads': 6, 'cores': [2, 3, 4, 5, 6, 7]}, 3)
+    assert [b['cores'] for b in budgets] == [[2, 3], [4, 5], [6, 7]]
+    # процесів більше, ніж ядер — по одному ядру кожному
+    assert all(b['threads'] == 1 for b in split_budget({'threads': 2, 'cores': [0, 1]}, 4))
+
+
+def test_restrict_leaves_the_process_its_slot(monkeypatch):
+    monkeypatch.setattr(cpu_governor, 'CPU_PINNING', False)
+    governor = CoreGovernor(cores=CORES)
+    governor.restrict(1, 4)
+    assert governor.cores == [2, 3]
+
+
+def test_shared_threads_cover_all_jobs_of_a_batch():
+    governor = CoreGovernor(cores=CORES)
+    assert governor.shared_threads([{'threads': 2, 'cores': [0, 1]}, {'threads': 2, 'cores': [1, 2]}]) == 3
+    assert governor.shared_threads([None]) == 8
+
+
+def test_apply_sets_torch_threads_in_the_job_thread():
+    governor = CoreGovernor(cores=list(range(4)))
+    seen = {}
+
+    def job():
+        with governor.job('a'), governor.job('b'):
+            # лінива ініціалізація пулу потоків torch при першій операції
+            torch.ones(64, 64) @ torch.ones(64, 64)
+            governor.apply('a')
+            seen['first'] = torch.get_num_threads()
+            torch.ones(64, 64) @ torch.ones(64, 64)
+            # бюджет не змінився, але виставляється знову
+            torch.set_num_threads(4)
+            governor.apply('a')
+            seen['again'] = torch.get_num_threads()
+            assert governor.current() == {'threads': 2, 'cores': [0, 1]}
+        seen['after'] = governor.current()
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    thread.join()
+    assert seen == {'first': 2, 'again': 2, 'after': None}
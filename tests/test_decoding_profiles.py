@@ -0,0 +1,38 @@
+import importlib
+import logging
+
+import pytest
+
+import decoding_profiles
+from decoding_profiles import decode_options
+
+
+@pytest.fixture
+def reload_with_profile(monkeypatch):
+    def reload(value):
+        monkeypatch.setenv('TRANSCRIPTION_PROFILE', value)
+        return importlib.reload(decoding_profiles)
+
+    yield reload
+    monkeypatch.delenv('TRANSCRIPTION_PROFILE', raising=False)
+    importlib.reload(decoding_profiles)
+
+
+def test_default_profile_from_environment(reload_with_profile):
+    assert reload_with_profile('accurate').DEFAULT_PROFILE == 'accurate'
+
+
+def test_unknown_default_profile_falls_back_to_balanced(reload_with_profile, caplog):
+    with caplog.at_level(logging.WARNING, logger='decoding_profiles'):
+        module = reload_with_profile('fastest')
+    assert module.DEFAULT_PROFILE == 'balanced'
+    assert 'fastest' in caplog.text
+    assert module.decode_options()['beam_size'] == 3
+
+
+def test_decode_options():
+    options = decode_options('fast', device='cuda', language='uk')
+    assert 'beam_size' not in options
+    assert options['fp16'] and options['language'] == 'uk'
+    with pytest.raises(ValueError):
+        decode_options('unknown')
@@ -0,0 +1,111 @@
+import hashlib
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+from dedup_cache import DedupCache, save_with_hash
+from models import db, User, Audio, Transcription
+
+
+SHA = hashlib.sha256(b'audio bytes').hexdigest()
+
+
+def _finished(user_id, sha256=SHA, model='base', diarization=True, profile='balanced', language='uk',
+              status='completed', created_at=None, text='привіт'):
+    audio = Audio(user_id=user_id, filename='a.wav', file_path='/tmp/a.wav', sha256=sha256)
+    db.session.add(audio)
+    db.session.flush()
+    transcription = Transcription(user_id=user_id, audio_id=audio.id, text=text, speakers_text=f"SPEAKER_00: {text}",
+                                  speakers_json={'segments': []}, language=language, model=model,
+                                  profile=profile, diarization=diarization, status=status,
+                                  quality_report={'snr_db': 20.0}, created_at=created_at or datetime.utcnow())
+    db.session.add(transcription)
+    db.session.commit()
+    return transcription
+
+
+def test_save_with_hash_streams_to_disk(tmp_path):
+    data = bytes(range(256)) * 5000
+    path = tmp_path / 'upload.bin'
+    size, sha256 = save_with_hash(io.BytesIO(data), str(path), chunk_size=4096)
+    assert size == len(data)
+    assert sha256 == hashlib.sha256(data).hexdigest()
+    assert path.read_bytes() == data
+
+
+def test_lookup_matches_content_and_settings(app, user):
+    cache = DedupCache(retention_days=30, scope='user')
+    with app.app_context():
+        source = _finished(user)
+
+        assert cache.lookup(SHA, user, 'base', True, 'balanced', 'uk').id == source.id
+        # мова і профіль необов'язкові у запиті
+        assert cache.lookup(SHA, user, 'base', True).id == source.id
+
+        assert cache.lookup(hashlib.sha256(b'other').hexdigest(), user, 'base', True) is None
+        assert cache.lookup(SHA, user, 'small', True) is None
+        assert cache.lookup(SHA, user, 'base', False) is None
+        assert cache.lookup(SHA, user, 'base', True, profile='accurate') is None
+        assert cache.lookup(SHA, user, 'base', True, language='en') is None
+
+    assert cache.stats()['hits'] == 2
+    assert cache.stats()['misses'] == 5
+
+
+def test_lookup_skips_unfinished_and_expired(app, user):
+    cache = DedupCache(retention_days=30)
+    with app.app_context():
+        _finished(user, status='processing')
+        _finished(user, created_at=datetime.utcnow() - timedelta(days=31))
+        assert cache.lookup(SHA, user, 'base', True) is None
+
+        fresh = _finished(user)
+        assert cache.lookup(SHA, user, 'base', True).id == fresh.id
+
+
+def test_lookup_skips_user_edited_transcripts(app, user):
+    cache = DedupCache(retention_days=30)
+    with app.app_context():
+        original = _finished(user, created_at=datetime.utcnow() - timedelta(days=1))
+        edited = _finished(user, text='виправлений текст')
+        edited.is_edited = True
+        db.session.commit()
+        # найсвіжіша — відредагована, тож береться попередній результат моделі
+        assert cache.lookup(SHA, user, 'base', True).id == original.id
+
+        original.is_edited = True
+        db.session.commit()
+        assert cache.lookup(SHA, user, 'base', True) is None
+
+
+def test_scope_limits_reuse_to_the_uploader(app, user):
+    with app.app_context():
+        other = User(email='other@example.com')
+        other.set_password('secret')
+        db.session.add(other)
+        db.session.commit()
+        _finished(other.id)
+
+        assert DedupCache(scope='user').lookup(SHA, user, 'base', True) is None
+        assert DedupCache(scope='global').lookup(SHA, user, 'base', True) is not None
+
+
+def test_disabled_cache_never_hits(app, user):
+    cache = DedupCache(retention_days=0)
+    with app.app_context():
+        _finished(user)
+        assert cache.lookup(SHA, user, 'base', True) is None
+    assert not cache.enabled
+
+
+def test_clone_into_copies_results(app, user):
+    with app.app_context():
+        source = _finished(user)
+        target = Transcription(user_id=user, audio_id=source.audio_id, status='pending')
+        DedupCache().clone_into(source, target)
+
+        for field in ('text', 'speakers_text', 'speakers_json', 'language', 'model', 'profile',
+                      'diarization', 'quality_report'):
+            assert getattr(target, field) == getattr(source, field)
+        assert target.status == 'completed'
@@ -0,0 +1,212 @@
+import threading
+import time
+
+import pytest
+
+import job_queue
+from job_queue import (Job, JobExecutor, QueueFullError, JobCancelled, current_job, interruption_point,
+                       request_cancel)
+from status_store import MemoryStatusStore
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+class _Blocker:
+    """Задача, що тримає потік пулу, доки її не відпустять"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        assert self.release.wait(5)
+
+
+def test_running_jobs_never_exceed_workers():
+    executor = JobExecutor(workers=2, max_queue=10, fast_workers=0)
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+    done = []
+
+    def job(i):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+            done.append(i)
+
+    for i in range(6):
+        executor.submit(f"job-{i}", job, i)
+    _wait_until(lambda: len(done) == 6)
+    assert peak[0] == 2
+
+
+def test_full_queue_rejects_with_retry_hint():
+    executor = JobExecutor(workers=1, max_queue=2, fast_workers=0)
+    blocker = _Blocker()
+    executor.submit('running', blocker)
+    assert blocker.started.wait(5)
+
+    assert executor.submit('queued-1', lambda: None) == 1
+    assert executor.submit('queued-2', lambda: None) == 2
+    assert executor.is_full()
+    with pytest.raises(QueueFullError) as error:
+        executor.submit('rejected', lambda: None)
+    assert error.value.retry_after >= 1
+
+    blocker.release.set()
+    _wait_until(lambda: executor.stats()['queued'] == 0 and executor.stats()['running'] == 0)
+    assert executor.position('queued-1') is None
+    assert executor.wait_seconds('queued-1') is not None
+
+
+def test_failed_job_does_not_stop_the_worker():
+    executor = JobExecutor(workers=1, max_queue=5, fast_workers=0)
+    done = threading.Event()
+
+    def broken():
+        raise RuntimeError('boom')
+
+    executor.submit('broken', broken)
+    executor.submit('next', done.set)
+    assert done.wait(5)
+
+
+def _run_order(executor, jobs, blocker_user='a'):
+    """Запускає ``jobs`` (id, user, duration), поки єдиний потік зайнятий; повертає порядок виконання"""
+    order = []
+    blocker = _Blocker()
+    executor.submit('blocker', blocker, user_id=blocker_user, duration=600)
+    assert blocker.started.wait(5)
+    for job_id, user_id, duration in jobs:
+        executor.submit(job_id, order.append, job_id, user_id=user_id, duration=duration)
+    blocker.release.set()
+    _wait_until(lambda: len(order) == len(jobs))
+    return order
+
+
+def test_shorter_recordings_run_first():
+    executor = JobExecutor(workers=1, max_queue=10, fast_workers=0)
+    order = _run_order(executor, [('long', 'b', 1800), ('unknown', 'c', None), ('short', 'd', 30)])
+    assert order == ['short', 'unknown', 'long']
+
+
+def test_fair_share_between_users():
+    executor = JobExecutor(workers=1, max_queue=10, fast_workers=0)
+    # користувач a вже спожив 600 с (blocker), тож b з такою самою задачею йде раніше
+    order = _run_order(executor, [('a-1', 'a', 300), ('a-2', 'a', 300), ('b-1', 'b', 300)])
+    assert order[0] == 'b-1'
+
+
+def test_fast_lane_serves_short_jobs_while_general_workers_are_busy():
+    executor = JobExecutor(workers=1, max_queue=10, fast_workers=1)
+    blocker = _Blocker()
+    executor.submit('long', blocker, duration=3600)
+    assert blocker.started.wait(5)
+
+    short_done = threading.Event()
+    long_done = threading.Event()
+    assert executor.submit('short', short_done.set, duration=20) == 0
+    executor.submit('another-long', long_done.set, duration=3600)
+
+    assert short_done.wait(5)
+    # довгий запис швидку смугу не займає
+    assert not long_done.wait(0.2)
+    assert executor.position('another-long') == 1
+
+    blocker.release.set()
+    assert long_done.wait(5)
+
+
+def test_idle_workers_count_the_lane_a_job_runs_in():
+    executor = JobExecutor(workers=1, max_queue=10, fast_workers=1)
+    # коротку задачу взяв загальний потік: швидка смуга вільна, загальна — ні
+    short = Job('short', lambda: None, (), {}, duration=20)
+    short.lane = 'general'
+    executor._running[short.job_id] = short
+
+    assert executor._idle_workers(Job('long', lambda: None, (), {}, duration=3600)) == 0
+    assert executor._idle_workers(Job('short-2', lambda: None, (), {}, duration=20)) == 1
+
+    short.lane = 'fast'
+    assert executor._idle_workers(Job('long', lambda: None, (), {}, duration=3600)) == 1
+    assert executor._idle_workers(Job('short-2', lambda: None, (), {}, duration=20)) == 1
+
+
+@pytest.fixture
+def local_executor(monkeypatch):
+    """Виконавець і сховище статусів, з якими працюють контрольні точки"""
+    executor = JobExecutor(workers=1, max_queue=10, fast_workers=0)
+    monkeypatch.setattr(job_queue, 'job_executor', executor)
+    monkeypatch.setattr(job_queue, 'status_store', MemoryStatusStore())
+    monkeypatch.setattr(job_queue, 'PREEMPT_MIN_SECONDS', 0.0)
+    return executor
+
+
+def test_cancel_removes_a_pending_job(local_executor):
+    blocker = _Blocker()
+    ran = []
+    local_executor.submit('blocker', blocker, duration=600)
+    assert blocker.started.wait(5)
+    local_executor.submit('queued', ran.append, 'queued', duration=600)
+
+    assert request_cancel('queued')
+    assert local_executor.position('queued') is None
+    blocker.release.set()
+    _wait_until(lambda: local_executor.stats()['running'] == 0)
+    assert ran == []
+
+
+def test_running_job_stops_at_the_next_checkpoint(local_executor):
+    started = threading.Event()
+    outcome = []
+
+    def job():
+        started.set()
+        try:
+            for _ in range(500):
+                interruption_point('running')
+                time.sleep(0.01)
+            outcome.append('finished')
+        except JobCancelled:
+            outcome.append('cancelled')
+
+    local_executor.submit('running', job, duration=600)
+    assert started.wait(5)
+    # задача вже почалась, тож з черги її не прибрати — спрацює прапорець
+    assert not request_cancel('running')
+    _wait_until(lambda: outcome)
+    assert outcome == ['cancelled']
+
+
+def test_long_job_yields_to_short_one_and_resumes_from_checkpoint(local_executor):
+    order = []
+    short_submitted = threading.Event()
+
+    def long_job():
+        job = current_job()
+        if 'windows' not in job.checkpoint:
+            job.checkpoint['windows'] = ['w0']
+            order.append('long:w0')
+            assert short_submitted.wait(5)
+        # контрольна точка між вікнами: коротка задача чекає — поступаємось
+        interruption_point('long')
+        order.append(f"long:resume:{job.checkpoint['windows']}")
+
+    local_executor.submit('long', long_job, duration=3600)
+    _wait_until(lambda: order)
+    local_executor.submit('short', order.append, 'short', duration=15)
+    short_submitted.set()
+
+    _wait_until(lambda: len(order) == 3)
+    assert order == ['long:w0', 'short', "long:resume:['w0']"]
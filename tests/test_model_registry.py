@@ -0,0 +1,145 @@
+import copy
+import os
+import threading
+
+import pytest
+import torch
+from whisper.model import ModelDimensions, Whisper
+
+import model_registry
+from model_registry import ModelRegistry, load_quantized_whisper, quantize_whisper
+
+
+def _linear():
+    """Модуль на ~1 МБ ваг: 512×512 fp32 і зсув"""
+    return torch.nn.Linear(512, 512)
+
+
+WEIGHTS = model_registry.torch_weights_bytes(_linear())
+
+
+def _load(registry, name):
+    return registry._get_or_load(f'whisper:{name}', _linear, estimated_bytes=WEIGHTS)
+
+
+def _resident(registry):
+    return registry.whisper_cache_stats()['resident']
+
+
+def test_least_recently_used_model_is_evicted():
+    # у 3 МБ вміщуються дві моделі
+    registry = ModelRegistry(whisper_cache_max_mb=3, pinned_models=[], engine='openai-whisper')
+    a = _load(registry, 'a')
+    _load(registry, 'b')
+    # повторне звернення робить b найдавнішим
+    assert _load(registry, 'a') is a
+    _load(registry, 'c')
+    assert _resident(registry) == ['a', 'c']
+    assert registry.evictions == 1
+
+
+def test_pinned_model_is_not_evicted():
+    registry = ModelRegistry(whisper_cache_max_mb=4, pinned_models=['a'], engine='openai-whisper')
+    for name in 'abcd':
+        _load(registry, name)
+    assert _resident(registry) == ['a', 'c', 'd']
+
+
+def test_model_in_use_is_not_evicted(monkeypatch):
+    monkeypatch.setattr(model_registry.whisper, 'load_model', lambda name, device=None: _linear())
+    registry = ModelRegistry(whisper_cache_max_mb=4, pinned_models=[], engine='openai-whisper')
+    monkeypatch.setattr(model_registry, 'WHISPER_MODEL_PARAMS', {'tiny': 0, 'base': 0})
+
+    with registry.acquire_whisper('tiny'):
+        assert registry.stats()[0]['in_use']
+        _load(registry, 'a')
+        _load(registry, 'b')
+        _load(registry, 'c')
+        # tiny найдавніший, але захоплений — витісняється наступний за ним
+        assert _resident(registry) == ['tiny', 'b', 'c']
+
+    assert not registry.stats()[0]['in_use']
+    # після звільнення tiny знову витісняється першим
+    _load(registry, 'd')
+    assert _resident(registry) == ['b', 'c', 'd']
+
+
+def test_untracked_model_is_still_used_exclusively():
+    registry = ModelRegistry(pinned_models=[], engine='openai-whisper')
+    model = _linear()
+    inside, overlapped = threading.Event(), []
+
+    def call():
+        with registry.use(model):
+            overlapped.append(inside.is_set())
+            inside.set()
+            threading.Event().wait(0.05)
+            inside.clear()
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlapped == [False, False, False]
+
+
+@pytest.fixture(scope='module')
+def random_model():
+    """Мала модель Whisper з випадковими вагами, без завантаження"""
+    torch.manual_seed(0)
+    dims = ModelDimensions(n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+                           n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=1)
+    model = Whisper(dims).eval()
+    # позиційні вбудовування декодера створюються через torch.empty і лише потім завантажуються з чекпойнта
+    torch.nn.init.normal_(model.decoder.positional_embedding, std=0.02)
+    return model
+
+
+def _logits(model):
+    torch.manual_seed(1)
+    mel = torch.randn(1, 80, 3000)
+    tokens = torch.tensor([[50258, 50259, 50359, 50363]])
+    with torch.no_grad():
+        return model.logits(tokens, model.embed_audio(mel))
+
+
+def test_quantization_replaces_every_linear_layer(random_model):
+    linear = [m for m in random_model.modules() if isinstance(m, torch.nn.Linear)]
+    quantized = quantize_whisper(copy.deepcopy(random_model))
+
+    dynamic = [m for m in quantized.modules() if isinstance(m, torch.ao.nn.quantized.dynamic.Linear)]
+    assert len(dynamic) == len(linear) > 0
+    assert not any(isinstance(m, torch.nn.Linear) for m in quantized.modules())
+
+    # int8 замість fp32: ваги лінійних шарів учетверо менші, решта без змін
+    linear_weights = sum(m.weight.numel() * m.weight.element_size() for m in linear)
+    saved = model_registry.torch_weights_bytes(random_model) - model_registry.torch_weights_bytes(quantized)
+    assert saved == pytest.approx(0.75 * linear_weights, rel=0.05)
+
+
+def test_quantized_model_cache_round_trip(random_model, monkeypatch, tmp_path):
+    loads = []
+
+    def load_model(name, device=None):
+        loads.append(name)
+        return copy.deepcopy(random_model)
+
+    monkeypatch.setattr(model_registry.whisper, 'load_model', load_model)
+    built = load_quantized_whisper('tiny', cache_dir=str(tmp_path))
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.pt')]
+
+    cached = load_quantized_whisper('tiny', cache_dir=str(tmp_path))
+    assert loads == ['tiny']
+    assert torch.equal(_logits(cached), _logits(built))
+    assert model_registry.torch_weights_bytes(cached) == model_registry.torch_weights_bytes(built)
+
+
+def test_broken_cache_file_is_rebuilt(random_model, monkeypatch, tmp_path):
+    monkeypatch.setattr(model_registry.whisper, 'load_model', lambda name, device=None: copy.deepcopy(random_model))
+    built = load_quantized_whisper('tiny', cache_dir=str(tmp_path))
+    [cache_file] = os.listdir(tmp_path)
+    (tmp_path / cache_file).write_bytes(b'not a pickle')
+
+    rebuilt = load_quantized_whisper('tiny', cache_dir=str(tmp_path))
+    assert torch.equal(_logits(rebuilt), _logits(built))
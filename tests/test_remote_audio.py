@@ -0,0 +1,126 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import remote_audio
+from remote_audio import RemoteAudioCache, DownloadError
+
+
+AUDIO = os.urandom(64 * 1024)
+ETAG = '"v1"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Віддає тестове аудіо з ETag, 304 на умовний запит і Range для продовження"""
+
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, dict(self.headers)))
+        if self.path == '/missing.wav':
+            self.send_error(404)
+        elif self.path == '/audio.wav':
+            if self.headers.get('If-None-Match') == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(AUDIO, length=True)
+        elif self.path == '/large.wav':
+            self._send(AUDIO, length=True)
+        elif self.path == '/stream.wav':
+            # без Content-Length: розмір видно лише під час читання
+            self._send(AUDIO, length=False)
+        elif self.path == '/flaky.wav':
+            start = int(self.headers.get('Range', 'bytes=0-')[6:-1])
+            if start:
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{len(AUDIO) - 1}/{len(AUDIO)}')
+                self.send_header('Content-Length', str(len(AUDIO) - start))
+                self.send_header('ETag', ETAG)
+                self.end_headers()
+                self.wfile.write(AUDIO[start:])
+            else:
+                # обриваємо з'єднання на половині тіла
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(AUDIO)))
+                self.send_header('ETag', ETAG)
+                self.end_headers()
+                self.wfile.write(AUDIO[:len(AUDIO) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+
+    def _send(self, body, length):
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/wav')
+        self.send_header('ETag', ETAG)
+        self.send_header('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+        if length:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    _Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'remote_audio')
+
+
+def test_construction_does_not_touch_the_disk(cache_dir):
+    RemoteAudioCache(cache_dir=cache_dir)
+    assert not os.path.exists(cache_dir)
+
+
+def test_download_and_conditional_cache_hit(server, cache_dir):
+    cache = RemoteAudioCache(cache_dir=cache_dir)
+    path = cache.fetch(f'{server}/audio.wav')
+    assert path.endswith('.wav') and cache.is_cached(path)
+    with open(path, 'rb') as f:
+        assert f.read() == AUDIO
+    assert cache.stats()['downloads'] == 1
+
+    # повторний імпорт — умовний запит і 304 без тіла
+    assert cache.fetch(f'{server}/audio.wav') == path
+    assert cache.stats()['hits'] == 1 and cache.stats()['downloads'] == 1
+    assert _Handler.requests_seen[-1][1].get('If-None-Match') == ETAG
+
+
+def test_missing_file_raises_http_error(server, cache_dir):
+    cache = RemoteAudioCache(cache_dir=cache_dir)
+    with pytest.raises(requests.HTTPError):
+        cache.fetch(f'{server}/missing.wav')
+
+
+@pytest.mark.parametrize('name', ['large.wav', 'stream.wav'])
+def test_size_cap(server, cache_dir, name):
+    cache = RemoteAudioCache(cache_dir=cache_dir, max_bytes=len(AUDIO) // 2)
+    with pytest.raises(DownloadError):
+        cache.fetch(f'{server}/{name}')
+    # недокачаних файлів не лишається
+    assert [n for n in os.listdir(cache_dir) if n.endswith('.part')] == []
+
+
+def test_interrupted_download_resumes_with_range(server, cache_dir, monkeypatch):
+    # дрібні частини, щоб отримане до обриву встигло потрапити на диск
+    monkeypatch.setattr(remote_audio, 'DOWNLOAD_CHUNK_SIZE', 4096)
+    cache = RemoteAudioCache(cache_dir=cache_dir)
+    path = cache.fetch(f'{server}/flaky.wav')
+    with open(path, 'rb') as f:
+        assert f.read() == AUDIO
+    assert _Handler.requests_seen[-1][1].get('Range') == f'bytes={len(AUDIO) // 2}-'
@@ -0,0 +1,132 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import resumable_upload
+from resumable_upload import UploadManager, UploadError
+
+
+DATA = os.urandom(3 * 4096 + 100)
+PART = 4096
+
+
+def _part(offset, size=PART):
+    return io.BytesIO(DATA[offset:offset + size])
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return UploadManager(str(tmp_path))
+
+
+def test_sequential_parts_and_finalize(manager):
+    session = manager.create(1, 'a.wav', len(DATA), {'model': 'base'})
+    for offset in range(0, len(DATA), PART):
+        session = manager.write_part(session.upload_id, 1, offset, _part(offset), chunk_size=1000)
+    assert session.complete
+
+    session = manager.finalize(session.upload_id, 1)
+    assert session.sha256 == hashlib.sha256(DATA).hexdigest()
+    with open(session.file_path, 'rb') as f:
+        assert f.read() == DATA
+    # повторний finalize — та сама сесія
+    assert manager.finalize(session.upload_id, 1).sha256 == session.sha256
+
+
+def test_repeated_and_overlapping_parts_are_idempotent(manager):
+    session = manager.create(1, 'a.wav', len(DATA), {})
+    manager.write_part(session.upload_id, 1, 0, _part(0))
+    manager.write_part(session.upload_id, 1, 0, _part(0))
+    # частина, що перекриває вже отримане, дописує лише нове
+    manager.write_part(session.upload_id, 1, PART // 2, _part(PART // 2, PART))
+    for offset in range(PART + PART // 2, len(DATA), PART):
+        manager.write_part(session.upload_id, 1, offset, _part(offset))
+
+    assert manager.finalize(session.upload_id, 1).sha256 == hashlib.sha256(DATA).hexdigest()
+
+
+def test_parts_spread_over_processes_keep_the_hash(tmp_path):
+    # дві «веб-процеси» на спільній теці: частини A, B, A, B...
+    managers = [UploadManager(str(tmp_path)), UploadManager(str(tmp_path))]
+    session = managers[0].create(1, 'a.wav', len(DATA), {})
+    for i, offset in enumerate(range(0, len(DATA), PART)):
+        managers[i % 2].write_part(session.upload_id, 1, offset, _part(offset))
+
+    assert managers[0].finalize(session.upload_id, 1).sha256 == hashlib.sha256(DATA).hexdigest()
+
+
+def test_restarted_process_rebuilds_the_hash(tmp_path):
+    session = UploadManager(str(tmp_path)).create(1, 'a.wav', len(DATA), {})
+    UploadManager(str(tmp_path)).write_part(session.upload_id, 1, 0, _part(0))
+
+    restarted = UploadManager(str(tmp_path))
+    for offset in range(PART, len(DATA), PART):
+        restarted.write_part(session.upload_id, 1, offset, _part(offset))
+    assert restarted.finalize(session.upload_id, 1).sha256 == hashlib.sha256(DATA).hexdigest()
+
+
+def test_concurrent_writers_of_the_same_part(tmp_path):
+    managers = [UploadManager(str(tmp_path)) for _ in range(4)]
+    session = managers[0].create(1, 'a.wav', len(DATA), {})
+
+    for offset in range(0, len(DATA), PART):
+        threads = [threading.Thread(target=m.write_part, args=(session.upload_id, 1, offset, _part(offset)))
+                   for m in managers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    session = managers[1].finalize(session.upload_id, 1)
+    assert session.offset == len(DATA)
+    assert session.sha256 == hashlib.sha256(DATA).hexdigest()
+
+
+def test_protocol_errors(manager, monkeypatch):
+    with pytest.raises(UploadError) as error:
+        manager.create(1, 'a.wav', 0, {})
+    assert error.value.status_code == 400
+
+    session = manager.create(1, 'a.wav', len(DATA), {})
+    with pytest.raises(UploadError) as error:
+        manager.write_part(session.upload_id, 1, PART, _part(PART))
+    assert (error.value.status_code, error.value.offset) == (409, 0)
+
+    with pytest.raises(UploadError) as error:
+        manager.finalize(session.upload_id, 1)
+    assert error.value.status_code == 409
+
+    # чужа або неіснуюча сесія — 404
+    for upload_id, user_id in ((session.upload_id, 2), ('../../etc/passwd', 1)):
+        with pytest.raises(UploadError) as error:
+            manager.write_part(upload_id, user_id, 0, _part(0))
+        assert error.value.status_code == 404
+
+    monkeypatch.setattr(resumable_upload, 'UPLOAD_PART_SIZE', 1000)
+    with pytest.raises(UploadError) as error:
+        manager.write_part(session.upload_id, 1, 0, _part(0), chunk_size=500)
+    assert error.value.status_code == 413
+    # прийняте до помилки збережено
+    assert manager.get(session.upload_id, 1).offset == 1000
+
+
+def test_cleanup_removes_expired_sessions(manager):
+    session = manager.create(1, 'a.wav', len(DATA), {})
+    manager.write_part(session.upload_id, 1, 0, _part(0))
+
+    path = manager._session_path(session.upload_id)
+    with open(path) as f:
+        data = json.load(f)
+    data['created_at'] = time.time() - manager.ttl - 1
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+    assert manager.cleanup_expired() == 1
+    assert not os.path.exists(session.file_path)
+    with pytest.raises(UploadError):
+        manager.get(session.upload_id, 1)
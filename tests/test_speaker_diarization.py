@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+from pyannote.core import Annotation, Segment
+
+import speaker_diarization
+from model_registry import ModelRegistry
+from speaker_diarization import (FeatureCache, extract_features, recluster, supports_reclustering,
+                                 RECLUSTER_PYANNOTE_VERSIONS)
+from transcribe import Transcribe
+
+
+SAMPLE_RATE = 16000
+
+
+def _two_voices(seconds=6.0):
+    """Дві «мовці» з різним тоном, що чергуються щосекунди"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = np.where((t.astype(int) % 2) == 0, 140.0, 260.0)
+    voiced = np.sin(2 * np.pi * pitch * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    return (0.3 * voiced).astype(np.float32)
+
+
+class _Pipeline:
+    """Пайплайн з усіма внутрішніми кроками 3.x за іменами; повний виклик — фіксована розмітка"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+        for name in ('get_segmentations', 'get_embeddings', 'speaker_count', 'reconstruct', 'to_annotation',
+                     '_frames'):
+            setattr(self, name, None)
+
+    def __call__(self, audio, **kwargs):
+        self.calls += 1
+        return self.result
+
+
+def _annotation():
+    annotation = Annotation()
+    annotation[Segment(0.0, 1.0)] = 'SPEAKER_00'
+    annotation[Segment(1.0, 2.0)] = 'SPEAKER_01'
+    return annotation
+
+
+def test_reclustering_only_on_the_pyannote_version_it_mirrors(monkeypatch):
+    pipeline = _Pipeline(_annotation())
+    monkeypatch.setattr(speaker_diarization, '_pyannote_version', lambda: '3.1.1')
+    assert supports_reclustering(pipeline)
+    del pipeline._frames
+    assert not supports_reclustering(pipeline)
+
+    monkeypatch.setattr(speaker_diarization, '_pyannote_version', lambda: '4.0.7')
+    assert not supports_reclustering(_Pipeline(_annotation()))
+
+
+class _DiarizeOutput:
+    def __init__(self, annotation):
+        self.speaker_diarization = annotation
+
+
+@pytest.mark.parametrize('wrap', [lambda a: a, _DiarizeOutput])
+def test_other_versions_run_the_full_pipeline(monkeypatch, wrap):
+    monkeypatch.setattr(speaker_diarization, '_pyannote_version', lambda: '4.0.7')
+    pipeline = _Pipeline(wrap(_annotation()))
+    transcribe = Transcribe.__new__(Transcribe)
+    transcribe.registry = ModelRegistry(engine='openai-whisper', pinned_models=[])
+    transcribe.diarization_pipeline = pipeline
+
+    audio = {'waveform': torch.from_numpy(_two_voices(2.0)).unsqueeze(0), 'sample_rate': SAMPLE_RATE}
+    diarization = transcribe._diarize(audio, 'key', min_speakers=2)
+    assert pipeline.calls == 1
+    assert diarization.labels() == ['SPEAKER_00', 'SPEAKER_01']
+
+
+def test_feature_cache_is_lru():
+    cache = FeatureCache(max_size=2)
+    cache.put('a', 'features-a')
+    cache.put('b', 'features-b')
+    # звернення до a робить b найдавнішим
+    assert cache.get('a') == 'features-a'
+    cache.put('c', 'features-c')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'features-a' and cache.get('c') == 'features-c'
+
+
+def test_feature_cache_key_and_disabled_cache():
+    waveform = _two_voices(1.0)
+    assert FeatureCache.key(waveform) == FeatureCache.key(waveform.copy())
+    assert FeatureCache.key(waveform) != FeatureCache.key(waveform[::-1])
+
+    cache = FeatureCache(max_size=0)
+    cache.put('a', 'features-a')
+    assert cache.get('a') is None
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    if not speaker_diarization._pyannote_version().startswith(RECLUSTER_PYANNOTE_VERSIONS):
+        pytest.skip('reclustering is only used with pyannote.audio 3.1')
+    if not os.getenv('PYANNOTE_TOKEN'):
+        pytest.skip('PYANNOTE_TOKEN is required to load the diarization pipeline')
+    pipeline = ModelRegistry(engine='openai-whisper').diarization_pipeline()
+    if pipeline is None:
+        pytest.skip('diarization pipeline is not available')
+    return pipeline
+
+
+def test_reclustering_matches_the_full_pipeline(pipeline):
+    audio = {'waveform': torch.from_numpy(_two_voices()).unsqueeze(0), 'sample_rate': SAMPLE_RATE}
+    features = extract_features(pipeline, audio)
+    for kwargs in ({}, {'num_speakers': 2}, {'min_speakers': 1, 'max_speakers': 3}):
+        expected = pipeline(audio, **kwargs)
+        assert list(recluster(pipeline, features, **kwargs).itertracks(yield_label=True)) == \
+            list(expected.itertracks(yield_label=True))
@@ -0,0 +1,181 @@
+import json
+
+import pytest
+
+from models import db, Audio, Transcription
+from status_store import MemoryStatusStore
+from transcription_pipeline import AsrProgress
+
+
+@pytest.fixture
+def transcription(web, web_user):
+    user_id, _ = web_user
+    with web.app.app_context():
+        audio = Audio(user_id=user_id, filename='a.wav', file_path='/tmp/a.wav')
+        db.session.add(audio)
+        db.session.flush()
+        transcription = Transcription(user_id=user_id, audio_id=audio.id, status='processing')
+        db.session.add(transcription)
+        db.session.commit()
+        return str(transcription.uuid)
+
+
+def _segment(text, start=0.0):
+    return {'start': start, 'end': start + 1.0, 'text': text}
+
+
+def _complete(web, tr_uuid, text):
+    with web.app.app_context():
+        transcription = Transcription.query.filter_by(uuid=tr_uuid).first()
+        transcription.status = 'completed'
+        transcription.text = text
+        db.session.commit()
+    web.status_store.set(tr_uuid, 'completed', 100, 'Transcription completed successfully')
+
+
+class _Stream:
+    """Читає події SSE по одній з потокової відповіді тестового клієнта"""
+
+    def __init__(self, response):
+        self.chunks = iter(response.response)
+
+    def next(self):
+        while True:
+            chunk = next(self.chunks)
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            fields = dict(line.split(': ', 1) for line in chunk.strip().splitlines() if ': ' in line)
+            if 'event' in fields:
+                return fields['event'], json.loads(fields['data']), fields.get('id')
+
+
+def _open(web, headers, tr_uuid, **extra):
+    client = web.app.test_client()
+    return client.get(f'/status/{tr_uuid}/events', headers=dict(headers, **extra), buffered=False)
+
+
+def _stream_token(web, headers, tr_uuid):
+    response = web.app.test_client().post(f'/status/{tr_uuid}/stream-token', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()['token']
+
+
+def _open_with_token(web, tr_uuid, token, **headers):
+    return web.app.test_client().get(f'/status/{tr_uuid}/events', query_string={'token': token},
+                                     headers=headers, buffered=False)
+
+
+def test_progress_reset_after_model_fallback(web, web_user, transcription, monkeypatch):
+    _, headers = web_user
+    store = web.status_store
+    monkeypatch.setattr('transcription_pipeline.status_store', store)
+    store.set(transcription, 'processing', 30, 'Transcribing audio...')
+    store.append_partial(transcription, [_segment(' from large')])
+
+    stream = _Stream(_open(web, headers, transcription))
+    assert stream.next()[0] == 'partial'
+    assert stream.next()[0] == 'progress'
+
+    # модель впала, asr_stage відкотився на base і скинув буфер
+    AsrProgress(transcription).reset()
+    store.append_partial(transcription, [_segment(' from base')])
+    store.update(transcription, progress=35)
+
+    event, data, event_id = stream.next()
+    assert (event, data, event_id) == ('reset', {'epoch': 1}, '1:0')
+    event, data, event_id = stream.next()
+    assert event == 'partial' and data['text'] == ' from base' and event_id == '1:1'
+    assert stream.next()[0] == 'progress'
+
+    _complete(web, transcription, ' from base')
+    event, data, _ = stream.next()
+    assert event == 'completed' and data['text'] == ' from base'
+
+
+def test_polling_restarts_partials_when_the_epoch_changes(web, web_user, transcription):
+    _, headers = web_user
+    store = web.status_store
+    store.set(transcription, 'processing', 30)
+    store.append_partial(transcription, [_segment(' a'), _segment(' b', 1.0)])
+    client = web.app.test_client()
+
+    partial = client.get(f'/status/{transcription}?partial=true&since=1', headers=headers).get_json()['partial']
+    assert (partial['text'], partial['next'], partial['epoch'], partial['reset']) == (' b', 2, 0, False)
+
+    store.clear_partial(transcription)
+    store.append_partial(transcription, [_segment(' c')])
+    partial = client.get(f'/status/{transcription}?partial=true&since=2&epoch=0',
+                         headers=headers).get_json()['partial']
+    assert (partial['text'], partial['next'], partial['epoch'], partial['reset']) == (' c', 1, 1, True)
+
+
+def test_stream_token_streams_progress_partials_and_the_result(web, web_user, transcription):
+    _, headers = web_user
+    store = web.status_store
+    store.set(transcription, 'processing', 10, 'Transcribing audio...')
+
+    stream = _Stream(_open_with_token(web, transcription, _stream_token(web, headers, transcription)))
+    event, data, _ = stream.next()
+    assert event == 'progress' and data['progress'] == 10 and data['uuid'] == transcription
+
+    store.append_partial(transcription, [_segment(' Привіт')])
+    store.update(transcription, progress=50)
+    event, data, event_id = stream.next()
+    assert (event, data['text'], data['next'], event_id) == ('partial', ' Привіт', 1, '0:1')
+    event, data, _ = stream.next()
+    assert event == 'progress' and data['progress'] == 50
+
+    _complete(web, transcription, ' Привіт')
+    event, data, _ = stream.next()
+    assert event == 'completed' and data['text'] == ' Привіт'
+
+
+def test_stream_tokens_are_bound_to_the_owner_and_transcription(web, web_user, make_web_user, transcription):
+    user_id, headers = web_user
+    _, other_headers = make_web_user('other@example.com')
+    client = web.app.test_client()
+
+    # чужа транскрипція: ні токена, ні потоку
+    assert client.post(f'/status/{transcription}/stream-token', headers=other_headers).status_code == 404
+    assert client.get(f'/status/{transcription}/events', headers=other_headers).status_code == 404
+    assert client.post(f'/status/{transcription}/stream-token').status_code == 401
+
+    # основний JWT у рядку запиту не приймається
+    jwt_in_url = headers['Authorization'][len('Bearer '):]
+    assert _open_with_token(web, transcription, jwt_in_url).status_code == 401
+
+    # токен потоку — лише для своєї транскрипції і не замість основного JWT
+    with web.app.app_context():
+        audio = Audio(user_id=user_id, filename='b.wav', file_path='/tmp/b.wav')
+        db.session.add(audio)
+        db.session.flush()
+        other = Transcription(user_id=user_id, audio_id=audio.id, status='processing')
+        db.session.add(other)
+        db.session.commit()
+        other = str(other.uuid)
+    token = _stream_token(web, headers, transcription)
+    assert _open_with_token(web, other, token).status_code == 401
+    assert client.get(f'/status/{transcription}', headers={'Authorization': f'Bearer {token}'}).status_code == 401
+
+
+def test_expired_stream_token_is_rejected(web, web_user, transcription):
+    from auth_routes import generate_stream_token
+
+    user_id, _ = web_user
+    assert _open_with_token(web, transcription, generate_stream_token(user_id, transcription, ttl=-1)).status_code == 401
+
+
+def test_reconnect_resumes_after_the_last_event_id(web, web_user, transcription):
+    _, headers = web_user
+    store = web.status_store
+    store.set(transcription, 'processing', 40)
+    store.append_partial(transcription, [_segment(' a'), _segment(' b', 1.0), _segment(' c', 2.0)])
+
+    token = _stream_token(web, headers, transcription)
+    stream = _Stream(_open_with_token(web, transcription, token, **{'Last-Event-ID': '0:1'}))
+    event, data, event_id = stream.next()
+    # сегмент a клієнт уже отримав до обриву
+    assert (event, data['text'], data['next'], event_id) == ('partial', ' b c', 3, '0:3')
+    assert stream.next()[0] == 'progress'
+
+    _complete(web, transcription, ' a b c')
+    assert stream.next()[0] == 'completed'
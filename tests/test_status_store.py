@@ -0,0 +1,133 @@
+import socket
+import threading
+import time
+from functools import partial
+
+import pytest
+
+import status_store as status_store_module
+from status_store import StatusStore, MemoryStatusStore, RedisStatusStore, create_status_store
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def redis_store():
+    fakeredis = pytest.importorskip('fakeredis')
+    store = RedisStatusStore(url='redis://localhost:6379/15', ttl=60)
+    store._client = fakeredis.FakeRedis()
+    return store
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def store(request):
+    if request.param == 'memory':
+        return MemoryStatusStore(max_size=10, ttl=60)
+    return request.getfixturevalue('redis_store')
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        StatusStore()
+
+
+def test_set_get_and_update(store):
+    assert store.get('job') is None
+    store.set('job', 'processing', 10, 'Normalizing audio...')
+    store.update('job', progress=40)
+    assert store.get('job') == {'status': 'processing', 'progress': 40, 'message': 'Normalizing audio...'}
+    store.delete('job')
+    assert store.get('job') is None
+
+
+def test_partials_are_dropped_on_terminal_status(store):
+    store.set('job', 'processing', 30)
+    store.append_partial('job', [{'start': 0.0, 'end': 1.0, 'text': 'a'}])
+    store.append_partial('job', [{'start': 1.0, 'end': 2.0, 'text': 'b'}])
+    assert [s['text'] for s in store.get_partial('job')] == ['a', 'b']
+    assert [s['text'] for s in store.get_partial('job', since=1)] == ['b']
+
+    store.set('job', 'completed', 100)
+    assert store.get_partial('job') == []
+
+
+def test_cancel_flag(store):
+    assert not store.is_cancelled('job')
+    store.request_cancel('job')
+    assert store.is_cancelled('job')
+
+
+def test_wait_returns_on_change_and_on_timeout(store):
+    store.set('job', 'processing', 10)
+    previous = store.get('job')
+
+    started = time.monotonic()
+    assert store.wait('job', previous, timeout=0.2) == previous
+    assert time.monotonic() - started >= 0.15
+
+    timer = threading.Timer(0.1, store.set, args=('job', 'processing', 50))
+    timer.start()
+    try:
+        current = store.wait('job', previous, timeout=5)
+    finally:
+        timer.join()
+    assert current['progress'] == 50
+
+
+def test_memory_store_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(status_store_module.time, 'time', lambda: now[0])
+    store = MemoryStatusStore(max_size=2, ttl=10)
+
+    store.set('a', 'pending')
+    store.set('b', 'pending')
+    store.set('c', 'pending')
+    # найдавніше оновлений запис витіснено
+    assert store.get('a') is None
+    assert store.get('b') and store.get('c')
+
+    now[0] += 11
+    assert store.get('b') is None and store.get('c') is None
+
+
+def test_memory_store_ignores_partials_of_unknown_jobs():
+    store = MemoryStatusStore()
+    store.append_partial('missing', [{'start': 0.0, 'end': 1.0, 'text': 'a'}])
+    assert store.get_partial('missing') == []
+
+
+def test_unreachable_redis_falls_back_to_memory_for_the_local_backend(monkeypatch):
+    monkeypatch.setattr(status_store_module, 'RedisStatusStore',
+                        partial(RedisStatusStore, url=f'redis://127.0.0.1:{_free_port()}/0'))
+    assert isinstance(create_status_store('redis', required=False), MemoryStatusStore)
+
+
+def test_unreachable_redis_is_fatal_when_required(monkeypatch):
+    # бекенд Celery або явний STATUS_STORE=redis: пам'ять процесу не спільна з воркерами
+    monkeypatch.setattr(status_store_module, 'RedisStatusStore',
+                        partial(RedisStatusStore, url=f'redis://127.0.0.1:{_free_port()}/0'))
+    with pytest.raises(RuntimeError):
+        create_status_store('redis', required=True)
+
+
+def test_reachable_redis_is_used(monkeypatch, redis_store):
+    monkeypatch.setattr(status_store_module, 'RedisStatusStore', lambda: redis_store)
+    assert create_status_store('redis') is redis_store
+
+
+def test_clear_partial_starts_a_new_epoch(store):
+    store.set('job', 'processing', 30)
+    store.append_partial('job', [{'start': 0.0, 'end': 1.0, 'text': 'a'}])
+    assert store.partial_epoch('job') == 0
+
+    store.clear_partial('job')
+    store.append_partial('job', [{'start': 0.0, 'end': 1.0, 'text': 'b'}])
+    assert store.partial_epoch('job') == 1
+    assert [s['text'] for s in store.get_partial('job')] == ['b']
+
+    store.delete('job')
+    assert store.partial_epoch('job') == 0
@@ -0,0 +1,192 @@
+import numpy as np
+import pytest
+
+import tasks
+from celery_app import celery, queue_for_duration, SHORT_QUEUE, LONG_QUEUE, LONG_AUDIO_QUEUE_THRESHOLD
+from job_queue import interruption_point
+from models import db, Audio, Transcription
+from status_store import status_store
+from transcribe import Transcribe
+
+
+class _Transcribe(Transcribe):
+    # етапи з моделями підмінені, тож моделі не завантажуємо
+    def __init__(self, *args, **kwargs):
+        self.model = None
+        self.diarization_pipeline = None
+
+
+@pytest.fixture(autouse=True)
+def flask_app(app, monkeypatch):
+    monkeypatch.setattr(tasks, '_flask_app', lambda: app)
+
+
+@pytest.fixture
+def eager(monkeypatch):
+    monkeypatch.setattr(celery.conf, 'task_always_eager', True)
+    monkeypatch.setattr(celery.conf, 'task_eager_propagates', True)
+
+
+@pytest.fixture
+def transcribers(monkeypatch):
+    """Параметри, з якими етапи просили Transcribe"""
+    requested = []
+
+    def get_transcriber(**kwargs):
+        requested.append(kwargs)
+        return _Transcribe()
+
+    monkeypatch.setattr(tasks, 'get_transcriber', get_transcriber)
+    return requested
+
+
+@pytest.fixture
+def stages(tmp_path, monkeypatch, transcribers):
+    """Етапи конвеєра без моделей: 2 с тиші, один сегмент і дві репліки"""
+    calls = []
+
+    def normalize_stage(transcribe, file_path):
+        calls.append('normalize')
+        return np.zeros(32000, dtype=np.float32), None, {'duration': 2.0}
+
+    def asr_stage(transcribe, audio, model_type, progress, profile=None, language=None):
+        calls.append('asr')
+        assert len(audio) == 32000
+        return {'text': ' hello there', 'language': 'en',
+                'segments': [{'start': 0.0, 'end': 2.0, 'text': ' hello there'}]}, model_type
+
+    def diarize_stage(transcribe, audio):
+        calls.append('diarize')
+        return [{'start': 0.0, 'end': 1.0, 'speaker': 'SPEAKER_00'},
+                {'start': 1.0, 'end': 2.0, 'speaker': 'SPEAKER_01'}]
+
+    monkeypatch.setattr(tasks, 'normalize_stage', normalize_stage)
+    monkeypatch.setattr(tasks, 'asr_stage', asr_stage)
+    monkeypatch.setattr(tasks, 'diarize_stage', diarize_stage)
+    monkeypatch.setattr(tasks, 'WORK_FOLDER', str(tmp_path))
+    return calls
+
+
+def _transcription(app, user, tmp_path):
+    upload = tmp_path / 'upload.wav'
+    upload.write_bytes(b'RIFF')
+    with app.app_context():
+        audio = Audio(user_id=user, filename='upload.wav', file_path=str(upload))
+        db.session.add(audio)
+        db.session.flush()
+        transcription = Transcription(user_id=user, audio_id=audio.id)
+        db.session.add(transcription)
+        db.session.commit()
+        return transcription.uuid, str(upload)
+
+
+def _queues(signature):
+    """Черги всіх задач у ланцюжку (разом з group і chord)"""
+    if not signature['task'].startswith('celery.'):
+        return [signature['options'].get('queue')]
+    kwargs = signature['kwargs']
+    children = list(kwargs.get('tasks', ())) + list(kwargs.get('header', ()))
+    if 'body' in kwargs:
+        children.append(kwargs['body'])
+    return [queue for child in children for queue in _queues(child)]
+
+
+@pytest.mark.parametrize('duration, queue', [
+    (30.0, SHORT_QUEUE),
+    (LONG_AUDIO_QUEUE_THRESHOLD, SHORT_QUEUE),
+    (LONG_AUDIO_QUEUE_THRESHOLD + 1, LONG_QUEUE),
+    (None, LONG_QUEUE),
+])
+def test_queue_for_duration(duration, queue):
+    assert queue_for_duration(duration) == queue
+
+
+def test_chain_runs_eagerly_on_the_duration_queue(app, user, eager, stages, transcribers, tmp_path, monkeypatch):
+    tr_uuid, upload = _transcription(app, user, tmp_path)
+
+    canvases = []
+    original_chain = tasks.chain
+
+    def recording_chain(*signatures):
+        canvas = original_chain(*signatures)
+        canvases.append(canvas)
+        return canvas
+
+    monkeypatch.setattr(tasks, 'chain', recording_chain)
+
+    queue = tasks.enqueue_transcription(upload, tr_uuid, model_type='tiny', diarize=True, duration=42.0)
+
+    assert queue == SHORT_QUEUE
+    assert set(_queues(canvases[0])) == {SHORT_QUEUE}
+    assert sorted(stages) == ['asr', 'diarize', 'normalize']
+    # pyannote завантажує лише задача діаризації
+    assert [kwargs.get('preload_diarization', False) for kwargs in transcribers].count(True) == 1
+    assert status_store.get(str(tr_uuid))['status'] == 'completed'
+
+    with app.app_context():
+        transcription = Transcription.query.filter_by(uuid=tr_uuid).first()
+        assert transcription.status == 'completed'
+        assert transcription.text == ' hello there'
+        assert transcription.model == 'tiny'
+        assert transcription.quality_report == {'duration': 2.0}
+        assert transcription.speakers_text
+        assert transcription.audio.duration == pytest.approx(2.0)
+
+    # завантаження і проміжне аудіо прибрані
+    assert not list(tmp_path.glob('*.npy'))
+    assert not (tmp_path / 'upload.wav').exists()
+
+
+def test_long_recordings_go_to_the_long_queue(app, user, eager, stages, tmp_path):
+    tr_uuid, upload = _transcription(app, user, tmp_path)
+
+    assert tasks.enqueue_transcription(upload, tr_uuid, diarize=False,
+                                       duration=LONG_AUDIO_QUEUE_THRESHOLD * 2) == LONG_QUEUE
+    assert 'diarize' not in stages
+    assert status_store.get(str(tr_uuid))['status'] == 'completed'
+
+
+def test_failed_stage_marks_transcription_failed(app, user, eager, stages, tmp_path, monkeypatch):
+    tr_uuid, upload = _transcription(app, user, tmp_path)
+
+    def broken_asr(*args, **kwargs):
+        raise RuntimeError('decoder exploded')
+
+    monkeypatch.setattr(tasks, 'asr_stage', broken_asr)
+
+    with pytest.raises(RuntimeError):
+        tasks.enqueue_transcription(upload, tr_uuid, duration=10.0)
+
+    assert status_store.get(str(tr_uuid))['status'] == 'failed'
+    with app.app_context():
+        assert Transcription.query.filter_by(uuid=tr_uuid).first().status == 'failed'
+
+
+def test_cancel_during_the_parallel_stages_finishes_the_chord_once(app, user, eager, stages, tmp_path, monkeypatch):
+    tr_uuid, upload = _transcription(app, user, tmp_path)
+    cleanups = []
+    cleanup_files = tasks.cleanup_files
+
+    def cancelled_asr(transcribe, audio, model_type, progress, profile=None, language=None):
+        # користувач скасував під час розпізнавання; diarize побачить прапорець на своїй контрольній точці
+        status_store.request_cancel(str(tr_uuid))
+        interruption_point(str(tr_uuid))
+
+    def recording_cleanup(*paths):
+        cleanups.append(paths)
+        cleanup_files(*paths)
+
+    monkeypatch.setattr(tasks, 'asr_stage', cancelled_asr)
+    monkeypatch.setattr(tasks, 'cleanup_files', recording_cleanup)
+    merged = []
+    monkeypatch.setattr(tasks, 'merge_stage', lambda *args: merged.append(args))
+
+    tasks.enqueue_transcription(upload, tr_uuid, duration=10.0)
+
+    # merge отримав позначку і оформив скасування один раз, нічого не зберігаючи
+    assert merged == [] and len(cleanups) == 1
+    assert status_store.get(str(tr_uuid))['status'] == 'cancelled'
+    with app.app_context():
+        assert Transcription.query.filter_by(uuid=tr_uuid).first().status == 'cancelled'
+    assert not list(tmp_path.glob('*.npy'))
+    assert not (tmp_path / 'upload.wav').exists()
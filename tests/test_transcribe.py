@@ -0,0 +1,41 @@
+import transcribe as transcribe_module
+from transcribe import Transcribe, get_transcriber
+
+
+class _Registry:
+    device = 'cpu'
+
+    def __init__(self):
+        self.loaded = []
+
+    def whisper(self, name='base'):
+        self.loaded.append(f'whisper:{name}')
+        return object()
+
+    def diarization_pipeline(self):
+        self.loaded.append('diarization')
+        return object()
+
+
+def test_diarization_pipeline_is_loaded_only_on_demand():
+    registry = _Registry()
+    transcribe = Transcribe(registry=registry, preload_whisper=False, preload_diarization=False)
+    assert registry.loaded == []
+
+    pipeline = transcribe.diarization_pipeline
+    assert transcribe.diarization_pipeline is pipeline
+    assert registry.loaded == ['diarization']
+
+    Transcribe(registry=registry)
+    assert registry.loaded[1:] == ['whisper:base', 'diarization']
+
+
+def test_transcriber_is_shared_per_process(monkeypatch):
+    registry = _Registry()
+    monkeypatch.setattr(transcribe_module, 'model_registry', registry)
+    monkeypatch.setattr(transcribe_module, '_transcribers', {})
+
+    asr = get_transcriber()
+    assert get_transcriber() is asr
+    assert get_transcriber(preload_whisper=False, preload_diarization=True) is not asr
+    assert registry.loaded == ['whisper:base', 'diarization']
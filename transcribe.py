@@ -1,111 +1,130 @@
 import os
 import time
+import threading
 import whisper
-import tempfile
 import numpy as np
-from pydub import AudioSegment
 import json
-from pyannote.audio import Pipeline
 from pyannote.core import Annotation
-from typing import Dict, Any, Tuple, List
+from typing import Dict, Any, Tuple, List, Union
 import logging
 from collections import defaultdict
 import pprint
 import torch
+from model_registry import ModelRegistry, model_registry, SUPPORTED_WHISPER_MODELS
+from remote_audio import remote_audio_cache
+from audio_processing import SAMPLE_RATE, normalize_waveform, analyze_quality, quality_issues
+from decoding_profiles import decode_options
+from batch_asr import WhisperBatcher, whisper_batcher
+from chunked_transcription import should_chunk, transcribe_chunked, transcribe_windowed, SegmentsCallback
+from speaker_diarization import (extract_features, recluster, supports_reclustering, feature_cache,
+                                 assign_speakers, format_speakers_text)
 
 
 logger = logging.getLogger(__name__)
 
 
+AudioInput = Union[str, os.PathLike, np.ndarray]
+
+
+def load_audio(audio_file: AudioInput) -> np.ndarray:
+    """Decode audio once into a 16 kHz mono float32 buffer shared by all stages"""
+    if isinstance(audio_file, np.ndarray):
+        return audio_file.astype(np.float32, copy=False)
+    return whisper.audio.load_audio(str(audio_file), sr=SAMPLE_RATE)
+
+
 class Transcribe:
-    def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+    def __init__(self, registry: ModelRegistry = None, preload_whisper: bool = True,
+                 batcher: WhisperBatcher = None, preload_diarization: bool = True):
+        self.registry = registry or model_registry
+        self.batcher = batcher or whisper_batcher
+        self.device = self.registry.device
         logger.info(f"Using device: {self.device}")
         
-        self.model = whisper.load_model("base")
-        
-        self.diarization_pipeline = None
-        try:
-            self.diarization_pipeline = Pipeline.from_pretrained(
-                "pyannote/speaker-diarization",
-                use_auth_token=os.getenv('PYANNOTE_TOKEN')
-            )
-
-            if hasattr(self.diarization_pipeline, 'instantiate_params'):
-                self.diarization_pipeline.instantiate_params({
-                    "segmentation": {
-                        "threshold": 0.25, 
-                        "min_duration": 0.1 
-                    },
-                    "embedding": {
-                        "window": 0.75, 
-                        "step": 0.2 
-                    },
-                    "clustering": {
-                        "method": "affinity_propagation", 
-                        "min_cluster_size": 2,
-                        "threshold": 0.65
-                    }
-                })
-        except Exception as e:
-            print(f"Failed to initialize diarization pipeline: {str(e)}")
+        # процесу, що лише діаризує, Whisper не потрібен
+        self.model = self.registry.whisper("base") if preload_whisper else None
+        # процесам без діаризації (веб, normalize/asr/merge) pyannote не потрібен;
+        # якщо діаризація все ж знадобиться тут, пайплайн завантажиться при першому зверненні
+        self._diarization_pipeline = self.registry.diarization_pipeline() if preload_diarization else None
+
+
+    @property
+    def diarization_pipeline(self):
+        if self._diarization_pipeline is None:
+            self._diarization_pipeline = self.registry.diarization_pipeline()
+        return self._diarization_pipeline
+
+
+    @diarization_pipeline.setter
+    def diarization_pipeline(self, pipeline):
+        self._diarization_pipeline = pipeline
 
 
     def get_audio_data(self, audio_location: str) -> str:
-        """Download or get local audio file"""
+        """Download or get local audio file
+
+        Remote files are streamed into a shared cache keyed by URL and
+        revalidated with ETag/Last-Modified; the returned cache path must
+        not be deleted by the caller.
+        """
         try:
             if audio_location.startswith(('http://', 'https://')):
-                import requests
-                response = requests.get(audio_location)
-                response.raise_for_status()
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-                temp_file.write(response.content)
-                temp_file.close()
-                return temp_file.name
+                return remote_audio_cache.fetch(audio_location)
             return audio_location
         except Exception as e:
             logger.error(f"Error getting audio data: {str(e)}")
             raise
 
 
-    def audio_normalize(self, audio_file: str) -> str:
-        """Normalize audio to 16kHz mono WAV format"""
+    def audio_normalize(self, audio: AudioInput) -> np.ndarray:
+        """Normalize 16kHz mono waveform in memory"""
         try:
-            audio = AudioSegment.from_file(audio_file)
-            audio = audio.set_frame_rate(16000).set_channels(1)
-
-            audio = audio.normalize()
-
-            if len(audio) > 5000: 
-                audio = audio.low_pass_filter(4000) 
-                audio = audio.high_pass_filter(80) 
-
-            audio = audio.compress_dynamic_range(threshold=-20.0, ratio=2.0)
-
-            normalized_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-            audio.export(normalized_file.name, 
-                        format="wav",
-                        codec="pcm_s16le", 
-                        parameters=["-ar", "16000"])
-            
-            return normalized_file.name
+            return normalize_waveform(load_audio(audio))
         except Exception as e:
             logger.error(f"Error normalizing audio: {str(e)}")
             raise
 
 
-    def audio_to_text(self, mediafile: str, model: str = 'base') -> Dict[str, Any]:
-        """Transcribe audio to text using Whisper"""
-        try:
-            result = self.model.transcribe(
-                mediafile,
-                word_timestamps=True,
-                fp16=(self.device == "cuda"),
-                temperature=1,
-            )
+    def audio_to_text(self, mediafile: AudioInput, model: str = 'base', long_audio: bool = None,
+                      on_segments: SegmentsCallback = None, state: Dict[str, Any] = None,
+                      profile: str = None, language: str = None) -> Dict[str, Any]:
+        """Transcribe audio to text using Whisper
 
-            audio = AudioSegment.from_file(mediafile)
-            audio_duration = len(audio) / 1000.0 
+        Long recordings (or ``long_audio=True``) are split at pauses and
+        transcribed in parallel by a process pool. ``on_segments`` receives
+        finished segments and decoded/total seconds while decoding runs;
+        if it raises, finished windows stay in ``state`` and a repeated
+        call with the same ``state`` resumes from there.
+
+        Decoding options come from ``profile`` (fast / balanced / accurate);
+        a ``language`` hint skips language detection. Recordings up to 30 s
+        are decoded in a shared batch with other jobs of this process.
+        """
+        try:
+            if model not in SUPPORTED_WHISPER_MODELS:
+                raise ValueError(f"Unsupported Whisper model: {model}")
+
+            audio = load_audio(mediafile)
+            options = decode_options(profile, self.device, language)
+
+            if long_audio is None:
+                long_audio = should_chunk(audio)
+
+            if long_audio:
+                result = transcribe_chunked(audio, model, options, on_segments=on_segments, state=state)
+            elif self.batcher.accepts(audio, model, options):
+                # короткий запис — у спільний пакет з іншими задачами цього процесу
+                batched_model = self.batcher.client(model)
+                if on_segments:
+                    result = transcribe_windowed(batched_model, audio, options, on_segments, state=state)
+                else:
+                    result = batched_model.transcribe(audio, **options)
+            else:
+                with self.registry.acquire_whisper(model) as whisper_model:
+                    if on_segments:
+                        result = transcribe_windowed(whisper_model, audio, options, on_segments, state=state)
+                    else:
+                        result = whisper_model.transcribe(audio, **options)
 
             return {
                 'text': result['text'],
@@ -136,76 +155,42 @@ class Transcribe:
         return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
     
 
-    def check_audio_quality(self, audio_file: str) -> dict:
-        """Check audio for potential issues affecting diarization"""
+    def check_audio_quality(self, audio_file: AudioInput, sample_rate: int = SAMPLE_RATE, channels: int = 1) -> dict:
+        """Check audio for potential issues affecting diarization
+
+        Files are decoded as a stream and analyzed block by block in one
+        pass, so memory does not grow with the length of the recording.
+        """
         try:
-            if not isinstance(audio_file, (str, os.PathLike)):
-                print(f"Invalid audio_file type: {type(audio_file)}")
-                return {"error": f"Expected file path, got {type(audio_file)}"}
-            
-            audio_file = str(audio_file)
-            
-            if not os.path.exists(audio_file):
-                print(f"Audio file does not exist: {audio_file}")
-                return {"error": "File not found"}
-            
-            file_size = os.path.getsize(audio_file)
-            if file_size == 0:
-                print("Audio file is empty")
-                return {"error": "Empty file"}
-            
-            print(f"Processing audio file: {audio_file} (size: {file_size} bytes)")
+            if not isinstance(audio_file, np.ndarray):
+                audio_file = str(audio_file)
+                
+                if not os.path.exists(audio_file):
+                    print(f"Audio file does not exist: {audio_file}")
+                    return {"error": "File not found"}
+                
+                file_size = os.path.getsize(audio_file)
+                if file_size == 0:
+                    print("Audio file is empty")
+                    return {"error": "Empty file"}
+                
+                print(f"Processing audio file: {audio_file} (size: {file_size} bytes)")
             
             try:
-                audio = AudioSegment.from_file(audio_file)
-                print("Successfully loaded audio with AudioSegment")
+                report = analyze_quality(audio_file)
             except Exception as e:
-                print(f"AudioSegment error: {str(e)}")
+                print(f"Audio decode error: {str(e)}")
                 return {"error": f"Failed to load audio: {str(e)}"}
             
-            duration = len(audio) / 1000.0
-            loudness = audio.dBFS
-            
-            try:
-                samples = np.array(audio.get_array_of_samples())
-                if len(samples) > 0:
-                    dynamic_range = float(np.max(samples) - np.min(samples))
-                else:
-                    dynamic_range = 0
-            except Exception as e:
-                print(f"Sample analysis error: {str(e)}")
-                dynamic_range = 0
-            
-            sample_rate = audio.frame_rate
-            channels = audio.channels
-            
-            report = {
-                "duration": duration,
-                "loudness": loudness,
-                "dynamic_range": dynamic_range,
-                "sample_rate": sample_rate,
-                "channels": channels,
-                "potential_issues": []
-            }
-            
-            if duration < 10:
-                report["potential_issues"].append("Audio too short for reliable diarization")
-            
-            if loudness > -20:
-                report["potential_issues"].append("Audio might be too loud")
-            
-            if loudness < -35:
-                report["potential_issues"].append("Audio might be too quiet")
-            
-            if dynamic_range < 1000:
-                report["potential_issues"].append("Low dynamic range might affect speaker separation")
-            
+            report.update(sample_rate=sample_rate, channels=channels, potential_issues=quality_issues(report))
             if sample_rate < 16000:
                 report["potential_issues"].append("Sample rate too low for optimal diarization")
             
             print("\n--- Audio Quality Report ---")
-            print(f"Duration: {duration:.2f} seconds")
-            print(f"Loudness: {loudness:.2f} dB")
+            print(f"Duration: {report['duration']:.2f} seconds")
+            print(f"Loudness: {report['loudness']} dB")
+            print(f"SNR: {report['snr_db']} dB, speech: {report['speech_ratio']:.0%}, "
+                  f"clipping: {report['clipping_ratio']:.2%}")
             print(f"Sample rate: {sample_rate} Hz")
             print(f"Channels: {channels}")
             if report["potential_issues"]:
@@ -287,7 +272,7 @@ class Transcribe:
         return similarity
     
 
-    def alternative_diarization(self, audio_location: str) -> Annotation:
+    def alternative_diarization(self, audio_location: AudioInput) -> Annotation:
         """Alternative approach using direct model access"""
         try:
             from pyannote.audio.pipelines import SpeakerDiarization
@@ -305,7 +290,7 @@ class Transcribe:
                 "clustering": {"method": "spectral", "min_clusters": 2, "max_clusters": 5}
             })
             
-            diarization = pipeline(audio_location)
+            diarization = pipeline(self._diarization_input(audio_location))
             
             return diarization
         except Exception as e:
@@ -317,9 +302,10 @@ class Transcribe:
         """Run diagnostics on diarization to identify issues"""
         try:
             print("\n=== DIARIZATION DIAGNOSTICS ===\n")
-            quality_report = self.check_audio_quality(audio_file)
+            audio = load_audio(self.get_audio_data(audio_file))
+            quality_report = self.check_audio_quality(audio)
             
-            normalized_file = self.audio_normalize(audio_file)
+            normalized_file = self.audio_normalize(audio)
             
             try:
                 diarization = self.diarization(normalized_file)
@@ -331,10 +317,9 @@ class Transcribe:
                 print(f"   Standard diarization failed: {str(e)}")
             
             try:
-                diarization = self.diarization_pipeline(
-                    normalized_file,
-                    num_speakers=2,
-                    clustering="AgglomerativeClustering"
+                diarization = self._diarize(
+                    self._diarization_input(normalized_file),
+                    num_speakers=2
                 )
                 speakers = set()
                 for _, _, speaker in diarization.itertracks(yield_label=True):
@@ -358,7 +343,30 @@ class Transcribe:
             print(f"Diagnostics failed: {str(e)}")
 
 
-    def diarization(self, audio_location: str) -> Annotation:
+    def _diarization_input(self, audio: AudioInput) -> Dict[str, Any]:
+        """Wrap waveform as in-memory input for pyannote"""
+        waveform = torch.from_numpy(load_audio(audio)).unsqueeze(0)
+        return {"waveform": waveform, "sample_rate": SAMPLE_RATE}
+
+
+    def _diarize(self, audio: Dict[str, Any], cache_key: str = None, **speaker_kwargs) -> Annotation:
+        """Cluster cached segmentation/embeddings; full pipeline run as a fallback"""
+        pipeline = self.diarization_pipeline
+        with self.registry.use(pipeline):
+            if not supports_reclustering(pipeline):
+                result = pipeline(audio, **speaker_kwargs)
+                # pyannote.audio 4 returns DiarizeOutput instead of an Annotation
+                return getattr(result, 'speaker_diarization', result)
+
+            cache_key = cache_key or feature_cache.key(audio["waveform"].numpy())
+            features = feature_cache.get(cache_key)
+            if features is None:
+                features = extract_features(pipeline, audio)
+                feature_cache.put(cache_key, features)
+            return recluster(pipeline, features, **speaker_kwargs)
+
+
+    def diarization(self, audio_location: AudioInput) -> Annotation:
         """Perform speaker diarization on audio file"""
         if not self.diarization_pipeline:
             raise Exception("Diarization pipeline not initialized")
@@ -366,24 +374,27 @@ class Transcribe:
         try:
             print("Starting diarization...")
         
-            if not isinstance(audio_location, (str, os.PathLike)):
-                raise Exception(f"Expected file path, got {type(audio_location)}")
-            
-            audio_location = str(audio_location)
+            if not isinstance(audio_location, (str, os.PathLike, np.ndarray)):
+                raise Exception(f"Expected file path or waveform, got {type(audio_location)}")
             
-            if not os.path.exists(audio_location):
+            if not isinstance(audio_location, np.ndarray) and not os.path.exists(str(audio_location)):
                 raise Exception(f"Audio file not found: {audio_location}")
             
-            # Basic diarization
+            audio_location = self._diarization_input(audio_location)
+            cache_key = feature_cache.key(audio_location["waveform"].numpy())
+            
+            # Basic diarization; segmentation and embeddings are computed once,
+            # retries below only re-run clustering
             try:
-                diarization = self.diarization_pipeline(audio_location)
+                diarization = self._diarize(audio_location, cache_key)
                 print("Basic diarization completed")
             except Exception as e:
                 print(f"Basic diarization failed: {str(e)}")
                 # Min params try
                 try:
-                    diarization = self.diarization_pipeline(
+                    diarization = self._diarize(
                         audio_location,
+                        cache_key,
                         min_speakers=1,
                         max_speakers=6
                     )
@@ -429,8 +440,9 @@ class Transcribe:
             if len(speakers) <= 1:
                 print("Only one speaker detected, trying with forced parameters...")
                 try:
-                    diarization = self.diarization_pipeline(
+                    diarization = self._diarize(
                         audio_location,
+                        cache_key,
                         num_speakers=2
                     )
                     print("Forced diarization with num_speakers=2 completed")
@@ -481,7 +493,7 @@ class Transcribe:
     def match_transcription_diarization(self, 
                                         diarization: Annotation, 
                                         transcription: Dict[str, Any],
-                                        audio_file: str
+                                        audio_file: AudioInput = None
                                         ) -> Tuple[Dict[str, List[Dict[str, Any]]], str]:
         """Match transcription segments with speaker diarization"""
         try:
@@ -529,58 +541,8 @@ class Transcribe:
                 print(f"  {old_speaker} -> {new_speaker}")
             
             speakers = defaultdict(list)
-            all_segments = []
-
-            for segment in sorted(transcription['segments'], key=lambda x: x['start']):
-                seg_start = segment['start']
-                seg_end = segment['end']
-                text = segment['text']
-                
-                overlaps = []
-                for turn in speaker_turns:
-                    overlap_start = max(seg_start, turn['start'])
-                    overlap_end = min(seg_end, turn['end'])
-                    if overlap_start < overlap_end: 
-                        overlaps.append({
-                            'speaker': turn['speaker'],
-                            'duration': overlap_end - overlap_start
-                        })
-
-                if overlaps:
-                    speaker_durations = defaultdict(float)
-                    for ov in overlaps:
-                        speaker_durations[ov['speaker']] += ov['duration']
-
-                    dominant_speaker = max(speaker_durations.items(), key=lambda x: x[1])[0]
-                    norm_speaker = speaker_map[dominant_speaker]            
-                    
-                    all_segments.append({
-                        'start': seg_start,
-                        'end': seg_end,
-                        'speaker': norm_speaker,
-                        'text': text
-                    })
-                else:
-                    closest_speaker = min(speaker_turns, 
-                                        key=lambda x: min(abs(x['start'] - seg_start), 
-                                                        abs(x['end'] - seg_end)))
-                    norm_speaker = speaker_map[closest_speaker['speaker']]
-                    
-                    all_segments.append({
-                        'start': seg_start,
-                        'end': seg_end,
-                        'speaker': norm_speaker,
-                        'text': text
-                    })
-            
-            text_output = ""
-            current_speaker = None
-            
-            for seg in sorted(all_segments, key=lambda x: x['start']):
-                if seg['speaker'] != current_speaker:
-                    text_output += f"\n=== {seg['speaker']} ===\n"
-                    current_speaker = seg['speaker']
-                text_output += f"[{seg['start']:.2f}-{seg['end']:.2f}] {seg['text']}\n"
+            all_segments = assign_speakers(transcription['segments'], speaker_turns, speaker_map)
+            text_output = format_speakers_text(all_segments)
             
             for seg in all_segments:
                 speakers[seg['speaker']].append({
@@ -589,8 +551,23 @@ class Transcribe:
                     'text': seg['text']
                 })
             
-            return dict(speakers), text_output.strip()
+            return dict(speakers), text_output
         
         except Exception as e:
             print(f"Error in match_transcription_diarization: {str(e)}")
-            return {}, f"Error matching transcription with diarization: {str(e)}"
\ No newline at end of file
+            return {}, f"Error matching transcription with diarization: {str(e)}"
+
+
+_transcribers: Dict[Tuple[bool, bool], Transcribe] = {}
+_transcribers_lock = threading.Lock()
+
+
+def get_transcriber(preload_whisper: bool = True, preload_diarization: bool = False) -> Transcribe:
+    """One Transcribe per process and preload set: it keeps no per-job state
+    and its models are shared through model_registry anyway"""
+    key = (preload_whisper, preload_diarization)
+    with _transcribers_lock:
+        if key not in _transcribers:
+            _transcribers[key] = Transcribe(preload_whisper=preload_whisper,
+                                            preload_diarization=preload_diarization)
+        return _transcribers[key]
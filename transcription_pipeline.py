@@ -0,0 +1,208 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pyannote.core import Annotation, Segment
+
+from transcribe import Transcribe, get_transcriber, load_audio
+from audio_processing import analyze_quality, quality_issues
+from remote_audio import remote_audio_cache
+from status_store import status_store
+from job_queue import JobInterrupted, interruption_point
+from cpu_governor import core_governor, apply_budget
+
+
+# Етапи конвеєра транскрипції. Їх викликає і локальний виконавець
+# (transcribe_process_thread), і задачі Celery (tasks.py).
+
+
+# Діаризація паралельно з ASR в окремому процесі з власною часткою потоків torch
+PARALLEL_STAGES = os.getenv('PARALLEL_STAGES', 'true').lower() == 'true'
+DIARIZATION_WORKERS = int(os.getenv('DIARIZATION_WORKERS', '1'))
+DIARIZATION_THREADS = int(os.getenv('DIARIZATION_THREADS', str(max((os.cpu_count() or 2) // 2, 1))))
+
+_diarization_pool: Optional[ProcessPoolExecutor] = None
+_diarization_pool_lock = threading.Lock()
+
+
+def normalize_stage(transcribe: Transcribe,
+                    file_path: str) -> Tuple[np.ndarray, Optional[str], Dict[str, Any]]:
+    """Декодує і нормалізує аудіо; повертає хвильову форму, шлях до тимчасової
+    локальної копії, яку треба прибрати (None для кешу завантажень), і звіт
+    про якість вихідного (ще не нормалізованого) сигналу"""
+    pre_loaded_file = transcribe.get_audio_data(file_path)
+    waveform = load_audio(pre_loaded_file)
+    if remote_audio_cache.is_cached(pre_loaded_file):
+        pre_loaded_file = None
+    return transcribe.audio_normalize(waveform), pre_loaded_file, quality_stage(waveform)
+
+
+def quality_stage(waveform: np.ndarray) -> Optional[Dict[str, Any]]:
+    """Звіт якості за один прохід по вже декодованому сигналу; збій не фатальний"""
+    try:
+        report = analyze_quality(waveform)
+        report['potential_issues'] = quality_issues(report)
+        return report
+    except Exception as e:
+        print(f"Audio quality analysis failed: {str(e)}")
+        return None
+
+
+class AsrProgress:
+    """Звітує прогрес розпізнавання в сховище статусів: частку декодованих
+    секунд (у межах ``start``..``end`` відсотків) і вже готові сегменти.
+    Після кожного вікна — контрольна точка скасування/витіснення."""
+
+    def __init__(self, job_id: str, start: int = 25, end: int = 70):
+        self.job_id = str(job_id)
+        self.start = start
+        self.end = end
+
+    def __call__(self, segments: List[Dict[str, Any]], decoded: float, total: float) -> None:
+        # між вікнами бюджет ядер міг змінитися: стартували або завершились інші задачі
+        core_governor.apply(self.job_id, 'asr')
+        status_store.append_partial(self.job_id, [
+            {'start': segment['start'], 'end': segment['end'], 'text': segment['text']}
+            for segment in segments
+        ])
+        fraction = min(decoded / total, 1.0) if total else 1.0
+        status_store.update(
+            self.job_id,
+            status='processing',
+            progress=int(self.start + (self.end - self.start) * fraction),
+            message=f'Transcribing audio... {decoded:.0f}/{total:.0f} s'
+        )
+        interruption_point(self.job_id)
+
+    def reset(self) -> None:
+        status_store.clear_partial(self.job_id)
+
+
+def asr_stage(transcribe: Transcribe, audio: np.ndarray, model_type: str,
+              progress: Optional[AsrProgress] = None,
+              state: Optional[Dict[str, Any]] = None,
+              profile: Optional[str] = None, language: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+    """Whisper з відкатом на base; повертає результат і фактично використану модель.
+
+    ``state`` зберігає готові вікна між перериванням і відновленням.
+    """
+    state = {} if state is None else state
+    model_type = state.setdefault('model', model_type)
+    try:
+        return transcribe.audio_to_text(model=model_type, mediafile=audio, on_segments=progress,
+                                        state=state.setdefault('windows', {}),
+                                        profile=profile, language=language), model_type
+    except JobInterrupted:
+        raise
+    except Exception as e:
+        print(f"Model {model_type} failed, trying base model: {str(e)}")
+        if progress:
+            progress.reset()
+        state.update(model='base', windows={})
+        return transcribe.audio_to_text(model='base', mediafile=audio, on_segments=progress,
+                                        state=state['windows'], profile=profile, language=language), 'base'
+
+
+def diarization_to_turns(diarization: Annotation) -> List[Dict[str, Any]]:
+    return [
+        {'start': float(turn.start), 'end': float(turn.end), 'speaker': speaker}
+        for turn, _, speaker in diarization.itertracks(yield_label=True)
+    ]
+
+
+def turns_to_annotation(turns: List[Dict[str, Any]]) -> Annotation:
+    annotation = Annotation()
+    for turn in turns:
+        annotation[Segment(turn['start'], turn['end'])] = turn['speaker']
+    return annotation
+
+
+def diarize_stage(transcribe: Transcribe, audio: np.ndarray) -> Optional[List[Dict[str, Any]]]:
+    """Репліки мовців у серіалізованому вигляді або None, якщо діаризація не вдалася"""
+    try:
+        return diarization_to_turns(transcribe.diarization(audio_location=audio))
+    except Exception as e:
+        print(f"Diarization failed: {str(e)}")
+        return None
+
+
+def _init_diarization_worker(threads: int) -> None:
+    import torch
+    from model_registry import model_registry
+
+    torch.set_num_threads(max(threads, 1))
+    model_registry.diarization_pipeline()
+
+
+def _diarize_in_worker(audio: np.ndarray,
+                       budget: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+    # процес пулу виконує одну діаризацію за раз, тож бюджет задачі можна виставити на процес
+    apply_budget(budget)
+    return diarize_stage(get_transcriber(preload_whisper=False, preload_diarization=True), audio)
+
+
+def get_diarization_pool() -> ProcessPoolExecutor:
+    """Пул процесів діаризації; потоки кожного виклику задає бюджет задачі (cpu_governor)"""
+    global _diarization_pool
+    with _diarization_pool_lock:
+        if _diarization_pool is None:
+            _diarization_pool = ProcessPoolExecutor(
+                max_workers=DIARIZATION_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_diarization_worker,
+                initargs=(DIARIZATION_THREADS,)
+            )
+        return _diarization_pool
+
+
+def diarize_stage_async(transcribe: Transcribe, audio: np.ndarray,
+                        budget: Optional[Dict[str, Any]] = None) -> Future:
+    """Запускає діаризацію паралельно з ASR; без PARALLEL_STAGES виконує її одразу.
+
+    ``budget`` — потоки і ядра етапу діаризації з ``core_governor.budget``.
+    """
+    if PARALLEL_STAGES:
+        return get_diarization_pool().submit(_diarize_in_worker, audio, budget)
+
+    future = Future()
+    future.set_result(diarize_stage(transcribe, audio))
+    return future
+
+
+def diarization_result(future: Future) -> Optional[List[Dict[str, Any]]]:
+    """Чекає на діаризацію; збій процесу-воркера, як і збій самої діаризації, не фатальний"""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Diarization failed: {str(e)}")
+        return None
+
+
+def merge_stage(transcribe: Transcribe, result: Dict[str, Any],
+                turns: Optional[List[Dict[str, Any]]]) -> Tuple[Dict[str, Any], str]:
+    """Поєднує сегменти Whisper з репліками; повертає (speakers_json, speakers_text)"""
+    if not turns:
+        return {}, result['text']
+    return transcribe.match_transcription_diarization(turns_to_annotation(turns), result)
+
+
+def save_result(transcription, result: Dict[str, Any], model_type: str,
+                speakers_json: Dict[str, Any], speakers_text: str) -> None:
+    transcription.text = result['text']
+    transcription.speakers_text = speakers_text
+    transcription.speakers_json = speakers_json
+    transcription.language = result.get('language', 'unknown')
+    transcription.model = model_type
+    transcription.status = "completed"
+
+
+def cleanup_files(*paths: Optional[str]) -> None:
+    for f in set(p for p in paths if p):
+        try:
+            if os.path.exists(f):
+                os.remove(f)
+        except Exception as e:
+            print(f"Error removing file {f}: {str(e)}")
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from models import db, User, Audio, Transcription
 from auth_routes import token_required
 from sqlalchemy import desc
+from job_queue import request_cancel
+from status_store import status_store
 
 transcription_bp = Blueprint('transcriptions', __name__, url_prefix='/transcriptions')
 
@@ -146,6 +148,10 @@ def delete_transcription(current_user, transcription_uuid):
                 'message': 'Transcription not found'
             }), 404
         
+        # зупиняємо фонову задачу, щоб вона не писала у видалений рядок
+        if transcription.status in ('pending', 'processing'):
+            request_cancel(transcription_uuid)
+        
         if transcription.audio:
             audio = transcription.audio
             import os
@@ -171,3 +177,45 @@ def delete_transcription(current_user, transcription_uuid):
             'status': 'error',
             'message': str(e)
         }), 500
+
+
+@transcription_bp.route('/<transcription_uuid>/cancel', methods=['POST'])
+@token_required
+def cancel_transcription(current_user, transcription_uuid):
+    """Скасовує транскрипцію, що очікує в черзі або виконується"""
+    try:
+        transcription = Transcription.query.filter_by(
+            uuid=transcription_uuid,
+            user_id=current_user.id
+        ).first()
+        
+        if not transcription:
+            return jsonify({
+                'status': 'error',
+                'message': 'Transcription not found'
+            }), 404
+        
+        if transcription.status not in ('pending', 'processing'):
+            return jsonify({
+                'status': 'error',
+                'message': f'Transcription is already {transcription.status}'
+            }), 409
+        
+        # виконувана задача зупиниться в найближчій контрольній точці
+        request_cancel(transcription_uuid)
+        
+        transcription.status = 'cancelled'
+        db.session.commit()
+        status_store.set(transcription_uuid, 'cancelled', 0, 'Transcription cancelled')
+        
+        return jsonify({
+            'status': 'success',
+            'message': 'Transcription cancelled'
+        })
+        
+    except Exception as e:
+        print(f"Error cancelling transcription: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500